@@ -1,7 +1,10 @@
 # coding= utf-8
 
 
-__all__ = ['bin2csv']
+__all__ = ['bin2csv', 'calc_acc_gyro_block', 'decode_package_payload', 'package_timestamps',
+           'package_csv_rows', 'package_csv_text', 'WPMBinIndex', 'bin2npz', 'iter_wpm_packages',
+           'wpm_bin_info', 'bin2parquet', 'acc_gyro_from_counts', 'validate_wpm_bin',
+           'csv_file_head', 'load_wpm_bin', 'SEGMENT_AXES']
 
 """ Uso directo del archivo python de importacion proporcionado por el fabricante"""
 
@@ -10,12 +13,6 @@ import ctypes
 import re
 
 
-import threading
-
-
-import time
-
-
 import os
 
 
@@ -34,9 +31,21 @@ import struct
 import binascii
 
 
+import io
+
+
+import json
+
+
+import mmap
+
+
 import sys
 
 
+import time
+
+
 
 
 
@@ -46,16 +55,31 @@ import subprocess
 
 
 
-from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
+
+
+from functools import lru_cache, partial
 
 
+from datetime import datetime
 
 
+import numpy as np
 
-from queue import Queue, LifoQueue, PriorityQueue
 
 
-import _thread
+
+
+import itertools
+
+
+import contextlib
+
+
+import gzip
+
+
+import lzma
 import argparse
 
 
@@ -110,7 +134,11 @@ PACKAGE_HEARD_KEY = bytes(PACKAGE_HEADER_RECOGNITION_STRING, encoding='utf-8')
 
 
 
-QUEUE_ONE_ITERM_BYTE_SIZE = 1024*10
+READ_BUFFER_SIZE = 1024*1024*4
+
+
+# Buffer de escritura del CSV de salida
+WRITE_BUFFER_SIZE = 1024*1024*4
 
 
 REMARKES_SIZE = 512
@@ -194,957 +222,1628 @@ def csv_write_dict(path, csvHeard, csvData):
 
 
 
-def csv_file_remove(path):
-
-
-    if os.path.exists(path):  # 如果文件存在
-
-
-        os.remove(path)
-
-
-    else:
-
-
-        debugInfo('no such file:%s' % path)  # 则返回文件不存在
-
-
-
-
-
-def calcAccGryro(value, range):
-
-
-    if value > 0:
-
-
-        Denominator = 0x7fff
-
-
-    else:
-
-
-        Denominator = 0x8000
-
-
-    calc = value * range / Denominator
-
-
-    return format(calc, '.8f')
-
-
-
-
-
-def read_one_package_raw_date(allFileDataBuff:bytearray, onePackageData, readFileQueue):
-
-
-    startRecnizOffset = -1
-
-
-    endRecnizOffset = -1
-
-
-    while(1):
-
-
-        try:
-
-
-            if readFileQueue != '':
-
-
-                readData = readFileQueue.get(True, 1)
-
+# 文件头 / 包头格式
+FILE_HEADER_STRUCT = struct.Struct('4sIHH')
+PACKAGE_HEADER_STRUCT = struct.Struct('8sIIIIIII')
+DATA_OFFSET = REMARKES_SIZE + FILE_HEADER_STRUCT.size
+PACKAGE_HEADER_DTYPE = np.dtype([('recString', 'S8'), ('crc32', '<u4'), ('start', '<u4'), ('end', '<u4'),
+                                 ('acc', '<u4'), ('gyr', '<u4'), ('temp', '<u4'), ('hr', '<u4')])
+PACKAGE_INDEX_DTYPE = np.dtype([('offset', '<i8'), ('size', '<i8'), ('crc32', '<u4'), ('start', '<u4'),
+                                ('end', '<u4'), ('acc', '<u4'), ('gyr', '<u4'), ('temp', '<u4'), ('hr', '<u4')])
+INDEX_SIDECAR_SUFFIX = '.idx.npz'
+INDEX_VERSION = 1
 
-                allFileDataBuff.extend(readData)
 
-
-                getDataLen = len(readData)
+def decode_remarks(remarkes):
+    """Remarks string stored in the first REMARKES_SIZE bytes of a .BIN file."""
+    remarkesString = bytes(remarkes).decode('utf-8', 'ignore')
+    if '\0' in remarkesString:
+        return remarkesString[0:remarkesString.index('\0')]
+    return remarkesString + '\0'
 
 
+def _parse_file_header(head):
+    # remarks + '4sIHH' -> (remarkesString, headerPackeNum, accRange, gyroRange), None si no es un .BIN
+    if len(head) < DATA_OFFSET:
+        return None
+    (headerRecogni, headerPackeNum, accRange, gyroRange) = FILE_HEADER_STRUCT.unpack_from(head, REMARKES_SIZE)
+    if headerRecogni.decode('utf-8', 'ignore') != FILE_HEADER_RECOGNITION_STRING:
+        return None
+    return decode_remarks(head[0:REMARKES_SIZE]), headerPackeNum, accRange, gyroRange
+
+
+class WPMBinIndex:
+    """Package index of a MATRIX .BIN file.
+
+    The file is memory-mapped once and scanned for every 'MDTCPACK' key. Offset, size
+    and header fields of each package are kept in the structured array ``packages``
+    (see ``PACKAGE_INDEX_DTYPE``), so any package can be read directly with
+    ``package_bytes``. Packages run from one key to the next, exactly as ``bin2csv``
+    splits them, and a trailing package shorter than its header has zero header fields.
+
+    With ``sidecar`` the index is saved next to the recording as ``<bin_file>.idx.npz``
+    and reused while the size and modification time of the .BIN file do not change. If
+    it can not be written (e.g. a read-only folder) the index is kept in memory only.
+
+    Args:
+        bin_file (str): Path to the .BIN file.
+        sidecar (bool): Read and write the sidecar index file. Defaults to False, so
+            nothing is written next to the data (as the conversions open the index).
+        hop_headers (bool): Jump from each package header to the next one with the size
+            announced by its sample counts, instead of searching the whole file for the
+            keys. Only where that size does not lead to a key is the next one searched.
+            Defaults to False.
+
+    Raises:
+        ValueError: If the file is too short or does not start with a MATRIX header.
+    """
+
+    def __init__(self, bin_file, sidecar=False, hop_headers=False):
+        self.bin_file = str(bin_file)
+        stat = self._open()
+        self._stamp = np.array([stat.st_size, stat.st_mtime_ns, INDEX_VERSION], dtype=np.int64)
+        fileHeader = _parse_file_header(self._mmap[0:DATA_OFFSET])
+        if fileHeader is None:
+            self.close()
+            raise ValueError(f'{self.bin_file}: not a MATRIX .BIN file')
+        self.remarks, self.package_count, self.acc_range, self.gyro_range = fileHeader
+        self.sidecar_file = self.bin_file + INDEX_SIDECAR_SUFFIX
+        self._searchable = None
+        if not (sidecar and self._load_sidecar()):
+            self.packages = self._index_packages(self._hop_packages() if hop_headers else self._scan_packages())
+            if sidecar:
+                self._save_sidecar()
+
+    def _scan_packages(self):
+        # 一次扫描整个文件, 找到所有包的开头
+        fileSize = len(self._mmap)
+        offsets = [DATA_OFFSET] if fileSize > DATA_OFFSET else []
+        find = self._mmap.find
+        pos = find(PACKAGE_HEARD_KEY, DATA_OFFSET + 1)
+        while pos != -1:
+            offsets.append(pos)
+            pos = find(PACKAGE_HEARD_KEY, pos + 1)
+        return offsets
+
+    def _hop_packages(self):
+        # Salta de cabecera en cabecera; solo se busca la clave cuando el tamaño no lleva a otra
+        fileSize = len(self._mmap)
+        sampleBytes = [n * RAW_SAMPLE_DTYPE.itemsize for n in
+                       (ACC_GYRO_CHANNELS, ACC_GYRO_CHANNELS, TEMPER_HEART_CHANNELS, TEMPER_HEART_CHANNELS)]
+        offsets = []
+        pos = DATA_OFFSET if fileSize > DATA_OFFSET else -1
+        while pos != -1:
+            offsets.append(pos)
+            nextPos = fileSize + 1
+            if pos + PACKAGE_HEADER_STRUCT.size <= fileSize:
+                sampleCounts = PACKAGE_HEADER_STRUCT.unpack_from(self._mmap, pos)[4:]
+                nextPos = pos + PACKAGE_HEADER_STRUCT.size + sum(c * b for c, b in zip(sampleCounts, sampleBytes))
+            if nextPos == fileSize:
+                pos = -1
+            elif nextPos < fileSize and self._mmap[nextPos:nextPos + len(PACKAGE_HEARD_KEY)] == PACKAGE_HEARD_KEY:
+                pos = nextPos
             else:
-
-
-                getDataLen = 0
-
-
-        except:
-
-
-            readFileQueue = ''
-
-
-            getDataLen = 0
-
-
-
-
-
-        if startRecnizOffset == -1:
-
-
-            try:
-
-
-                startRecnizOffset = allFileDataBuff.index(
-
-
-                    PACKAGE_HEARD_KEY)
-
-
-            except:
-
-
-                break
-
-
+                pos = self._mmap.find(PACKAGE_HEARD_KEY, pos + 1)
+        return offsets
+
+    def _index_packages(self, offsets):
+        fileSize = len(self._mmap)
+        packages = np.zeros(len(offsets), dtype=PACKAGE_INDEX_DTYPE)
+        packages['offset'] = offsets
+        packages['size'] = np.diff(np.append(packages['offset'], fileSize))
+        complete = np.flatnonzero(packages['size'] >= PACKAGE_HEADER_DTYPE.itemsize)
+        fileBytes = np.frombuffer(self._mmap, dtype=np.uint8)
+        headerBytes = fileBytes[packages['offset'][complete, None] + np.arange(PACKAGE_HEADER_DTYPE.itemsize)]
+        del fileBytes
+        headers = headerBytes.view(PACKAGE_HEADER_DTYPE).reshape(-1)
+        for name in ('crc32', 'start', 'end', 'acc', 'gyr', 'temp', 'hr'):
+            packages[name][complete] = headers[name]
+        return packages
+
+    def _load_sidecar(self):
         try:
+            with np.load(self.sidecar_file, allow_pickle=False) as sidecar:
+                if not np.array_equal(sidecar['stamp'], self._stamp):
+                    return False
+                self.packages = sidecar['packages']
+        except (OSError, KeyError, ValueError):
+            return False
+        return self.packages.dtype == PACKAGE_INDEX_DTYPE
+
+    def _save_sidecar(self):
+        try:
+            with open(self.sidecar_file, 'wb') as f:
+                np.savez(f, stamp=self._stamp, packages=self.packages)
+        except OSError:
+            debugInfo('can not write index file:' + self.sidecar_file)
 
+    def _open(self):
+        self._file = open(self.bin_file, 'rb')
+        try:
+            stat = os.fstat(self._file.fileno())
+            if stat.st_size < DATA_OFFSET:
+                raise ValueError(f'{self.bin_file}: file too short for a MATRIX header')
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        return stat
+
+    def __getstate__(self):
+        # Se envía a otros procesos sin el mmap, que se vuelve a abrir al recibirlo
+        state = self.__dict__.copy()
+        del state['_file'], state['_mmap']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def __len__(self):
+        return len(self.packages)
+
+    def package_bytes(self, i):
+        """Raw bytes of package ``i``, header included."""
+        offset, size = int(self.packages['offset'][i]), int(self.packages['size'][i])
+        return self._mmap[offset:offset + size]
+
+    def package_range(self, start=None, end=None):
+        """Packages ``first:stop`` whose start/end seconds overlap ``[start, end]``.
+
+        Args:
+            start, end (datetime or float): Limits of the range as datetimes (naive ones in
+                local time, as in the activity log) or epoch seconds. None leaves that
+                side of the range open.
+
+        Returns:
+            tuple: ``(first, stop)`` among the first ``package_count`` packages, found by
+            binary search on the timestamps of the packages the decoder accepts, so a
+            corrupt package with a wrong timestamp does not move the range.
+        """
+        limit = min(len(self), self.package_count)
+        searchable = self._searchable_packages()
+        # Paquetes válidos fuera de orden: se busca sobre el máximo acumulado
+        ends = np.maximum.accumulate(self.packages['end'][searchable])
+        starts = np.maximum.accumulate(self.packages['start'][searchable])
+        first = 0
+        if start is not None:
+            k = int(np.searchsorted(ends, _epoch_seconds(start), side='left'))
+            first = int(searchable[k]) if k < len(searchable) else limit
+        stop = limit
+        if end is not None:
+            k = int(np.searchsorted(starts, _epoch_seconds(end), side='right'))
+            stop = int(searchable[k - 1]) + 1 if k > 0 else 0
+        return first, max(first, stop)
+
+    def _searchable_packages(self):
+        # Números de los paquetes que el decodificador acepta (cabecera completa, CRC32
+        # correcto y con muestras). El CRC32 solo se calcula en los paquetes cuyo tiempo
+        # no sigue el orden de sus vecinos, que son los que pueden romper la búsqueda.
+        if self._searchable is None:
+            packages = self.packages[:min(len(self), self.package_count)]
+            starts = packages['start'].astype(np.int64)
+            ends = packages['end'].astype(np.int64)
+            usable = (packages['size'] >= PACKAGE_HEADER_STRUCT.size) & \
+                ((packages['acc'] > 0) | (packages['gyr'] > 0) | (packages['temp'] > 0) | (packages['hr'] > 0))
+            disordered = (starts[1:] < starts[:-1]) | (ends[1:] < ends[:-1])
+            suspicious = starts > ends
+            suspicious[1:] |= disordered
+            suspicious[:-1] |= disordered
+            check = np.flatnonzero(usable & suspicious)
+            usable[check] = self.package_crcs(check) == packages['crc32'][check]
+            self._searchable = np.flatnonzero(usable)
+        return self._searchable
+
+    def package_crcs(self, numbers):
+        """CRC32 of packages ``numbers`` as the decoder computes it (from the 'start' field on)."""
+        fileData = memoryview(self._mmap)
+        offsets = self.packages['offset'][numbers].astype(np.int64)
+        crcStart = offsets + len(PACKAGE_HEARD_KEY) + 4
+        crcEnd = np.maximum(offsets + self.packages['size'][numbers], crcStart)
+        crc = np.fromiter((binascii.crc32(fileData[a:b]) for a, b in zip(crcStart.tolist(), crcEnd.tolist())),
+                          dtype=np.uint32, count=len(offsets))
+        del fileData
+        return crc
+
+    def decoded_packages(self, start=None, end=None, meter=None):
+        """Iterate ``(j, package)`` over the packages overlapping ``[start, end]``, decoded as by ``bin2csv``."""
+        first, stop = self.package_range(start, end)
+        return _iter_decoded_packages(self, first, stop, _last_usable_end(self, first), meter)
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_zstd(path, mode='rb'):
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError('reading .zst files needs zstandard: pip install zstandard')
+    return zstandard.ZstdDecompressor().stream_reader(open(path, mode), read_size=READ_BUFFER_SIZE,
+                                                      read_across_frames=True)
 
-            endRecnizOffset = allFileDataBuff.index(
-
-
-                PACKAGE_HEARD_KEY, 1)
-
-
-            onePackageData.extend(
-
-
-                allFileDataBuff[0:endRecnizOffset])
-
-
-            debugInfo('endRecnizOffset:'+str(endRecnizOffset) +
 
+# Archivos .BIN comprimidos: se descomprimen como un flujo, sin archivo temporal
+COMPRESSED_BIN_OPENERS = {'.gz': gzip.open, '.xz': lzma.open, '.zst': _open_zstd}
 
-                      ' allFileDataBuff size:'+str(len(allFileDataBuff)))
 
+def _compressed_bin(bin_file):
+    return os.path.splitext(str(bin_file))[1].lower() in COMPRESSED_BIN_OPENERS
 
-            return endRecnizOffset
 
+def _open_bin_stream(bin_file):
+    """Open a .BIN file for sequential reading, decompressing .gz/.xz/.zst files on the fly."""
+    opener = COMPRESSED_BIN_OPENERS.get(os.path.splitext(str(bin_file))[1].lower())
+    if opener is None:
+        return open(bin_file, 'rb')
+    return opener(bin_file, 'rb')
 
-        except:
 
+class _WPMBinStream:
+    """Sequential counterpart of ``WPMBinIndex`` for files without random access (compressed)."""
 
-            if getDataLen == 0:
+    def __init__(self, bin_file):
+        self.bin_file = str(bin_file)
+        self._file = _open_bin_stream(self.bin_file)
+        fileHeader = _parse_file_header(self._file.read(DATA_OFFSET))
+        if fileHeader is None:
+            self.close()
+            raise ValueError(f'{self.bin_file}: not a MATRIX .BIN file')
+        self.remarks, self.package_count, self.acc_range, self.gyro_range = fileHeader
 
+    def decoded_packages(self, start=None, end=None, meter=None):
+        if start is not None or end is not None:
+            raise ValueError(f'{self.bin_file}: time ranges need random access, decompress the file first')
+        return _decode_packages(itertools.islice(_iter_package_buffers(self._file), self.package_count),
+                                meter=meter)
 
-                onePackageData.extend(allFileDataBuff[0:])
+    def close(self):
+        self._file.close()
 
+    def __enter__(self):
+        return self
 
-                debugInfo('getDataLen == 0')
+    def __exit__(self, *exc):
+        self.close()
 
 
-                break
+class _WPMBinMerge:
+    """Several .BIN files of one device read as a single recording, in time order.
 
+    The files are sorted by the timestamp of their first decodable package. Each one is
+    decoded as by ``bin2csv``; the packages at the start of a file that do not begin
+    after the last row already yielded (the overlap with the previous file, or a copy of
+    it) are dropped. Package numbers run on across the files in that order.
+    """
 
+    def __init__(self, bin_files, meter=None):
+        self.bin_file = [str(bin_file) for bin_file in bin_files]
+        self._meter = meter
+        self._sources = []
+        try:
+            for bin_file in self.bin_file:
+                self._sources.append(_open_wpm_source(bin_file))
+            ranges = {(source.acc_range, source.gyro_range) for source in self._sources}
+            if len(ranges) > 1:
+                raise ValueError(f'{self.bin_file}: the files have different acc/gyro ranges {sorted(ranges)}')
+            # Se decodifica el primer paquete de cada archivo para ordenarlos
+            self._first = []
+            self._peeked = []
+            for source in self._sources:
+                before = _meter_counts(meter)
+                packages = source.decoded_packages(meter=meter)
+                first = next(packages, None)
+                self._first.append((first[1]['dateTime'][0] if first else np.inf, first, packages))
+                self._peeked.append(tuple(a - b for a, b in zip(_meter_counts(meter), before)))
+        except Exception:
+            self.close()
+            raise
+        self._order = sorted(range(len(self._sources)), key=lambda k: self._first[k][0])
+        first = self._sources[self._order[0]] if self._sources else None
+        self.remarks = first.remarks if first else ''
+        self.acc_range, self.gyro_range = ranges.pop() if ranges else (0, 0)
+        self.package_count = sum(source.package_count for source in self._sources)
+
+    def decoded_packages(self, start=None, end=None, meter=None):
+        """Iterate ``(j, package)`` over the files in time order (see ``WPMBinIndex.decoded_packages``).
+
+        The packages are counted in the ``meter`` given when the files were opened.
+        """
+        meter = self._meter
+        lastTimestamp = -np.inf
+        offset = 0
+        for k in self._order:
+            source = self._sources[k]
+            if start is None and end is None:
+                _, first, packages = self._first[k]
+                packages = itertools.chain([first], packages) if first else packages
             else:
+                # Los paquetes leídos al ordenar se vuelven a decodificar: no se cuentan dos veces
+                if meter is not None:
+                    meter.add(*(-n for n in self._peeked[k]))
+                packages = source.decoded_packages(start, end, meter)
+            overlap = True
+            for j, package in packages:
+                # 去掉与上一个文件重叠的包
+                if overlap and package['dateTime'][0] <= lastTimestamp:
+                    if meter is not None:
+                        meter.packages_decoded -= 1
+                        meter.packages_skipped += 1
+                    continue
+                overlap = False
+                lastTimestamp = max(lastTimestamp, package['dateTime'][-1])
+                yield offset + j, package
+            offset += source.package_count
+
+    def close(self):
+        for source in self._sources:
+            source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_wpm_source(bin_file, meter=None):
+    # WPMBinIndex si el archivo admite acceso aleatorio, si no un flujo; una lista de archivos se une
+    if isinstance(bin_file, (list, tuple)):
+        return _WPMBinMerge(bin_file, meter)
+    return _WPMBinStream(bin_file) if _compressed_bin(bin_file) else WPMBinIndex(bin_file)
+
+
+def _missing_bin_file(bin_file):
+    # Primer archivo que no existe (de una lista o un solo .BIN), None si están todos
+    for path in (bin_file if isinstance(bin_file, (list, tuple)) else [bin_file]):
+        if not os.path.exists(path):
+            return str(path)
+    return None
+
+
+def wpm_bin_info(bin_file):
+    """Summary of a .BIN file read from the file header and the package headers only.
+
+    The packages are found hopping from one header to the next (see ``WPMBinIndex``)
+    and no index file is written. No payload is decoded, so the counts are those
+    announced by the headers of the first ``headerPackeNum`` packages, leaving out the
+    packages whose payload size does not match them (the decoder drops those, e.g. a
+    corrupt count field). The CRC32 is only checked to take the first and last
+    timestamps from valid packages among the rest.
+
+    Args:
+        bin_file (str): Path to the .BIN file.
+
+    Returns:
+        dict: 'remarks', 'headerPackeNum', 'packages' (found in the file), 'acc_range',
+        'gyro_range', 'first_timestamp' and 'last_timestamp' (epoch seconds of the first
+        and last packages with a complete header and a valid CRC32, None without them),
+        'sample_rate' (nominal Hz per channel, the median over the packages),
+        'sample_counts' (per channel) and 'skipped_packages' (left out of the counts).
+
+    Raises:
+        ValueError: If the file is not a MATRIX .BIN file.
+    """
+    with WPMBinIndex(bin_file, sidecar=False, hop_headers=True) as index:
+        packages = index.packages[:index.package_count]
+        duration = packages['end'].astype(np.int64) - packages['start'].astype(np.int64)
+        counts = _decodable_counts(packages)
+        decodable = counts.max(axis=1, initial=0) > 0
+        timed = decodable & (duration > 0)
+
+        def first_valid(numbers):
+            for j in numbers.tolist():
+                if index.package_crcs([j])[0] == packages['crc32'][j]:
+                    return j
+            return None
+
+        numbers = np.flatnonzero(decodable)
+        first, last = first_valid(numbers), first_valid(numbers[::-1])
+        info = {'remarks': index.remarks, 'headerPackeNum': index.package_count, 'packages': len(index),
+                'acc_range': index.acc_range, 'gyro_range': index.gyro_range,
+                'first_timestamp': None if first is None else int(packages['start'][first]),
+                'last_timestamp': None if last is None else int(packages['end'][last]),
+                'sample_rate': {}, 'sample_counts': {}, 'skipped_packages': int((~decodable).sum())}
+        for name, column in zip(WPM_CHANNELS, counts.T):
+            info['sample_counts'][name] = int(column.sum())
+            info['sample_rate'][name] = float(np.median(column[timed] / duration[timed])) if timed.any() else None
+    return info
+
+
+# Separación máxima (s) entre el final de un paquete y el inicio del siguiente
+GAP_SECONDS = 1
+
+
+def validate_wpm_bin(bin_file, gap_seconds=GAP_SECONDS):
+    """Check the packages of a .BIN file without decoding their data.
+
+    ``bin2csv`` silently drops the packages it can not decode. This pass finds them
+    from the package index: the header fields are checked as whole arrays and only the
+    CRC32 is computed package by package, over the memory-mapped file.
+
+    Args:
+        bin_file (str): Path to the .BIN file (not compressed).
+        gap_seconds (float): Report the time between two decodable packages when it is
+            longer than this. Defaults to GAP_SECONDS.
+
+    Returns:
+        dict: 'headerPackeNum' and 'packages' as in ``wpm_bin_info``; 'ignored_packages'
+        (found after the first headerPackeNum ones); the package numbers of the
+        'truncated' (shorter than a header), 'crc_failures', 'size_mismatches' (payload
+        size does not match the sample counts), 'empty' (no samples) and 'duplicates'
+        (equal to the previous package) ones; 'timestamp_regressions' and 'gaps', lists
+        of ``{'package', 'previous_end', 'start', 'seconds'}``; 'sample_counts', how many
+        packages carry each number of samples per channel; 'decoded_packages' and 'valid'
+        (no package dropped and no regression).
+
+    Raises:
+        ValueError: If the file is compressed or is not a MATRIX .BIN file.
+    """
+    if _compressed_bin(bin_file):
+        raise ValueError(f'{bin_file}: validation needs random access, decompress the file first')
+    with WPMBinIndex(bin_file) as index:
+        limit = min(len(index), index.package_count)
+        packages = index.packages[:limit]
+        sizes = packages['size']
+        truncated = sizes < PACKAGE_HEADER_STRUCT.size
+        # 检查CRC32
+        crc = index.package_crcs(np.arange(limit))
+        crcFailures = ~truncated & (crc != packages['crc32'])
+        counts = np.stack([packages[name].astype(np.int64) for name in ('acc', 'gyr', 'temp', 'hr')], axis=1)
+        widths = np.array([ACC_GYRO_CHANNELS, ACC_GYRO_CHANNELS, TEMPER_HEART_CHANNELS, TEMPER_HEART_CHANNELS])
+        empty = ~truncated & ~crcFailures & (counts.max(axis=1, initial=0) <= 0)
+        payloadSize = sizes - PACKAGE_HEADER_STRUCT.size
+        sizeMismatches = ~truncated & ~crcFailures & ~empty & \
+            (payloadSize != (counts * widths).sum(axis=1) * RAW_SAMPLE_DTYPE.itemsize)
+        # 解决最后一包数据可能重复的问题: solo se comparan los bytes de los candidatos
+        candidates = np.flatnonzero((sizes[1:] == sizes[:-1]) & (packages['crc32'][1:] == packages['crc32'][:-1])) + 1
+        duplicates = np.zeros(limit, dtype=bool)
+        duplicates[[j for j in candidates.tolist() if index.package_bytes(j) == index.package_bytes(j - 1)]] = True
+        decoded = np.flatnonzero(~(truncated | crcFailures | empty | sizeMismatches | duplicates))
+        starts = packages['start'][decoded].astype(np.int64)
+        ends = packages['end'][decoded].astype(np.int64)
+        steps = starts[1:] - ends[:-1]
+
+        def events(mask):
+            return [{'package': int(decoded[k + 1]), 'previous_end': int(ends[k]), 'start': int(starts[k + 1]),
+                     'seconds': int(steps[k])} for k in np.flatnonzero(mask).tolist()]
+
+        report = {'headerPackeNum': index.package_count, 'packages': len(index),
+                  'ignored_packages': len(index) - limit,
+                  'truncated': np.flatnonzero(truncated).tolist(),
+                  'crc_failures': np.flatnonzero(crcFailures).tolist(),
+                  'size_mismatches': np.flatnonzero(sizeMismatches).tolist(),
+                  'empty': np.flatnonzero(empty).tolist(),
+                  'duplicates': np.flatnonzero(duplicates).tolist(),
+                  'timestamp_regressions': events((steps < 0) | (ends[1:] < starts[1:])),
+                  'gaps': events(steps > gap_seconds),
+                  'sample_counts': {},
+                  'decoded_packages': len(decoded)}
+        for name, column in zip(WPM_CHANNELS, counts[decoded].T):
+            values, frequency = np.unique(column, return_counts=True)
+            report['sample_counts'][name] = dict(zip(map(str, values.tolist()), frequency.tolist()))
+    report['valid'] = not (report['truncated'] or report['crc_failures'] or report['size_mismatches']
+                           or report['empty'] or report['timestamp_regressions'])
+    return report
+
+
+def _epoch_seconds(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+@lru_cache(maxsize=None)
+def _acc_gyro_values(range):
+    # Los mismos números que se leen del CSV (redondeados a 8 decimales)
+    return _acc_gyro_strings(range).astype(np.float64)
+
+
+def _package_header(onePackageData):
+    """Start/end seconds and sample counts of a package ``bin2csv`` decodes, or None if
+    the header is incomplete, the CRC32 check fails or the package has no samples."""
+    if len(onePackageData) < PACKAGE_HEADER_STRUCT.size:
+        return None
+    (recString, crc32, itermStartTimeStamp, itermEndTimeStamp, *sampleCounts) = \
+        PACKAGE_HEADER_STRUCT.unpack_from(onePackageData)
+    # 检查CRC32
+    if binascii.crc32(memoryview(onePackageData)[len(recString)+4:]) != crc32:
+        return None
+    if max(sampleCounts) <= 0:
+        return None
+    return itermStartTimeStamp, itermEndTimeStamp, tuple(sampleCounts)
+
+
+def _decodable_counts(packages):
+    """Sample counts (n x 4: acc, gyr, temp, hr) of index ``packages``, zero for those the
+    decoder drops by their size: shorter than a header, or with a payload that does not
+    match the counts (as when a corrupt header announces more samples than it holds)."""
+    counts = np.stack([packages[name].astype(np.int64) for name in ('acc', 'gyr', 'temp', 'hr')], axis=1)
+    widths = np.array([ACC_GYRO_CHANNELS, ACC_GYRO_CHANNELS, TEMPER_HEART_CHANNELS, TEMPER_HEART_CHANNELS])
+    payloadSize = packages['size'] - PACKAGE_HEADER_STRUCT.size
+    counts[payloadSize != (counts * widths).sum(axis=1) * RAW_SAMPLE_DTYPE.itemsize] = 0
+    return counts
+
+
+def _last_usable_end(index, j):
+    """``tempTimesStamp`` seen by package ``j``: end second of the last decodable package before it."""
+    for k in range(j - 1, -1, -1):
+        onePackageData = index.package_bytes(k)
+        if k > 0 and onePackageData == index.package_bytes(k - 1):
+            continue
+        if _package_header(onePackageData) is not None:
+            return int(index.packages['end'][k])
+    return 0
 
 
-                continue
-
-
-
-
-
-def bin2csv(bin_file, csv_file):  # 建立一个任务线程类:  # 在启动线程后任务从这个函数里面开始执行
-
-
-    tempTimesStamp = 0
-
-
-    csvFileHeadDict = dfCsvFileHeadDict_
-
-
-    onePackageData = bytearray()
-
-
-    allFileDataBuff = bytearray()
-
-
-    readFileQueue = Queue(maxsize=0)
-
-
-    debugInfo('saveFile:'+csv_file)
-
-
-    if os.path.exists(bin_file) == False:
+# Progreso de una conversión: cada cuánto (s) se llama a progress_callback
+PROGRESS_INTERVAL = 1.0
 
 
-        print('bin2csv: ' + bin_file + ': No such file or directory')
+class _ProgressMeter:
+    """Bytes and packages processed by a conversion, reported to ``callback`` as a dict
+    at most once every ``interval`` seconds (see ``metrics``)."""
 
+    def __init__(self, callback=None, interval=PROGRESS_INTERVAL, total_bytes=None):
+        self.callback = callback
+        self.interval = interval
+        self.total_bytes = total_bytes
+        self.bytes_read = self.packages_decoded = self.packages_skipped = 0
+        self._start = time.monotonic()
+        self._nextReport = self._start + interval
 
-        return 1
+    def package(self, size, decoded):
+        self.bytes_read += size
+        if decoded:
+            self.packages_decoded += 1
+        else:
+            self.packages_skipped += 1
+        if self.callback is not None and time.monotonic() >= self._nextReport:
+            self.report()
+
+    def add(self, bytes_read, packages_decoded, packages_skipped):
+        self.bytes_read += bytes_read
+        self.packages_decoded += packages_decoded
+        self.packages_skipped += packages_skipped
+        if self.callback is not None and time.monotonic() >= self._nextReport:
+            self.report()
+
+    def metrics(self, done=False):
+        """'bytes_read', 'total_bytes' (None if unknown, e.g. compressed input),
+        'packages_decoded', 'packages_skipped', 'elapsed_s', 'mb_per_s' (MiB of .BIN
+        data per second), 'eta_s' (None if unknown) and 'done'."""
+        elapsed = time.monotonic() - self._start
+        rate = self.bytes_read / elapsed if elapsed > 0 else 0.0
+        if done:
+            eta = 0.0
+        elif self.total_bytes is None or rate == 0:
+            eta = None
+        else:
+            eta = round(max(0, self.total_bytes - self.bytes_read) / rate, 1)
+        return {'bytes_read': self.bytes_read, 'total_bytes': self.total_bytes,
+                'packages_decoded': self.packages_decoded, 'packages_skipped': self.packages_skipped,
+                'elapsed_s': round(elapsed, 3), 'mb_per_s': round(rate / (1024*1024), 3), 'eta_s': eta,
+                'done': done}
 
+    def report(self, done=False):
+        if self.callback is not None:
+            self.callback(self.metrics(done))
+        self._nextReport = time.monotonic() + self.interval
 
-    _thread.start_new_thread(ReadFileThread, (bin_file, readFileQueue))
 
+def _meter_counts(meter):
+    return (0, 0, 0) if meter is None else (meter.bytes_read, meter.packages_decoded, meter.packages_skipped)
 
-    time.sleep(1)
 
+def _progress_meter(progress_callback, progress_interval):
+    # Sin callback no se cuenta nada: el bucle de decodificación no paga nada
+    return None if progress_callback is None else _ProgressMeter(progress_callback, progress_interval)
 
-    if readFileQueue.empty() == True:
 
+def _source_bytes(source, start=None, end=None):
+    """Bytes of package data ``source.decoded_packages(start, end)`` reads, None if unknown."""
+    if isinstance(source, WPMBinIndex):
+        first, stop = source.package_range(start, end)
+        return int(source.packages['size'][first:stop].sum())
+    if isinstance(source, _WPMBinMerge):
+        sizes = [_source_bytes(part, start, end) for part in source._sources]
+        return None if None in sizes else sum(sizes)
+    return None
 
-        debugInfo('file queue is empty')
 
+def _decode_packages(onePackages, first=0, tempTimesStamp=0, temptemp=None, meter=None):
+    """Yield ``(j, package)`` for every raw package in ``onePackages`` that ``bin2csv`` writes.
 
+    Repeated packages and packages with a bad header, CRC or payload size are skipped,
+    and the one second start correction is applied. Each package is the dict of
+    ``decode_package_payload`` plus its 'dateTime' column. ``first``, ``tempTimesStamp``
+    and ``temptemp`` carry the state of the packages before ``onePackages``; every raw
+    package is counted in ``meter`` (a ``_ProgressMeter``) if one is given.
+    """
+    for j, onePackageData in enumerate(onePackages, first):
+        # 解决最后一包数据可能重复的问题
+        if onePackageData == temptemp:
+            if meter is not None:
+                meter.package(len(onePackageData), False)
+            continue
+        temptemp = onePackageData
+        package, tempTimesStamp = _decode_package(onePackageData, tempTimesStamp)
+        if meter is not None:
+            meter.package(len(onePackageData), package is not None)
+        if package is not None:
+            yield j, package
+
+
+def _decode_package(onePackageData, tempTimesStamp):
+    """Decode one raw package; returns ``(package or None, tempTimesStamp for the next one)``."""
+    header = _package_header(onePackageData)
+    if header is None:
+        return None, tempTimesStamp
+    itermStartTimeStamp, itermEndTimeStamp, sampleCounts = header
+    maxCount = max(sampleCounts)
+    # 预处理秒误差
+    if itermStartTimeStamp - tempTimesStamp >= 1 and tempTimesStamp != 0:
+        itermStartTimeStamp -= 1
+    package = decode_package_payload(memoryview(onePackageData)[PACKAGE_HEADER_STRUCT.size:], sampleCounts)
+    if package is None:
+        return None, itermEndTimeStamp
+    package['dateTime'] = package_timestamps(itermStartTimeStamp, itermEndTimeStamp, maxCount)
+    return package, itermEndTimeStamp
+
+
+def _iter_decoded_packages(index, first=0, stop=None, tempTimesStamp=0, meter=None):
+    """``_decode_packages`` over the first ``package_count`` packages of ``index``.
+
+    ``first``/``stop`` restrict the packages to decode; ``tempTimesStamp`` must then be
+    ``_last_usable_end(index, first)`` so the correction matches a full conversion.
+    """
+    limit = min(len(index), index.package_count)
+    stop = limit if stop is None else min(stop, limit)
+    temptemp = index.package_bytes(first - 1) if 0 < first <= limit else None
+    return _decode_packages((index.package_bytes(j) for j in range(first, stop)), first, tempTimesStamp,
+                            temptemp, meter)
+
+
+# 多进程解码: 每个进程处理一段连续的包
+PARALLEL_CHUNK_PACKAGES = 2048
+_workerIndex = None
+_workerMeter = None
+
+
+def _init_worker(index):
+    global _workerIndex
+    _workerIndex = index
+
+
+def _metered_chunk(chunkFunction, first, stop, tempTimesStamp):
+    # Los contadores de cada trozo vuelven al proceso principal junto con el resultado
+    global _workerMeter
+    _workerMeter = _ProgressMeter()
+    result = chunkFunction(first, stop, tempTimesStamp)
+    return result, (_workerMeter.bytes_read, _workerMeter.packages_decoded, _workerMeter.packages_skipped)
+
+
+def _map_package_chunks(index, workers, chunkFunction, first=0, stop=None, meter=None):
+    """Run ``chunkFunction(first, stop, tempTimesStamp)`` over contiguous package chunks
+    of ``first:stop`` in a pool of ``workers`` processes and yield the results in package order.
+
+    The packages decoded by each chunk are added to ``meter`` as its result arrives."""
+    limit = min(len(index), index.package_count)
+    stop = limit if stop is None else min(stop, limit)
+    chunkSize = max(1, min(-(-(stop - first) // (workers * 4)), PARALLEL_CHUNK_PACKAGES))
+    chunks = [(chunkFirst, min(chunkFirst + chunkSize, stop), _last_usable_end(index, chunkFirst))
+              for chunkFirst in range(first, stop, chunkSize)]
+    if not chunks:
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index,)) as pool:
+        for result, counts in pool.map(partial(_metered_chunk, chunkFunction), *zip(*chunks)):
+            if meter is not None:
+                meter.add(*counts)
+            yield result
+
+
+def _csv_chunk(first, stop, tempTimesStamp, channels=None):
+    index = _workerIndex
+    return ''.join(package_csv_text(package, index.acc_range, index.gyro_range, index.remarks if j == 0 else '',
+                                    channels)
+                   for j, package in _iter_decoded_packages(index, first, stop, tempTimesStamp, _workerMeter)
+                   ).encode('utf-8')
+
+
+def _npz_chunk(first, stop, tempTimesStamp, channels=None):
+    index = _workerIndex
+    columns = _empty_columns(int(_decodable_counts(index.packages[first:stop]).max(axis=1, initial=0).sum()),
+                             _parse_channels(channels))
+    row = 0
+    for j, package in _iter_decoded_packages(index, first, stop, tempTimesStamp, _workerMeter):
+        row = _fill_package_columns(columns, row, package, index.acc_range, index.gyro_range)
+    return {name: values[:row] for name, values in columns.items()}
+
+
+WPM_CHANNELS = ('acc', 'gyr', 'temps', 'hr')
+
+
+def _parse_channels(channels):
+    # 'all', 'acc+gyr' o una lista de nombres -> tupla ordenada como WPM_CHANNELS
+    if channels is None or channels == 'all':
+        return WPM_CHANNELS
+    if isinstance(channels, str):
+        channels = channels.split('+')
+    unknown = set(channels) - set(WPM_CHANNELS)
+    if unknown:
+        raise ValueError(f'Unknown channels {sorted(unknown)}, expected some of {WPM_CHANNELS}')
+    return tuple(name for name in WPM_CHANNELS if name in channels)
+
+
+# Columnas de csvFileHead de cada canal
+CHANNEL_COLUMNS = {'acc': csvFileHead[0][1:4], 'gyr': csvFileHead[0][4:7],
+                   'temps': csvFileHead[0][7:9], 'hr': csvFileHead[0][9:11]}
+
+
+def csv_file_head(channels='all'):
+    """Columns of the CSV written with ``channels``: 'dateTime', those of each channel and 'remarks'."""
+    return [csvFileHead[0][0]] + [column for name in _parse_channels(channels)
+                                  for column in CHANNEL_COLUMNS[name]] + [csvFileHead[0][-1]]
+
+
+def _empty_columns(rowCount, channels=WPM_CHANNELS):
+    widths = {name: len(columns) for name, columns in CHANNEL_COLUMNS.items()}
+    columns = {'dateTime': np.zeros(rowCount, dtype=np.int64)}
+    for name in channels:
+        columns[name] = np.full((rowCount, widths[name]), np.nan)
+    return columns
+
+
+def _fill_package_columns(columns, row, package, accRange, gyroRange):
+    # Copia un paquete decodificado en las columnas a partir de la fila 'row'
+    dateTime = package['dateTime']
+    columns['dateTime'][row:row + len(dateTime)] = dateTime
+    if 'acc' in columns:
+        columns['acc'][row + package['acc_index']] = \
+            _acc_gyro_values(accRange)[package['acc'].astype(np.intp) + 0x8000]
+    if 'gyr' in columns:
+        columns['gyr'][row + package['gyr_index']] = \
+            _acc_gyro_values(gyroRange)[package['gyr'].astype(np.intp) + 0x8000]
+    if 'temps' in columns:
+        columns['temps'][row + package['temp_index']] = package['temp'] / 10
+    if 'hr' in columns:
+        columns['hr'][row + package['hr_index']] = package['hr']
+    return row + len(dateTime)
+
+
+def iter_wpm_packages(bin_file, channels='all', packages_per_batch=1, start=None, end=None):
+    """Iterate over the decoded packages of a .BIN file with bounded memory.
+
+    Packages are decoded as by ``bin2csv`` (same skipped packages and timestamps) and
+    yielded as dicts of NumPy arrays laid out like ``bin2npz``: 'dateTime' (int64, ms)
+    plus the requested channels, with NaN in rows a slower sensor does not reach.
+
+    Args:
+        bin_file (str or list): Path to the .BIN file, possibly compressed (see
+            ``bin2csv``; time ranges need an uncompressed file), or a list of .BIN files
+            of one device, merged in time order as by ``bin2csv``.
+        channels (str or list): 'all' (default), a '+'-separated string such as
+            'acc+gyr', or a list with some of 'acc', 'gyr', 'temps' and 'hr'.
+        packages_per_batch (int): Number of packages joined in each yielded block.
+        start, end (datetime or float): Only decode the packages overlapping this time
+            range (see ``WPMBinIndex.package_range``). Defaults to the whole recording.
+
+    Yields:
+        dict: One block of rows per package or batch of packages.
+    """
+    channels = _parse_channels(channels)
+    with _open_wpm_source(bin_file) as source:
+        yield from _package_batches(source.decoded_packages(start, end), source.acc_range, source.gyro_range,
+                                    channels, packages_per_batch)
+
+
+def _package_batches(decodedPackages, accRange, gyroRange, channels, packages_per_batch):
+    batch = []
+    for j, package in decodedPackages:
+        batch.append(package)
+        if len(batch) >= packages_per_batch:
+            yield _package_block(batch, accRange, gyroRange, channels)
+            batch = []
+    if batch:
+        yield _package_block(batch, accRange, gyroRange, channels)
+
+
+def _package_block(batch, accRange, gyroRange, channels):
+    columns = _empty_columns(sum(len(package['dateTime']) for package in batch), channels)
+    row = 0
+    for package in batch:
+        row = _fill_package_columns(columns, row, package, accRange, gyroRange)
+    return columns
+
+
+def bin2npz(bin_file, npz_file, workers=1, start=None, end=None, native=False, raw=False, channels='all',
+            progress_callback=None, progress_interval=PROGRESS_INTERVAL):
+    """Convert a MATRIX .BIN file into a NumPy .npz archive, skipping the CSV text step.
+
+    The archive holds the same rows and numbers as the CSV written by ``bin2csv``:
+    'dateTime' (int64, ms), 'acc' and 'gyr' (float64, n x 3), 'temps'
+    (bodySurface_temp, ambient_temp) and 'hr' (hr_raw, hr) as float64 n x 2 arrays, with
+    NaN where the CSV has an empty field, plus 'remarks', 'acc_range' and 'gyro_range'.
+    ``file_management.load_WPM_data`` loads it like a CSV.
+
+    With ``native=True`` every sensor keeps its own rate instead: 'acc', 'gyr', 'temps'
+    and 'hr' only hold real samples, each with its own '<name>_dateTime' timestamps and
+    '<name>_row' (the CSV row it would be written in), plus 'rows' for the CSV row count.
+    ``raw=True`` uses the native layout with the int16 counts of the payload (temperatures
+    in tenths of a degree) and 'raw' set; ``acc_gyro_from_counts`` turns them into the
+    numbers of the CSV with 'acc_range'/'gyro_range'.
+
+    ``channels`` leaves the arrays of the other sensors out of the archive; the rows and
+    'dateTime' do not change.
+
+    Args:
+        bin_file (str or list): Path to the input .BIN file, possibly compressed, or a
+            list of .BIN files merged in time order (see ``bin2csv``).
+        npz_file (str): Path to the output .npz file.
+        workers (int): Number of processes decoding the file in parallel. Defaults to 1.
+        start, end (datetime or float): Only decode the packages overlapping this time
+            range (see ``WPMBinIndex.package_range``). Defaults to the whole recording.
+        native (bool): Store every sensor at its native rate. Defaults to False.
+        raw (bool): Store the raw int16 counts at their native rate. Defaults to False.
+        channels (str or list): Sensors to store, as in ``iter_wpm_packages``. Defaults
+            to 'all'.
+        progress_callback (callable): Called with the metrics dict of the conversion
+            every ``progress_interval`` seconds and once more at the end (see ``bin2csv``).
+        progress_interval (float): Seconds between progress reports.
+
+    Returns:
+        int: 0 on success, 1 if the .BIN file can not be read.
+    """
+    if _missing_bin_file(bin_file):
+        print('bin2npz: ' + _missing_bin_file(bin_file) + ': No such file or directory')
         return 1
-
-
-    csv_file_remove(csv_file)
-
-
-    csv_write_heard(csv_file, csvFileHead)
-
-
-
-
-
-    startReadQueueCount = QUEUE_ONE_ITERM_BYTE_SIZE
-
-
-    while True:
-
-
-        allFileDataBuff.extend(readFileQueue.get(True, 5))
-
-
-        if startReadQueueCount > REMARKES_SIZE:
-
-
-            break
-
-
-        startReadQueueCount += QUEUE_ONE_ITERM_BYTE_SIZE
-
-
-    # 解析remarkes
-
-
-    remarkesString = ''
-
-
+    if isinstance(bin_file, (list, tuple)) and workers > 1:
+        raise ValueError('bin2npz: workers need a single .BIN file, a list is merged in one process')
+    channels = _parse_channels(channels)
+    meter = _progress_meter(progress_callback, progress_interval)
     try:
-
-
-        sFileRemarkes = struct.Struct(str(REMARKES_SIZE)+'s')
-
-
-        (remarkes,) = sFileRemarkes.unpack(
-
-
-            allFileDataBuff[0:sFileRemarkes.size])
-
-
-        allFileDataBuff = allFileDataBuff[sFileRemarkes.size:]
-
-
-        remarkesString = remarkes.decode('utf-8', 'ignore')            
-
-
-        if '\0' in remarkesString:
-
-
-            findEnd = remarkesString.index('\0')
-
-
-            remarkesString = remarkesString[0:findEnd]
-
-
+        index = _open_wpm_source(bin_file, meter)
+    except ValueError as e:
+        debugInfo(str(e))
+        return 1
+    with index:
+        if meter is not None:
+            meter.total_bytes = _source_bytes(index, start, end)
+        header = {'remarks': np.array(index.remarks), 'acc_range': index.acc_range, 'gyro_range': index.gyro_range}
+        if raw:
+            if workers > 1 and isinstance(index, WPMBinIndex):
+                parts = list(_map_package_chunks(index, workers, partial(_raw_chunk, channels=channels),
+                                                 *index.package_range(start, end), meter))
+            else:
+                parts = [_raw_columns(index.decoded_packages(start, end, meter), channels)]
+            np.savez(npz_file, **_join_raw_columns(parts, channels), raw=True, **header)
+        elif not isinstance(index, WPMBinIndex):
+            # Sin índice no se conoce el número de filas: se juntan los bloques al final
+            blocks = list(_package_batches(index.decoded_packages(start, end, meter), index.acc_range,
+                                           index.gyro_range, channels, PARQUET_BATCH_PACKAGES)) \
+                or [_empty_columns(0, channels)]
+            columns = {name: np.concatenate([block[name] for block in blocks]) for name in blocks[0]}
+            np.savez(npz_file, **(_native_columns(columns) if native else columns), **header)
         else:
+            _index_to_npz(index, npz_file, workers, start, end, native, channels, header, meter)
+    if meter is not None:
+        meter.report(done=True)
+    return 0
 
 
-            remarkesString += '\0'
-
-
-        debugInfo('remarkes:'+remarkesString)
-
-
-    except:
-
-
-        debugInfo('unpack remarkes faile')
-
-
+def _index_to_npz(index, npz_file, workers, start, end, native, channels, header, meter):
+    # Con índice se conoce de antemano el número máximo de filas (solo de los paquetes decodificables)
+    first, stop = index.package_range(start, end)
+    sampleCounts = _decodable_counts(index.packages[first:stop])
+    columns = _empty_columns(int(sampleCounts.max(axis=1, initial=0).sum()), channels)
+    row = 0
+    if workers > 1:
+        for chunk in _map_package_chunks(index, workers, partial(_npz_chunk, channels=channels), first, stop, meter):
+            rowCount = len(chunk['dateTime'])
+            for name, values in chunk.items():
+                columns[name][row:row + rowCount] = values
+            row += rowCount
+    else:
+        for j, package in _iter_decoded_packages(index, first, stop, _last_usable_end(index, first), meter):
+            row = _fill_package_columns(columns, row, package, index.acc_range, index.gyro_range)
+    columns = {name: values[:row] for name, values in columns.items()}
+    if native:
+        columns = _native_columns(columns)
+    np.savez(npz_file, **columns, **header)
+
+
+def _raw_columns(decodedPackages, channels=WPM_CHANNELS):
+    # Los bloques int16 de cada paquete se copian tal cual, cada sensor con sus filas
+    blocks = dict(zip(WPM_CHANNELS, ('acc', 'gyr', 'temp', 'hr')))
+    parts = {name: ([np.empty((0, len(CHANNEL_COLUMNS[name])), dtype=RAW_SAMPLE_DTYPE)],
+                    [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]) for name in channels}
+    row = 0
+    for j, package in decodedPackages:
+        for name, (values, dateTimes, rows) in parts.items():
+            index = package[blocks[name] + '_index']
+            values.append(package[blocks[name]])
+            dateTimes.append(package['dateTime'][index])
+            rows.append(row + index)
+        row += len(package['dateTime'])
+    columns = {'rows': row}
+    for name, (values, dateTimes, rows) in parts.items():
+        columns[name] = np.concatenate(values)
+        columns[name + '_dateTime'] = np.concatenate(dateTimes)
+        columns[name + '_row'] = np.concatenate(rows)
+    return columns
+
+
+def _raw_chunk(first, stop, tempTimesStamp, channels=WPM_CHANNELS):
+    return _raw_columns(_iter_decoded_packages(_workerIndex, first, stop, tempTimesStamp, _workerMeter), channels)
+
+
+def _join_raw_columns(parts, channels=WPM_CHANNELS):
+    rowOffsets = np.cumsum([0] + [part['rows'] for part in parts])
+    columns = {'rows': int(rowOffsets[-1])}
+    for name in channels:
+        columns[name] = np.concatenate([part[name] for part in parts])
+        columns[name + '_dateTime'] = np.concatenate([part[name + '_dateTime'] for part in parts])
+        columns[name + '_row'] = np.concatenate([part[name + '_row'] + offset
+                                                 for part, offset in zip(parts, rowOffsets)])
+    return columns
+
+
+def acc_gyro_from_counts(counts, range):
+    """Accelerometer (g) or gyroscope (deg/s) values of raw int16 counts, as read back from the CSV.
+
+    Args:
+        counts (np.array): int16 counts, e.g. 'acc' of a ``bin2npz(raw=True)`` archive.
+        range (int): 'acc_range' or 'gyro_range' of the recording.
+
+    Returns:
+        np.array: float64 array with the same shape as ``counts``.
+    """
+    return _acc_gyro_values(int(range))[np.asarray(counts, dtype=np.intp) + 0x8000]
+
+
+def _native_columns(columns):
+    # Cada sensor solo conserva las filas en las que tiene muestra
+    native = {'rows': len(columns['dateTime'])}
+    for name in (name for name in WPM_CHANNELS if name in columns):
+        rows = np.flatnonzero(~np.isnan(columns[name][:, 0]))
+        native[name] = columns[name][rows]
+        native[name + '_dateTime'] = columns['dateTime'][rows]
+        native[name + '_row'] = rows
+    return native
+
+
+# Ejes (índice 1-based con signo) del IMU según el segmento corporal; file_management usa esta misma tabla
+SEGMENT_AXES = {'Wrist': (-1, 3, -2), 'Thigh': (3, -1, 2), 'Hip': (-1, -3, -2)}
+
+
+def load_wpm_bin(bin_file, segment=None, K=1, temp_ppg=True, workers=1, start=None, end=None):
+    """Decode a .BIN file straight into the array of ``file_management.load_WPM_data``.
+
+    The rows are those of the CSV: the timestamp (ms) and the six IMU columns, plus
+    bodySurface_temp, ambient_temp, hr_raw and hr with ``temp_ppg``, all float64. The
+    axis remap of the body segment and the timestamp scaling of
+    ``file_management.apply_scaling_to_matrix_data`` are applied while the packages are
+    decoded, into one preallocated array, so the result is ready to segment without
+    further copies of the whole recording.
+
+    Args:
+        bin_file (str or list): Path to the .BIN file, possibly compressed, or a list of
+            .BIN files merged in time order (see ``bin2csv``). Except for a single
+            uncompressed file the array can not be preallocated and is joined at the end.
+        segment (str or list): 'Wrist', 'Thigh' or 'Hip' (see ``SEGMENT_AXES``), the
+            signed 1-based axes indices of ``load_MATRIX_data_by_index``, or None to keep
+            the axes of the device.
+        K (float): Drift factor of ``calculate_accelerometer_drift``. Defaults to 1 (no
+            scaling).
+        temp_ppg (bool): Also fill the temperature and PPG columns. Defaults to True.
+        workers (int): Number of processes decoding the file in parallel. Defaults to 1.
+        start, end (datetime or float): Only decode the packages overlapping this time
+            range (see ``WPMBinIndex.package_range``). Defaults to the whole recording.
+
+    Returns:
+        np.array: n x 7 (n x 11 with ``temp_ppg``) float64 array.
+
+    Raises:
+        ValueError: If the file is not a MATRIX .BIN file, the segment is unknown or
+            ``workers`` is given with a list of files.
+    """
+    if isinstance(segment, str) and segment not in SEGMENT_AXES:
+        raise ValueError(f'Unknown body segment {segment}, expected one of {list(SEGMENT_AXES)}')
+    if isinstance(bin_file, (list, tuple)) and workers > 1:
+        raise ValueError('load_wpm_bin: workers need a single .BIN file, a list is merged in one process')
+    axes_indices = np.array(SEGMENT_AXES[segment] if isinstance(segment, str) else
+                            (1, 2, 3) if segment is None else segment)
+    axes, signs = np.abs(axes_indices) - 1, np.sign(axes_indices)
+    channels = WPM_CHANNELS if temp_ppg else ('acc', 'gyr')
+    width = 1 + sum(len(CHANNEL_COLUMNS[name]) for name in channels)
+    with _open_wpm_source(bin_file) as index:
+        if isinstance(index, WPMBinIndex):
+            first, stop = index.package_range(start, end)
+            rowCount = int(_decodable_counts(index.packages[first:stop]).max(axis=1, initial=0).sum())
+            if workers > 1:
+                blocks = _map_package_chunks(index, workers, partial(_npz_chunk, channels=channels), first, stop)
+            else:
+                blocks = _package_batches(_iter_decoded_packages(index, first, stop, _last_usable_end(index, first)),
+                                          index.acc_range, index.gyro_range, channels, PARQUET_BATCH_PACKAGES)
+            data = np.empty((rowCount, width))
+            row = 0
+            for block in blocks:
+                row = _fill_segment_rows(data, row, block, axes, signs)
+            data = data[:row]
+        else:
+            parts = []
+            for block in _package_batches(index.decoded_packages(start, end), index.acc_range, index.gyro_range,
+                                          channels, PARQUET_BATCH_PACKAGES):
+                parts.append(np.empty((len(block['dateTime']), width)))
+                _fill_segment_rows(parts[-1], 0, block, axes, signs)
+            data = np.concatenate(parts) if parts else np.empty((0, width))
+    if K != 1 and len(data):
+        # (t - t0) / K + t0, columna a columna sin copiar la matriz
+        timestamps = data[:, 0]
+        firstTimestamp = timestamps[0]
+        timestamps -= firstTimestamp
+        timestamps /= K
+        timestamps += firstTimestamp
+    return data
+
+
+def _fill_segment_rows(data, row, block, axes, signs):
+    # Copia un bloque de iter_wpm_packages en 'data' a partir de 'row', con los ejes ya reordenados
+    rows = data[row:row + len(block['dateTime'])]
+    rows[:, 0] = block['dateTime']
+    rows[:, 1:4] = block['acc'][:, axes]
+    rows[:, 1:4] *= signs
+    rows[:, 4:7] = block['gyr'][:, axes]
+    rows[:, 4:7] *= signs
+    if 'temps' in block:
+        rows[:, 7:9] = block['temps']
+        rows[:, 9:11] = block['hr']
+    return row + len(rows)
+
+
+# Parquet: un row group por intervalo de tiempo, columnas tipadas
+PARQUET_ROW_GROUP_SECONDS = 3600
+PARQUET_BATCH_PACKAGES = 256
+PARQUET_COMPRESSION = 'zstd'
+PARQUET_COLUMN_TYPES = {'acc': 'float32', 'gyr': 'float32', 'temps': 'float32', 'hr': 'int16'}
+
+
+def _parquet_table(pa, blocks, channels=WPM_CHANNELS):
+    # Columnas con los nombres de csvFileHead; lo que el CSV deja vacío queda como null
+    arrays = {'dateTime': pa.array(np.concatenate([block['dateTime'] for block in blocks]), type=pa.int64())}
+    for name in channels:
+        values = np.concatenate([block[name] for block in blocks])
+        missing = np.isnan(values)
+        values = np.where(missing, 0, values).astype(PARQUET_COLUMN_TYPES[name])
+        for axis, column in enumerate(CHANNEL_COLUMNS[name]):
+            arrays[column] = pa.array(values[:, axis], mask=missing[:, axis])
+    return pa.table(arrays)
+
+
+def bin2parquet(bin_file, parquet_file, workers=1, start=None, end=None,
+                row_group_seconds=PARQUET_ROW_GROUP_SECONDS, channels='all', progress_callback=None,
+                progress_interval=PROGRESS_INTERVAL):
+    """Convert a MATRIX .BIN file into a Parquet file with typed columns.
+
+    The columns are those of ``csvFileHead`` without 'remarks': int64 'dateTime' (ms),
+    float32 acc/gyr and temperatures and int16 'hr_raw'/'hr', null where the CSV has
+    an empty field. Each row group holds the rows of one ``row_group_seconds`` interval
+    of 'dateTime', so readers filtering on it skip whole row groups. The remarks and
+    ranges are stored in the file metadata. Needs the optional ``pyarrow`` package.
+
+    Args:
+        bin_file (str or list): Path to the input .BIN file, possibly compressed, or a
+            list of .BIN files merged in time order (see ``bin2csv``).
+        parquet_file (str): Path to the output .parquet file.
+        workers (int): Number of processes decoding the file in parallel. Defaults to 1.
+        start, end (datetime or float): Only decode the packages overlapping this time
+            range (see ``WPMBinIndex.package_range``). Defaults to the whole recording.
+        row_group_seconds (int): Length of the time interval of each row group.
+        channels (str or list): Sensors whose columns are written, as in
+            ``iter_wpm_packages``. Defaults to 'all'.
+        progress_callback (callable): Called with the metrics dict of the conversion
+            every ``progress_interval`` seconds and once more at the end (see ``bin2csv``).
+        progress_interval (float): Seconds between progress reports.
+
+    Returns:
+        int: 0 on success, 1 if the .BIN file can not be read.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('bin2parquet needs pyarrow: pip install pyarrow')
+    if _missing_bin_file(bin_file):
+        print('bin2parquet: ' + _missing_bin_file(bin_file) + ': No such file or directory')
         return 1
-
-
-    # saveFileRemark = []
-
-
-    # saveFileRemark.append(csvFileHeadDict)
-
-
-    # saveFileRemark[0]['remarks'] = str(remarkes)
-
-
-    # csv_write_dict(csv_file, csvFileHead[0], saveFileRemark)
-
-
-    # 解析头
-
-
+    if isinstance(bin_file, (list, tuple)) and workers > 1:
+        raise ValueError('bin2parquet: workers need a single .BIN file, a list is merged in one process')
+    channels = _parse_channels(channels)
+    meter = _progress_meter(progress_callback, progress_interval)
     try:
+        index = _open_wpm_source(bin_file, meter)
+    except ValueError as e:
+        debugInfo(str(e))
+        return 1
+    with index:
+        if meter is not None:
+            meter.total_bytes = _source_bytes(index, start, end)
+        if workers > 1 and isinstance(index, WPMBinIndex):
+            blocks = _map_package_chunks(index, workers, partial(_npz_chunk, channels=channels),
+                                         *index.package_range(start, end), meter)
+        else:
+            blocks = _package_batches(index.decoded_packages(start, end, meter), index.acc_range, index.gyro_range,
+                                      channels, PARQUET_BATCH_PACKAGES)
+        metadata = {'remarks': index.remarks, 'acc_range': str(index.acc_range),
+                    'gyro_range': str(index.gyro_range)}
+        schema = _parquet_table(pa, [_empty_columns(0, channels)], channels).schema.with_metadata(metadata)
+        # El diccionario solo compensa en las columnas lentas (temperaturas y pulso)
+        dictionaryColumns = [column for name in ('temps', 'hr') if name in channels for column in CHANNEL_COLUMNS[name]]
+        with pq.ParquetWriter(parquet_file, schema, compression=PARQUET_COMPRESSION,
+                              use_dictionary=dictionaryColumns) as writer:
+            group, groupKey = [], None
+            for block in blocks:
+                keys = block['dateTime'] // (row_group_seconds * 1000)
+                # Se corta el bloque allí donde cambia el intervalo de tiempo
+                for cut in np.split(np.arange(len(keys)), np.flatnonzero(np.diff(keys)) + 1):
+                    if not len(cut):
+                        continue
+                    if keys[cut[0]] != groupKey and group:
+                        writer.write_table(_parquet_table(pa, group, channels).replace_schema_metadata(metadata))
+                        group = []
+                    groupKey = keys[cut[0]]
+                    group.append({name: values[cut[0]:cut[-1] + 1] for name, values in block.items()})
+            if group:
+                writer.write_table(_parquet_table(pa, group, channels).replace_schema_metadata(metadata))
+    if meter is not None:
+        meter.report(done=True)
+    return 0
 
 
-        sFileHeader = struct.Struct('4sIHH')
-
-
-        (headerRecogni, headerPackeNum, accRange, gyroRange) = sFileHeader.unpack(
-
-
-            allFileDataBuff[0:sFileHeader.size])
-
-
-    except:
-
+def _open_csv_output(path, channels=WPM_CHANNELS):
+    """Open ``path`` once for the whole conversion and write ``csvFileHead``.
+
+    The file is written as bytes with the BOM of csv_write_heard at the start, so the
+    output is the same as writing the header with it and appending the rows in utf-8.
+    """
+    csv_file_remove(path)
+    csv_file_remove(path + CHECKPOINT_SUFFIX)
+    f = open(path, 'wb', buffering=WRITE_BUFFER_SIZE)
+    text = io.StringIO()
+    csv.writer(text, dialect='excel').writerow(csv_file_head(channels))
+    f.write(text.getvalue().encode('utf-8-sig'))
+    return f
+
+
+# Punto de control para reanudar una conversión: <csv_file>.ckpt.json
+CHECKPOINT_SUFFIX = '.ckpt.json'
+CHECKPOINT_VERSION = 2
+CHECKPOINT_INTERVAL = 1024*1024*64
+
+
+class _CsvCheckpoint:
+    """State of a serial ``bin2csv`` run at the start of a package known to be complete.
+
+    A package is complete once the key of the next one has been read, so the checkpoint
+    never points past the last package of a recording that is still growing. Resuming
+    truncates the CSV to ``csv_size`` and decodes again from package ``package`` at byte
+    ``offset`` with the one second correction state ``tempTimesStamp``.
+    """
+
+    def __init__(self, csv_file, fileHead, channels=WPM_CHANNELS):
+        self.checkpoint_file = csv_file + CHECKPOINT_SUFFIX
+        self.channels = '+'.join(channels)
+        # headerPackeNum puede cambiar mientras la grabación crece
+        self.file_crc32 = binascii.crc32(fileHead[REMARKES_SIZE + 8:], binascii.crc32(fileHead[:REMARKES_SIZE + 4]))
+        self.package, self.offset, self.tempTimesStamp = 0, DATA_OFFSET, 0
+        self.previous_offset, self.previous_crc32 = 0, 0
+        self.csv_size = 0
+        self.previousOnePackageData = None
+        self.savedOffset = DATA_OFFSET
+
+    def update(self, package, offset, tempTimesStamp, previousOnePackageData, csv_size):
+        self.package, self.offset, self.tempTimesStamp = package, offset, tempTimesStamp
+        self.previous_offset = offset - len(previousOnePackageData)
+        self.previousOnePackageData = previousOnePackageData
+        self.csv_size = csv_size
+
+    def save(self, csvOpenFile):
+        csvOpenFile.flush()
+        if self.previousOnePackageData is not None:
+            self.previous_crc32 = binascii.crc32(self.previousOnePackageData)
+        state = {name: getattr(self, name) for name in ('file_crc32', 'channels', 'package', 'offset',
+                                                        'tempTimesStamp', 'previous_offset', 'previous_crc32',
+                                                        'csv_size')}
+        with open(self.checkpoint_file, 'w') as f:
+            json.dump({'version': CHECKPOINT_VERSION, **state}, f)
+        self.savedOffset = self.offset
+
+    def load(self, readOpenFile, csv_file):
+        """Restore a saved checkpoint; returns the package before it (None if unusable).
+
+        ``readOpenFile`` is only read forwards, so compressed streams work too. On success
+        it is left right after the key of package ``package``.
+        """
+        try:
+            with open(self.checkpoint_file) as f:
+                state = json.load(f)
+            if state.pop('version') != CHECKPOINT_VERSION or state['file_crc32'] != self.file_crc32 \
+                    or state['channels'] != self.channels or os.path.getsize(csv_file) < state['csv_size']:
+                return None
+        except (OSError, ValueError, KeyError):
+            return None
+        if state['package'] == 0:
+            return None
+        _skip_to(readOpenFile, state['previous_offset'])
+        previousOnePackageData = readOpenFile.read(state['offset'] - state['previous_offset'])
+        # La grabación solo puede haber crecido por el final
+        if binascii.crc32(previousOnePackageData) != state['previous_crc32'] or \
+                readOpenFile.read(len(PACKAGE_HEARD_KEY)) != PACKAGE_HEARD_KEY:
+            return None
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.savedOffset = self.offset
+        # El flujo queda detrás de la clave del paquete 'package'
+        return bytearray(previousOnePackageData)
+
+
+def _skip_to(readOpenFile, offset):
+    # Los flujos zstd no admiten seek: se avanza leyendo
+    if readOpenFile.seekable():
+        readOpenFile.seek(offset)
+    while readOpenFile.tell() < offset:
+        if not readOpenFile.read(min(READ_BUFFER_SIZE, offset - readOpenFile.tell())):
+            break
 
-        return 1
 
+def csv_file_remove(path):
 
-    allFileDataBuff = allFileDataBuff[sFileHeader.size:]
 
+    if os.path.exists(path):  # 如果文件存在
 
-    debugInfo('headerRecogni:'+headerRecogni.decode('utf-8', 'ignore'))
 
+        os.remove(path)
 
-    debugInfo('headerPackeNum:'+str(headerPackeNum))
 
+    else:
 
-    if headerRecogni.decode('utf-8', 'ignore') != FILE_HEADER_RECOGNITION_STRING:
 
+        debugInfo('no such file:%s' % path)  # 则返回文件不存在
 
-        debugInfo('headerRecogni != FILE_HEADER_RECOGNITION_STRING')
 
 
-        time.sleep(0.5)
 
 
-        return 1
+def calcAccGryro(value, range):
 
 
-    percentCount = 0
+    if value > 0:
 
 
-    lastPercent = 0
+        Denominator = 0x7fff
 
 
-    temptemp= None
+    else:
 
 
-    for j in range(0, headerPackeNum):
+        Denominator = 0x8000
 
 
-        # 读取一包数据
+    calc = value * range / Denominator
 
 
-        onePackageData = bytearray()
+    return format(calc, '.8f')
 
 
-        debugInfo('PackeNum:'+str(j))
+# 每个包内的传感器数据布局 (int16, little endian)
+ACC_GYRO_CHANNELS = 3
+TEMPER_HEART_CHANNELS = 2
+RAW_SAMPLE_DTYPE = np.dtype('<i2')
 
 
-        cutSize = read_one_package_raw_date(allFileDataBuff, onePackageData, readFileQueue)
+def calc_acc_gyro_block(values, range):
+    """Vectorized version of ``calcAccGryro`` that returns floats instead of strings.
 
+    Args:
+        values (np.array): Raw int16 counts read from the package payload.
+        range (int): Accelerometer or gyroscope range from the file header.
 
-        allFileDataBuff = allFileDataBuff[cutSize:]
+    Returns:
+        np.array: float64 array with the same shape as ``values``.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    denominator = np.where(values > 0, 0x7fff, 0x8000)
+    return values * range / denominator
 
 
-        # 解决最后一包数据可能重复的问题
+@lru_cache(maxsize=None)
+def _acc_gyro_strings(range):
+    # Una tabla con el texto de calcAccGryro para cada valor int16 posible
+    return np.array([format(v, '.8f') for v in calc_acc_gyro_block(np.arange(-0x8000, 0x8000), range).tolist()],
+                    dtype=object)
 
 
-        if temptemp == onePackageData:
+@lru_cache(maxsize=None)
+def _temper_strings():
+    return np.array([str(v / 10) for v in range(-0x8000, 0x8000)], dtype=object)
 
 
-            debugInfo('temptemp == self.onePackageData')
+@lru_cache(maxsize=None)
+def _heart_strings():
+    return np.array([str(v) for v in range(-0x8000, 0x8000)], dtype=object)
 
 
-            continue
+def package_timestamps(itermStartTimeStamp, itermEndTimeStamp, maxCount):
+    """Timestamps (ms) of every row of a package, spread evenly between its start and end seconds."""
+    timeAmongStep = ((itermEndTimeStamp - itermStartTimeStamp)*1000)/maxCount
+    return (itermStartTimeStamp*1000 + np.arange(maxCount)*timeAmongStep).astype(np.int64)
 
 
-        temptemp = onePackageData
+def decode_package_payload(payload, sampleCounts):
+    """Decode the raw payload of one MDTCPACK package with ``np.frombuffer``.
 
+    Args:
+        payload (bytes-like): Package bytes after the package header.
+        sampleCounts (tuple): Number of acc, gyro, temperature and heart rate samples.
 
-        debugInfo('get onePackageData')
+    Returns:
+        dict: int16 blocks 'acc', 'gyr', 'temp' and 'hr' together with the rows they
+        occupy in the package ('acc_index', ...), or None if the payload size does not
+        match the sample counts.
+    """
+    rawDataSizeAcc, rawDataSizeGyro, rawDataSizeTemper, rawDataSizeHeart = sampleCounts
+    widths = (ACC_GYRO_CHANNELS, ACC_GYRO_CHANNELS, TEMPER_HEART_CHANNELS, TEMPER_HEART_CHANNELS)
+    if len(payload) != sum(n * w for n, w in zip(sampleCounts, widths)) * RAW_SAMPLE_DTYPE.itemsize:
+        return None
+    raw = np.frombuffer(payload, dtype=RAW_SAMPLE_DTYPE)
+    maxCount = max(sampleCounts)
+    package = {}
+    offset = 0
+    for name, count, width in zip(('acc', 'gyr', 'temp', 'hr'), sampleCounts, widths):
+        package[name] = raw[offset:offset + count * width].reshape(count, width)
+        # 计算每个传感器的存储比例关系
+        package[name + '_index'] = (np.arange(count) * (maxCount / count)).astype(np.intp) if count else \
+            np.empty(0, dtype=np.intp)
+        offset += count * width
+    return package
+
+
+def _package_string_columns(package, accRange, gyroRange, remarks, channels=WPM_CHANNELS):
+    maxCount = len(package['dateTime'])
+    columns = [package['dateTime'].astype(str).tolist()]
+    blocks = {'acc': ('acc', _acc_gyro_strings(accRange)), 'gyr': ('gyr', _acc_gyro_strings(gyroRange)),
+              'temps': ('temp', _temper_strings()), 'hr': ('hr', _heart_strings())}
+    empty = [''] * maxCount
+    # Solo se formatean los bloques de los canales pedidos
+    for name, strings in (blocks[channel] for channel in channels):
+        values = package[name]
+        index = package[name + '_index']
+        for axis in range(values.shape[1]):
+            texts = strings[values[:, axis].astype(np.intp) + 0x8000].tolist()
+            if len(index) == maxCount:
+                columns.append(texts)
+            else:
+                column = list(empty)
+                for i, text in zip(index.tolist(), texts):
+                    column[i] = text
+                columns.append(column)
+    columns.append([remarks] + empty[1:])
+    return columns
 
 
-        # 读取每个包的识别码、CRC32、时间戳、包大小
+def package_csv_rows(package, accRange, gyroRange, remarks='', channels='all'):
+    """Format a decoded package as CSV rows laid out as ``csvFileHead``.
 
+    Sensors sampled slower than the package rate leave empty fields in the rows
+    they do not reach, and ``remarks`` goes in the first row only. ``channels`` keeps
+    only the columns of some sensors (see ``csv_file_head``).
+    """
+    return zip(*_package_string_columns(package, accRange, gyroRange, remarks, _parse_channels(channels)))
 
-        sOnePackageHeader = struct.Struct('8sIIIIIII')
 
+def _csv_field(value):
+    # Las remarks pueden llevar comas o comillas: se citan como lo haría csv.writer
+    text = io.StringIO()
+    csv.writer(text, dialect='excel').writerow([value])
+    return text.getvalue()[:-2]
 
-        rawDataindex = sOnePackageHeader.size
 
+def package_csv_text(package, accRange, gyroRange, remarks='', channels='all'):
+    """Same rows as ``package_csv_rows`` already joined as excel dialect CSV text."""
+    columns = _package_string_columns(package, accRange, gyroRange, _csv_field(remarks) if remarks else '',
+                                      _parse_channels(channels))
+    return '\r\n'.join(map(','.join, zip(*columns))) + '\r\n'
 
-        try:
-
-
-            (recString, crc32, itermStartTimeStamp, itermEndTimeStamp, rawDataSizeAcc, rawDataSizeGyro,
-
-
-                rawDataSizeTemper, rawDataSizeHeart) = sOnePackageHeader.unpack(onePackageData[0:rawDataindex])
-
-
-            debugInfo(' recString: '+str(recString)+' crc32:' + hex(crc32) +
-
-
-                      ' onePackageData size:'+str(len(onePackageData)))
-
-
-        except:
-
-
-            debugInfo('onePackageData is empty!!!')
-
-
-            continue
-
-
-        # 如果不是包的开头、校验不通过则寻找下一个头
-
-
-        sAcc = struct.Struct('hhh')
-
-
-        sGyro = struct.Struct('hhh')
-
-
-        sTemper = struct.Struct('hh')
-
-
-        sHeart = struct.Struct('hh')
-
-
-        # acc
-
-
-        accByteSize = rawDataSizeAcc*sAcc.size
-
-
-        debugInfo('\nrawDataSizeAcc:'+str(rawDataSizeAcc))
-
-
-        # gyro
-
-
-        GyroByteSize = rawDataSizeGyro*sGyro.size
-
-
-        debugInfo('\nrawDataSizeGyro:'+str(rawDataSizeGyro))
-
-
-        # temper
-
-
-        TemperByteSize = rawDataSizeTemper*sTemper.size
-
-
-        debugInfo('\nrawDataSizeTemper:'+str(rawDataSizeTemper))
-
-
-        # heart
-
-
-        heartByteSize = rawDataSizeHeart*sHeart.size
-
-
-        debugInfo('\nrawDataSizeHeart:'+str(rawDataSizeHeart))
-
-
-
-
-
-        # 检查CRC32
-
-
-        calcCrc32 = binascii.crc32(
-
-
-            onePackageData[len(recString)+4:])
-
-
-        debugInfo('calcCrc32:'+hex(calcCrc32))
-
-
-        if calcCrc32 != crc32:
-
-
-            debugInfo('calcCrc32 != crc32')
-
-
-            continue
-
-
-        # 截取原始值数据
-
-
-        onePackageData = onePackageData[sOnePackageHeader.size:]
-
-
-        # 解析iterm
-
-
-        saveFileOnePackge = []  # 创建的是多行三列的二维列表
-
-
-        maxCount = max(rawDataSizeAcc, rawDataSizeGyro,
-
-
-                       rawDataSizeTemper, rawDataSizeHeart)
-
-
-        if maxCount <= 0:
-
-
-            continue
-
-
-        
-
-
-        # 预处理秒误差
-
-
-        if itermStartTimeStamp - tempTimesStamp >= 1 and tempTimesStamp != 0:
-
-
-            itermStartTimeStamp -= 1
-
-
-            # print('itermStartTimeStamp - tempTimesStamp >= 1')
-
-
-        tempTimesStamp = itermEndTimeStamp
-
-
-        
-
-
-        timeAmongStep = (
-
-
-            (itermEndTimeStamp - itermStartTimeStamp)*1000)/(maxCount)
-
-
-
-
-
-        debugInfo('maxCount:'+str(maxCount))
-
-
-        debugInfo('itermStartTimeStamp:'+str(itermStartTimeStamp))
-
-
-        debugInfo('itermEndTimeStamp:'+str(itermEndTimeStamp))
-
-
-        debugInfo('time among:'+str(timeAmongStep))
-
-
-        # 第一行插入remarks
-
-
-        if j == 0:
-
-
-            csvFileHeadDict['remarks'] = remarkesString
-
-
-            csvFileHeadDict = deepcopy(csvFileHeadDict)
-
-
-        for i in range(maxCount):
-
-
-            timeCalc = itermStartTimeStamp*1000+i*timeAmongStep
-
-
-            # timeArray = time.localtime(timeCalc/1000)
-
-
-            # styleTime = time.strftime("%Y-%m-%d %H:%M:%S", timeArray)
-
-
-            # csvFileHeadDict['dateTime'] = styleTime + '.' + str(int(timeCalc % 1000))
-
-
-            csvFileHeadDict['dateTime'] = int(timeCalc)
-
-
-            # csvFileHeadDict['dateTime'] = int(
-
-
-            #     itermStartTimeStamp*1000+i*timeAmongStep)
-
-
-            saveFileOnePackge.append(csvFileHeadDict)
-
-
-            # 需要深度复制 否则下次更改时会连之前的列表中的值一起更改
-
-
-            csvFileHeadDict = deepcopy(csvFileHeadDict)
-
-
-            csvFileHeadDict['remarks'] = ''
-
-
-        # 计算每个传感器的存储比例关系
-
-
-        # maxCount -= 1
-
-
-        temp = rawDataSizeAcc
-
-
-        if temp > 0:
-
-
-            accScale = maxCount/temp
-
-
-        else:
-
-
-            accScale = 0
-
-
-        temp = rawDataSizeGyro
-
-
-        if temp > 0:
-
-
-            gyroScale = maxCount/temp
-
-
-        else:
-
-
-            gyroScale = 0
-
-
-        temp = rawDataSizeTemper
-
-
-        if temp > 0:
-
-
-            temperScale = maxCount/temp
-
-
-        else:
-
-
-            temperScale = 0
-
-
-        temp = rawDataSizeHeart
-
-
-        if temp > 0:
-
-
-            heartScale = maxCount/temp
 
+def _iter_package_buffers(readOpenFile, head=b''):
+    """Split the package data of an open .BIN stream into raw packages.
 
+    ``readOpenFile`` must be positioned right after the file header, or ``head`` must
+    hold the bytes read before its position. The stream is read synchronously in
+    READ_BUFFER_SIZE blocks and cut at every 'MDTCPACK' key, as ``WPMBinIndex`` does;
+    the last package runs to the end of the file.
+    """
+    allFileDataBuff = bytearray(head)
+    startOffset = 0
+    endOfFile = False
+    while True:
+        endRecnizOffset = allFileDataBuff.find(PACKAGE_HEARD_KEY, startOffset + 1)
+        if endRecnizOffset != -1:
+            yield allFileDataBuff[startOffset:endRecnizOffset]
+            startOffset = endRecnizOffset
+        elif endOfFile:
+            if startOffset < len(allFileDataBuff):
+                yield allFileDataBuff[startOffset:]
+            return
         else:
-
-
-            heartScale = 0
-
-
-        debugInfo(' accScale:'+str(accScale)+' gyroScale:'+str(gyroScale) +
-
-
-                  ' temperScale:'+str(temperScale)+' heartScale:'+str(heartScale))
-
-
-        startTimeArray = time.localtime(itermStartTimeStamp)
-
-
-        endTimeArray = time.localtime(itermEndTimeStamp)
-
-
-        styleTime = time.strftime("%Y--%m--%d %H:%M:%S\n", startTimeArray)
-
-
-        styleTime += time.strftime("%Y--%m--%d %H:%M:%S ", endTimeArray)
-
-
-        debugInfo(str(j)+' iterm')
-
-
-        debugInfo('\nstyleTime:\n'+styleTime)
-
-
-        # 解析原始数据
-
-
-        # Acc
-
-
-        sGetRawData = struct.Struct(str(
-
-
-            accByteSize)+'s'+str(GyroByteSize)+'s'+str(TemperByteSize)+'s'+str(heartByteSize)+'s')
-
-
+            # Solo se conserva el paquete incompleto antes de leer el siguiente bloque
+            del allFileDataBuff[:startOffset]
+            startOffset = 0
+            readData = readOpenFile.read(READ_BUFFER_SIZE)
+            endOfFile = not readData
+            allFileDataBuff += readData
+
+
+def bin2csv(bin_file, csv_file, workers=1, start=None, end=None, resume=False, channels='all',
+            progress_callback=None, progress_interval=PROGRESS_INTERVAL):
+    """Convert a MATRIX .BIN file to CSV.
+
+    Args:
+        bin_file (str or list): Path to the input .BIN file, or a list of .BIN files of
+            one device merged in time order (see below).
+        csv_file (str): Path to the output .CSV file (overwritten).
+        workers (int): Number of processes decoding contiguous package chunks in
+            parallel. Defaults to 1. The output is the same for any number of workers.
+        start, end (datetime or float): Only decode the packages overlapping this time
+            range, found through ``WPMBinIndex.package_range``. Whole packages are
+            written, so the rows can run up to a second past the limits.
+        resume (bool): Keep a checkpoint next to the CSV (``<csv_file>.ckpt.json``) and,
+            if one from a previous run matches the .BIN file, append only the packages
+            after it instead of rewriting the CSV. Resumable runs use a single process
+            and convert the whole recording.
+        channels (str or list): Sensors written to the CSV, as in ``iter_wpm_packages``;
+            the columns of the others are left out (see ``csv_file_head``) and their
+            samples are never formatted. Defaults to 'all'.
+        progress_callback (callable): Called every ``progress_interval`` seconds, and
+            once more at the end with 'done' set, with a dict of the throughput so far:
+            'bytes_read' and 'total_bytes' of package data, 'packages_decoded',
+            'packages_skipped' (duplicated or corrupt), 'elapsed_s', 'mb_per_s' and
+            'eta_s' (None while unknown, as for compressed input). Defaults to None:
+            nothing is reported or counted.
+        progress_interval (float): Seconds between progress reports. Defaults to
+            PROGRESS_INTERVAL.
+
+    ``bin_file`` can be compressed (.gz, .xz or .zst, the latter with the optional
+    ``zstandard`` package). It is then decompressed on the fly as a stream, with a single
+    process and without time ranges.
+
+    A list of files (a recording split by device restarts) is written as one CSV,
+    streamed package by package in a single process: the files are sorted by their
+    first timestamp and the packages of a file that overlap the rows already written
+    are dropped. The files must share the acc/gyro ranges, and can not be resumed nor
+    decoded by several workers.
+
+    Returns:
+        int: 0 on success, 1 if a .BIN file can not be read.
+
+    Raises:
+        ValueError: If ``resume`` is combined with a time range or a list of files, or
+            ``workers`` with a list of files.
+    """
+    debugInfo('saveFile:'+csv_file)
+    if _missing_bin_file(bin_file):
+        print('bin2csv: ' + _missing_bin_file(bin_file) + ': No such file or directory')
+        return 1
+    if resume and (start is not None or end is not None):
+        raise ValueError('bin2csv: resume converts the whole recording, it can not take start/end')
+    channels = _parse_channels(channels)
+    meter = _progress_meter(progress_callback, progress_interval)
+    if isinstance(bin_file, (list, tuple)):
+        if resume:
+            raise ValueError('bin2csv: resume needs a single .BIN file')
+        if workers > 1:
+            raise ValueError('bin2csv: workers need a single .BIN file, a list is merged in one process')
         try:
-
-
-            (accRawData, gyroRawData, temperRawData,
-
-
-                heartRawData) = sGetRawData.unpack(onePackageData[0:])
-
-
-        except:
-
-
-            continue
-
-
-        for i in range(0, rawDataSizeAcc):
-
-
-            accIndex = int(i*accScale)
-
-
-            try:
-
-
-                (saveFileOnePackge[accIndex]['acc_x'], saveFileOnePackge[accIndex]['acc_y'],
-
-
-                    saveFileOnePackge[accIndex]['acc_z']) = sAcc.unpack(accRawData[0:sAcc.size])
-
-
-            except:
-
-
-                continue
-
-
-            saveFileOnePackge[accIndex]['acc_x'] = calcAccGryro(
-
-
-                saveFileOnePackge[accIndex]['acc_x'], accRange)
-
-
-            saveFileOnePackge[accIndex]['acc_y'] = calcAccGryro(
-
-
-                saveFileOnePackge[accIndex]['acc_y'], accRange)
-
-
-            saveFileOnePackge[accIndex]['acc_z'] = calcAccGryro(
-
-
-                saveFileOnePackge[accIndex]['acc_z'], accRange)
-
-
-            accRawData = accRawData[sAcc.size:]
-
-
-        # Gyro
-
-
-        for i in range(0, rawDataSizeGyro):
-
-
-            gyroIndex = int(i*gyroScale)
-
-
-            try:
-
-
-                (saveFileOnePackge[gyroIndex]['gyr_x'], saveFileOnePackge[gyroIndex]['gyr_y'],
-
-
-                    saveFileOnePackge[gyroIndex]['gyr_z']) = sGyro.unpack(gyroRawData[0:sGyro.size])
-
-
-            except:
-
-
-                continue
-
-
-            saveFileOnePackge[gyroIndex]['gyr_x'] = calcAccGryro(
-
-
-                saveFileOnePackge[gyroIndex]['gyr_x'], gyroRange)
-
-
-            saveFileOnePackge[gyroIndex]['gyr_y'] = calcAccGryro(
-
-
-                saveFileOnePackge[gyroIndex]['gyr_y'], gyroRange)
-
-
-            saveFileOnePackge[gyroIndex]['gyr_z'] = calcAccGryro(
-
-
-                saveFileOnePackge[gyroIndex]['gyr_z'], gyroRange)
-
-
-            gyroRawData = gyroRawData[sGyro.size:]
-
-
-        # temperate
-
-
-        for i in range(0, rawDataSizeTemper):
-
-
-            temperIndex = int(i*temperScale)
-
-
-            try:
-
-
-                (saveFileOnePackge[temperIndex]['bodySurface_temp'], saveFileOnePackge[temperIndex]
-
-
-                    ['ambient_temp']) = sTemper.unpack(temperRawData[0:sTemper.size])
-
-
-            except:
-
-
-                continue
-
-
-            saveFileOnePackge[temperIndex]['bodySurface_temp'] = saveFileOnePackge[temperIndex]['bodySurface_temp']/10
-
-
-            saveFileOnePackge[temperIndex]['ambient_temp'] = saveFileOnePackge[temperIndex]['ambient_temp']/10
-
-
-            temperRawData = temperRawData[sTemper.size:]
-
-
-        # heartrate
-
-
-        for i in range(0, rawDataSizeHeart):
-
-
-            heartIndex = int(i*heartScale)
-
-
-            try:
-
-
-                (saveFileOnePackge[heartIndex]['hr_raw'], saveFileOnePackge[heartIndex]
-
-
-                    ['hr']) = sHeart.unpack(heartRawData[0:sHeart.size])
-
-
-            except:
-
-
-                continue
-
-
-            heartRawData = heartRawData[sHeart.size:]
-
-
-
-
-
-        csv_write_dict(
-
-
-            csv_file, csvFileHead[0], saveFileOnePackge)
-
-
-        percentCount += 1
-
-
-        percent = int((percentCount / headerPackeNum)*100)
-
-
-        if lastPercent != percent:
-
-
-            lastPercent = percent
-
-
-        flashSting = ['-', '\\', '|', '/']
-
-
-        print(flashSting[percentCount % len(flashSting)] +
-
-
-              ' '+str(lastPercent)+'%', end='\r', flush=True)
-
-
+            source = _WPMBinMerge(bin_file, meter)
+        except ValueError as e:
+            debugInfo(str(e))
+            return 1
+        with source, _open_csv_output(csv_file, channels) as f:
+            if meter is not None:
+                meter.total_bytes = _source_bytes(source, start, end)
+            for j, package in source.decoded_packages(start, end):
+                f.write(package_csv_text(package, source.acc_range, source.gyro_range,
+                                         source.remarks if j == 0 else '', channels).encode('utf-8'))
+        if meter is not None:
+            meter.report(done=True)
+        return 0
+    if _compressed_bin(bin_file) and (start is not None or end is not None):
+        raise ValueError('bin2csv: time ranges need random access, decompress ' + bin_file + ' first')
+    if not resume and not _compressed_bin(bin_file) and (workers > 1 or start is not None or end is not None):
+        try:
+            index = WPMBinIndex(bin_file)
+        except ValueError as e:
+            debugInfo(str(e))
+            return 1
+        with index, _open_csv_output(csv_file, channels) as f:
+            first, stop = index.package_range(start, end)
+            if meter is not None:
+                meter.total_bytes = _source_bytes(index, start, end)
+            if workers > 1:
+                for text in _map_package_chunks(index, workers, partial(_csv_chunk, channels=channels), first, stop,
+                                                meter):
+                    f.write(text)
+            else:
+                for j, package in _iter_decoded_packages(index, first, stop, _last_usable_end(index, first), meter):
+                    f.write(package_csv_text(package, index.acc_range, index.gyro_range,
+                                             index.remarks if j == 0 else '', channels).encode('utf-8'))
+        if meter is not None:
+            meter.report(done=True)
+        return 0
+    with contextlib.ExitStack() as stack:
+        readOpenFile = stack.enter_context(_open_bin_stream(bin_file))
+        # 解析remarkes和头
+        fileHead = readOpenFile.read(DATA_OFFSET)
+        fileHeader = _parse_file_header(fileHead)
+        if fileHeader is None:
+            debugInfo('headerRecogni != FILE_HEADER_RECOGNITION_STRING')
+            return 1
+        remarkesString, headerPackeNum, accRange, gyroRange = fileHeader
+        debugInfo('headerPackeNum:'+str(headerPackeNum))
+        checkpoint = _CsvCheckpoint(csv_file, fileHead, channels)
+        temptemp = checkpoint.load(readOpenFile, csv_file) if resume else None
+        if temptemp is None:
+            if readOpenFile.tell() != DATA_OFFSET:
+                # Checkpoint no válido: se vuelve a empezar (los flujos comprimidos no retroceden)
+                readOpenFile = stack.enter_context(_open_bin_stream(bin_file))
+                readOpenFile.read(DATA_OFFSET)
+            f = _open_csv_output(csv_file, channels)
+        else:
+            debugInfo('resume at package:'+str(checkpoint.package))
+            f = open(csv_file, 'r+b', buffering=WRITE_BUFFER_SIZE)
+            f.truncate(checkpoint.csv_size)
+            f.seek(checkpoint.csv_size)
+        if meter is not None and not _compressed_bin(bin_file):
+            meter.total_bytes = max(0, os.path.getsize(bin_file) - checkpoint.offset)
+        with f:
+            j = checkpoint.package
+            offset = checkpoint.offset
+            tempTimesStamp = checkpoint.tempTimesStamp
+            head = b'' if temptemp is None else PACKAGE_HEARD_KEY
+            onePackages = itertools.islice(_iter_package_buffers(readOpenFile, head), max(0, headerPackeNum - j))
+            for onePackageData in onePackages:
+                if resume and temptemp is not None:
+                    # El paquete anterior está completo: se ha leído la clave de este
+                    checkpoint.update(j, offset, tempTimesStamp, temptemp, f.tell())
+                    if offset - checkpoint.savedOffset >= CHECKPOINT_INTERVAL:
+                        checkpoint.save(f)
+                # 解决最后一包数据可能重复的问题
+                package = None
+                if onePackageData != temptemp:
+                    package, tempTimesStamp = _decode_package(onePackageData, tempTimesStamp)
+                    if package is not None:
+                        # 第一行插入remarks
+                        f.write(package_csv_text(package, accRange, gyroRange,
+                                                 remarkesString if j == 0 else '', channels).encode('utf-8'))
+                if meter is not None:
+                    meter.package(len(onePackageData), package is not None)
+                temptemp = onePackageData
+                offset += len(onePackageData)
+                j += 1
+            if resume:
+                checkpoint.save(f)
+    if meter is not None:
+        meter.report(done=True)
     return 0
 
 
-
-
-
-def ReadFileThread(bin_file, readFileQueue):  # 建立一个任务线程类
-
-
-    readOpenFile = None
-
-
-    fileQueue = readFileQueue
-
-
-    readFile = bin_file
-
-
-    try:
-
-
-        readOpenFile = open(readFile, 'rb')
-
-
-    except:
-
-
-        debugInfo('can not open file')
-
-
-        return
-
-
-    while True:
-
-
-        debugInfo('put one iterm to queue')
-
-
-        data = readOpenFile.read(QUEUE_ONE_ITERM_BYTE_SIZE)
-
-
-        fileQueue.put(data)
-
-
-        if len(data) != QUEUE_ONE_ITERM_BYTE_SIZE:
-
-
-            break
-
-
-    readOpenFile.close()
-
-
-    debugInfo('all file data put to queue')
-
-
-
-
-
 #bin2csv('D:\\MATA00-1000777-20210603-104952.BIN', '.\\test12.csv')
 
 
@@ -4,9 +4,11 @@ CLI wrapper for bin2csv functionality.
 """
 
 import argparse
+import json
 import os
 import sys
-from .bin2csv import bin2csv
+from datetime import datetime
+from .bin2csv import PROGRESS_INTERVAL, bin2csv, bin2npz, bin2parquet
 
 
 def main():
@@ -17,12 +19,71 @@ def main():
     parser.add_argument(
         "bin_file", 
         type=str, 
-        help="Path to the input .BIN file"
+        nargs="+",
+        help="Path to the input .BIN file (.BIN.gz, .BIN.xz and .BIN.zst are read as a stream); "
+             "several files of one device are merged in time order"
     )
     parser.add_argument(
         "csv_file", 
         type=str, 
-        help="Path to the output .CSV file"
+        help="Path to the output .CSV (or .npz, .parquet) file"
+    )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "npz", "parquet"],
+        help="Output format; by default it follows the output file extension (CSV unless .npz or .parquet)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes decoding the .BIN file in parallel (default: 1)"
+    )
+    parser.add_argument(
+        "--start",
+        type=datetime.fromisoformat,
+        help="Only convert the packages from this local date and time on (e.g. 2024-05-02T09:30)"
+    )
+    parser.add_argument(
+        "--end",
+        type=datetime.fromisoformat,
+        help="Only convert the packages up to this local date and time"
+    )
+    parser.add_argument(
+        "--native",
+        action="store_true",
+        help="npz format only: keep every sensor at its native rate with its own timestamps"
+    )
+    parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="npz format only: store the raw int16 counts (native rate) with the acc/gyro ranges"
+    )
+    parser.add_argument(
+        "--channels",
+        default="all",
+        help="Sensors to write: 'all' (default) or some of acc, gyr, temps, hr joined with '+' (e.g. acc+gyr)"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="csv format only: keep a checkpoint next to the CSV and only append the packages added since the last run"
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Log the conversion throughput to stderr as one JSON object per line"
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=PROGRESS_INTERVAL,
+        help=f"Seconds between --progress lines (default: {PROGRESS_INTERVAL})"
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print a JSON summary of the conversion (result and throughput) to stdout"
     )
     parser.add_argument(
         "--verbose", "-v",
@@ -32,13 +93,31 @@ def main():
     
     args = parser.parse_args()
     
-    # Validate input file
-    if not os.path.exists(args.bin_file):
-        print(f"Error: Input file not found: {args.bin_file}", file=sys.stderr)
-        sys.exit(1)
+    # Validate input files
+    for bin_file in args.bin_file:
+        if not os.path.exists(bin_file):
+            print(f"Error: Input file not found: {bin_file}", file=sys.stderr)
+            sys.exit(1)
+        
+        bin_name, extension = os.path.splitext(bin_file)
+        if extension.lower() in ('.gz', '.xz', '.zst'):
+            # Compressed recordings are decompressed on the fly
+            extension = os.path.splitext(bin_name)[1]
+        if extension.upper() != '.BIN':
+            print(f"Warning: Input file {bin_file} does not have .BIN extension")
+    # A single file keeps the parallel and resumable paths
+    bin_files = args.bin_file[0] if len(args.bin_file) == 1 else args.bin_file
     
-    if not args.bin_file.upper().endswith('.BIN'):
-        print(f"Warning: Input file {args.bin_file} does not have .BIN extension")
+    output_format = args.format
+    if output_format is None:
+        extension = os.path.splitext(args.csv_file)[1].lower()
+        output_format = {".npz": "npz", ".parquet": "parquet"}.get(extension, "csv")
+    if (args.native or args.raw) and output_format != "npz":
+        parser.error("--native and --raw are only valid for npz output")
+    if args.resume and output_format != "csv":
+        parser.error("--resume is only valid for csv output")
+    if args.workers > 1 and len(args.bin_file) > 1:
+        parser.error("--workers needs a single input file, several files are merged in one process")
     
     # Create output directory if it doesn't exist
     output_dir = os.path.dirname(args.csv_file)
@@ -47,12 +126,34 @@ def main():
         if args.verbose:
             print(f"Created output directory: {output_dir}")
     
+    metrics = {}
+
+    def progress(values):
+        metrics.update(values)
+        if args.progress:
+            print(json.dumps({"output": args.csv_file, **values}), file=sys.stderr, flush=True)
+
+    progress_callback = progress if args.progress or args.json else None
+    
     try:
         if args.verbose:
-            print(f"Converting {args.bin_file} to {args.csv_file}")
+            print(f"Converting {', '.join(args.bin_file)} to {args.csv_file} ({output_format})")
         
         # Call the main conversion function
-        result = bin2csv(args.bin_file, args.csv_file)
+        progress_options = {"progress_callback": progress_callback, "progress_interval": args.progress_interval}
+        if output_format == "parquet":
+            result = bin2parquet(bin_files, args.csv_file, workers=args.workers, start=args.start, end=args.end,
+                                 channels=args.channels, **progress_options)
+        elif output_format == "npz":
+            result = bin2npz(bin_files, args.csv_file, workers=args.workers, start=args.start, end=args.end,
+                             native=args.native, raw=args.raw, channels=args.channels, **progress_options)
+        else:
+            result = bin2csv(bin_files, args.csv_file, workers=args.workers, start=args.start, end=args.end,
+                             resume=args.resume, channels=args.channels, **progress_options)
+        
+        if args.json:
+            print(json.dumps({"input": args.bin_file, "output": args.csv_file, "format": output_format,
+                              "result": result, **metrics}))
         
         if args.verbose:
             print(f"✓ Conversion completed successfully!")
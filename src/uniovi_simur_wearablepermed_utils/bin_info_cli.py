@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+CLI to inspect .BIN files from their headers, without converting them.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from .bin2csv import GAP_SECONDS, validate_wpm_bin, wpm_bin_info
+
+
+def _format_timestamp(timestamp):
+    if timestamp is None:
+        return "-"
+    return datetime.fromtimestamp(timestamp).isoformat(sep=" ")
+
+
+def _print_info(bin_file, info):
+    print(f"{bin_file}")
+    print(f"  remarks:          {info['remarks']}")
+    print(f"  headerPackeNum:   {info['headerPackeNum']} ({info['packages']} packages found)")
+    print(f"  acc/gyro range:   {info['acc_range']} / {info['gyro_range']}")
+    print(f"  first package:    {_format_timestamp(info['first_timestamp'])}")
+    print(f"  last package:     {_format_timestamp(info['last_timestamp'])}")
+    for name, count in info['sample_counts'].items():
+        rate = info['sample_rate'][name]
+        rate = "-" if rate is None else f"{rate:g} Hz"
+        print(f"  {name + ':':<17} {count} samples, {rate}")
+    if info['skipped_packages']:
+        print(f"  skipped:          {info['skipped_packages']} packages whose size does not match their counts")
+
+
+def _print_validation(report):
+    print(f"  valid:            {'yes' if report['valid'] else 'no'} "
+          f"({report['decoded_packages']} packages decoded, {report['ignored_packages']} ignored)")
+    for key in ('truncated', 'crc_failures', 'size_mismatches', 'empty', 'duplicates'):
+        if report[key]:
+            print(f"  {key + ':':<17} {len(report[key])} packages, first {report[key][:10]}")
+    for key in ('timestamp_regressions', 'gaps'):
+        for event in report[key]:
+            print(f"  {key[:-1] + ':':<17} package {event['package']}, {event['seconds']} s after "
+                  f"{_format_timestamp(event['previous_end'])}")
+
+
+def main():
+    """Main CLI function for the inspection and validation of .BIN files."""
+    parser = argparse.ArgumentParser(
+        description="Report the header information of .BIN files without decoding their data."
+    )
+    parser.add_argument(
+        "bin_files",
+        type=str,
+        nargs="+",
+        help="Paths to the .BIN files"
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print one JSON object per file instead of a text summary"
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Also check the CRC, size and timestamps of every package (added as 'validation' in JSON)"
+    )
+    parser.add_argument(
+        "--gap-seconds",
+        type=float,
+        default=GAP_SECONDS,
+        help=f"Report the time between packages longer than this with --validate (default: {GAP_SECONDS})"
+    )
+
+    args = parser.parse_args()
+
+    result = 0
+    for bin_file in args.bin_files:
+        if not os.path.exists(bin_file):
+            print(f"Error: Input file not found: {bin_file}", file=sys.stderr)
+            result = 1
+            continue
+        try:
+            info = wpm_bin_info(bin_file)
+            if args.validate:
+                info["validation"] = validate_wpm_bin(bin_file, args.gap_seconds)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            result = 1
+            continue
+        if args.json:
+            print(json.dumps({"file": bin_file, **info}))
+        else:
+            _print_info(bin_file, info)
+            if args.validate:
+                _print_validation(info["validation"])
+
+    return result
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,7 @@
 import time
+import hashlib
+import json
+import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -9,21 +12,217 @@ import matplotlib.pyplot as plt
 import openpyxl
 from datetime import time, timedelta, date
 
-from uniovi_simur_wearablepermed_utils.segmentation import segment_WPM_activity_data, plot_segmented_WPM_data, save_segmented_data_to_compressed_npz
+from uniovi_simur_wearablepermed_utils.segmentation import segment_WPM_activity_data, plot_segmented_WPM_data, save_segmented_data_to_compressed_npz, activity_time_ranges
+from uniovi_simur_wearablepermed_utils.bin2csv import SEGMENT_AXES, acc_gyro_from_counts, load_wpm_bin
 
 #__all__ = ['load_WPM_IMU_data', 'segment_data_by_dates']
 
 
-def read_time_from_excel(file_path, sheet_name, cell_reference):
+# Sheet of the activity log with the times of the protocol
+ACTIVITY_LOG_SHEET = 'Hoja1'
+
+# Cells of the activity log read by extract_WPM_info_from_excel and their labels
+WPM_INFO_CELLS = [
+    ("E37", "Hora de inicio de acelerómetro muslo (hh:mm:ss) - Hora de ordenador"),
+    ("E38", "Hora de inicio de acelerómetro cadera (hh:mm:ss) - Hora de ordenador"),
+    ("E39", "Hora de inicio de acelerómetro muñeca (hh:mm:ss) - Hora de ordenador"),
+    ("E13", "Fecha día 1"),
+    ("D60", "FASE REPOSO CON K5 - Hora de inicio"),
+    ("D61", "FASE REPOSO CON K5 - Hora de fin"),
+    ("D72", "TAPIZ RODANTE - Hora de inicio"),
+    ("D73", "TAPIZ RODANTE - Hora de fin"),
+    ("D81", "SIT TO STAND 30 s - Hora de inicio"),
+    ("D82", "SIT TO STAND 30 s - Hora de fin"),
+    ("D90", "INCREMENTAL CICLOERGOMETRO - Hora de inicio REPOSO"),
+    ("D91", "INCREMENTAL CICLOERGOMETRO - Hora de inicio CALENTAMIENTO"),
+    ("D92", "INCREMENTAL CICLOERGOMETRO - Hora de inicio INCREMENTAL"),
+    ("D93", "INCREMENTAL CICLOERGOMETRO - Hora de fin"),
+    ("D104", "ACTIVIDAD NO ESTRUCTURADA - Hora de inicio"),
+    ("D115", "ACTIVIDAD NO ESTRUCTURADA - Hora de fin"),
+    ("E112", "Fecha día 7"),
+    ("D144", "YOGA - Hora de inicio"),
+    ("D145", "YOGA - Hora de fin"),
+    ("D153", "SENTADO VIENDO LA TV - Hora de inicio"),
+    ("D154", "SENTADO VIENDO LA TV - Hora de fin"),
+    ("D162", "SENTADO LEYENDO - Hora de inicio"),
+    ("D163", "SENTADO LEYENDO - Hora de fin"),
+    ("D172", "SENTADO USANDO PC - Hora de inicio"),
+    ("D173", "SENTADO USANDO PC - Hora de fin"),
+    ("D181", "DE PIE USANDO PC - Hora de inicio"),
+    ("D182", "DE PIE USANDO PC - Hora de fin"),
+    ("D190", "DE PIE DOBLANDO TOALLAS - Hora de inicio"),
+    ("D191", "DE PIE DOBLANDO TOALLAS - Hora de fin"),
+    ("D199", "DE PIE MOVIENDO LIBROS - Hora de inicio"),
+    ("D200", "DE PIE MOVIENDO LIBROS - Hora de fin"),
+    ("D208", "DE PIE BARRIENDO - Hora de inicio"),
+    ("D209", "DE PIE BARRIENDO - Hora de fin"),
+    ("D219", "CAMINAR USUAL SPEED - Hora de inicio"),
+    ("D220", "CAMINAR USUAL SPEED - Hora de fin"),
+    ("D228", "CAMINAR CON MÓVIL O LIBRO - Hora de inicio"),
+    ("D229", "CAMINAR CON MÓVIL O LIBRO - Hora de fin"),
+    ("D237", "CAMINAR CON LA COMPRA - Hora de inicio"),
+    ("D238", "CAMINAR CON LA COMPRA - Hora de fin"),
+    ("D246", "CAMINAR ZIGZAG - Hora de inicio"),
+    ("D247", "CAMINAR ZIGZAG - Hora de fin"),
+    ("D255", "TROTAR - Hora de inicio"),
+    ("D256", "TROTAR - Hora de fin"),
+    ("D264", "SUBIR Y BAJAR ESCALERAS - Hora de inicio"),
+    ("D265", "SUBIR Y BAJAR ESCALERAS - Hora de fin")
+]
+
+# Cells read by calculate_accelerometer_drift: power-on/off dates, power-on and
+# power-off times of the thigh, hip and wrist IMUs and start of CAMINAR USUAL SPEED
+DRIFT_CELLS = ('E13', 'E112', 'E37', 'E38', 'E39', 'E273', 'E274', 'E275', 'D219')
+
+# Sidecar with the cells of an activity log already parsed
+ACTIVITY_LOG_CACHE_SUFFIX = '.cache.json'
+ACTIVITY_LOG_CACHE_VERSION = 1
+
+
+def _read_workbook_values(file_path):
+    """Values of the non-empty cells of every sheet, from one read-only parse of the workbook."""
+    sheets = {}
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            # The dimensions stored in the file are not always right
+            sheet.reset_dimensions()
+            values = {}
+            for row in sheet.iter_rows():
+                for cell in row:
+                    if cell.value is not None:
+                        values[cell.coordinate] = cell.value
+            sheets[sheet.title] = values
+    finally:
+        workbook.close()
+    return sheets
+
+
+class ActivityLog:
     """
-    Reads a specific cell from an Excel file that contains a time in the format 'hh:mm:ss' 
-    or 'h:mm:ss' and converts it into a Python 'time' object.
+    Activity log (Excel) of a WPM study, parsed once.
+
+    The workbook is opened a single time in openpyxl read-only mode and the values of
+    every sheet are kept in memory, so the dozens of cells read by
+    extract_WPM_info_from_excel and calculate_accelerometer_drift do not reload the file.
+    An ActivityLog can be passed wherever those functions, read_time_from_excel or
+    read_date_from_excel take the path of the Excel file.
 
     :param file_path: Full path to the Excel file.
-    :param sheet_name: Name of the sheet where the cell is located.
-    :param cell_reference: Cell reference that contains the time (e.g., 'A1').
-    :return: A 'time' object with the converted time, or None if the format is invalid.
+    :param sheets: Values already known, as {sheet: {cell: value}} (e.g. from the cache
+        of load_activity_log). The workbook is then only parsed if a cell outside them is read.
+    """
+
+    def __init__(self, file_path, sheets=None):
+        self.file_path = file_path
+        self.complete = sheets is None
+        self.sheets = _read_workbook_values(file_path) if sheets is None else sheets
+
+    def value(self, sheet_name, cell_reference):
+        """Value of a cell (None if it is empty), as openpyxl reads it with data_only=True."""
+        cell_reference = cell_reference.upper()
+        if not self.complete and cell_reference not in self.sheets.get(sheet_name, {}):
+            self.sheets, self.complete = _read_workbook_values(self.file_path), True
+        return self.sheets[sheet_name].get(cell_reference)
+
+    def read_time(self, sheet_name, cell_reference):
+        """Time in a cell, converted as in read_time_from_excel."""
+        return read_time_from_excel(self, sheet_name, cell_reference)
+
+    def read_date(self, sheet_name, cell_reference):
+        """Date in a cell, converted as in read_date_from_excel."""
+        return read_date_from_excel(self, sheet_name, cell_reference)
+
+
+def _cell_to_json(value):
+    """JSON form of a cell value; dates, times and durations are tagged with their type."""
+    if isinstance(value, datetime):
+        return {'datetime': value.isoformat()}
+    if isinstance(value, date):
+        return {'date': value.isoformat()}
+    if isinstance(value, time):
+        return {'time': value.isoformat()}
+    if isinstance(value, timedelta):
+        return {'timedelta': value.total_seconds()}
+    return value
+
+
+def _cell_from_json(value):
+    if not isinstance(value, dict):
+        return value
+    (kind, text), = value.items()
+    if kind == 'timedelta':
+        return timedelta(seconds=text)
+    return {'datetime': datetime, 'date': date, 'time': time}[kind].fromisoformat(text)
+
+
+def _file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def activity_log_cache_file(file_path, cache_dir=None):
+    """Path of the cache of an activity log: next to it, or in ``cache_dir`` if given."""
+    if cache_dir is None:
+        return file_path + ACTIVITY_LOG_CACHE_SUFFIX
+    return os.path.join(cache_dir, os.path.basename(file_path) + ACTIVITY_LOG_CACHE_SUFFIX)
+
+
+def load_activity_log(file_path, cache=False, cache_dir=None):
+    """
+    Loads an activity log, reusing the cells parsed in a previous run.
+
+    The cells read by extract_WPM_info_from_excel and calculate_accelerometer_drift
+    (WPM_INFO_CELLS and DRIFT_CELLS of ACTIVITY_LOG_SHEET) are stored in a JSON sidecar
+    keyed by the SHA-256 of the Excel file. Hashing the file is much cheaper than parsing
+    it, and any change of its content invalidates the cache. The cache is only used when
+    asked for, so nothing is written next to the data by default. If it cannot be
+    written (e.g. a read-only folder), the log is simply parsed every time.
+
+    :param file_path: Full path to the Excel file, or an ActivityLog (returned as it is).
+    :param cache: Use and update the cache. Default is False: the workbook is parsed.
+    :param cache_dir: Folder for the cache files. Default is next to the Excel file.
+    :return: An ActivityLog.
     """
+    if isinstance(file_path, ActivityLog):
+        return file_path
+    if not cache:
+        return ActivityLog(file_path)
+
+    cache_file = activity_log_cache_file(file_path, cache_dir)
+    file_hash = _file_sha256(file_path)
+    try:
+        with open(cache_file) as f:
+            state = json.load(f)
+        if state['version'] == ACTIVITY_LOG_CACHE_VERSION and state['sha256'] == file_hash:
+            cells = {cell: _cell_from_json(value) for cell, value in state['cells'].items()}
+            return ActivityLog(file_path, {ACTIVITY_LOG_SHEET: cells})
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    activity_log = ActivityLog(file_path)
+    cells = {cell: activity_log.value(ACTIVITY_LOG_SHEET, cell)
+             for cell in dict.fromkeys([cell for cell, _ in WPM_INFO_CELLS] + list(DRIFT_CELLS))} \
+        if ACTIVITY_LOG_SHEET in activity_log.sheets else {}
+    try:
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_file, 'w') as f:
+            json.dump({'version': ACTIVITY_LOG_CACHE_VERSION, 'sha256': file_hash,
+                       'cells': {cell: _cell_to_json(value) for cell, value in cells.items()}}, f)
+    except OSError:
+        pass
+    return activity_log
+
+
+def _read_excel_cell(file_path, sheet_name, cell_reference):
+    """Value of a cell of an Excel file or of an already parsed ActivityLog."""
+    if isinstance(file_path, ActivityLog):
+        return file_path.value(sheet_name, cell_reference)
+
     # Load the Excel file
     workbook = openpyxl.load_workbook(file_path, data_only=True)
 
@@ -31,7 +230,21 @@ def read_time_from_excel(file_path, sheet_name, cell_reference):
     sheet = workbook[sheet_name]
 
     # Read the cell value
-    cell_value = sheet[cell_reference].value
+    return sheet[cell_reference].value
+
+
+def read_time_from_excel(file_path, sheet_name, cell_reference):
+    """
+    Reads a specific cell from an Excel file that contains a time in the format 'hh:mm:ss' 
+    or 'h:mm:ss' and converts it into a Python 'time' object.
+
+    :param file_path: Full path to the Excel file, or an ActivityLog already parsed.
+    :param sheet_name: Name of the sheet where the cell is located.
+    :param cell_reference: Cell reference that contains the time (e.g., 'A1').
+    :return: A 'time' object with the converted time, or None if the format is invalid.
+    """
+    # Read the cell value
+    cell_value = _read_excel_cell(file_path, sheet_name, cell_reference)
 
     # If the value is a timedelta (accumulated hours)
     if isinstance(cell_value, timedelta):
@@ -83,19 +296,13 @@ def read_date_from_excel(file_path, sheet_name, cell_reference):
     Reads a specific cell from an Excel file that contains a date in the format 'day/month/year'
     and converts it into a Python 'date' object.
 
-    :param file_path: Full path to the Excel file.
+    :param file_path: Full path to the Excel file, or an ActivityLog already parsed.
     :param sheet_name: Name of the sheet where the cell is located.
     :param cell_reference: Cell reference that contains the date (e.g., 'A1').
     :return: A 'date' object with the converted date, or None if the format is invalid.
     """
-    # Load the Excel file
-    workbook = openpyxl.load_workbook(file_path, data_only=True)
-
-    # Select the worksheet
-    sheet = workbook[sheet_name]
-
     # Read the cell value
-    cell_value = sheet[cell_reference].value
+    cell_value = _read_excel_cell(file_path, sheet_name, cell_reference)
 
     # If the value is already a date object
     if isinstance(cell_value, date):
@@ -134,66 +341,19 @@ def extract_WPM_info_from_excel(file_path):
     Extracts time and date information from specific cells in an Excel file related to 
     a WPM study, and prints it in a formatted manner.
     
-    :param file_path: Full path to the Excel file.
+    :param file_path: Full path to the Excel file, or an ActivityLog already parsed.
     :return: A dictionary containing extracted times and dates.
     """
     time_data = {}
-
-    # Define cell locations and labels
-    cell_definitions = [
-        ("E37", "Hora de inicio de acelerómetro muslo (hh:mm:ss) - Hora de ordenador"),
-        ("E38", "Hora de inicio de acelerómetro cadera (hh:mm:ss) - Hora de ordenador"),
-        ("E39", "Hora de inicio de acelerómetro muñeca (hh:mm:ss) - Hora de ordenador"),
-        ("E13", "Fecha día 1"),
-        ("D60", "FASE REPOSO CON K5 - Hora de inicio"),
-        ("D61", "FASE REPOSO CON K5 - Hora de fin"),
-        ("D72", "TAPIZ RODANTE - Hora de inicio"),
-        ("D73", "TAPIZ RODANTE - Hora de fin"),
-        ("D81", "SIT TO STAND 30 s - Hora de inicio"),
-        ("D82", "SIT TO STAND 30 s - Hora de fin"),
-        ("D90", "INCREMENTAL CICLOERGOMETRO - Hora de inicio REPOSO"),
-        ("D91", "INCREMENTAL CICLOERGOMETRO - Hora de inicio CALENTAMIENTO"),
-        ("D92", "INCREMENTAL CICLOERGOMETRO - Hora de inicio INCREMENTAL"),
-        ("D93", "INCREMENTAL CICLOERGOMETRO - Hora de fin"),
-        ("D104", "ACTIVIDAD NO ESTRUCTURADA - Hora de inicio"),
-        ("D115", "ACTIVIDAD NO ESTRUCTURADA - Hora de fin"),
-        ("E112", "Fecha día 7"),
-        ("D144", "YOGA - Hora de inicio"),
-        ("D145", "YOGA - Hora de fin"),
-        ("D153", "SENTADO VIENDO LA TV - Hora de inicio"),
-        ("D154", "SENTADO VIENDO LA TV - Hora de fin"),
-        ("D162", "SENTADO LEYENDO - Hora de inicio"),
-        ("D163", "SENTADO LEYENDO - Hora de fin"),
-        ("D172", "SENTADO USANDO PC - Hora de inicio"),
-        ("D173", "SENTADO USANDO PC - Hora de fin"),
-        ("D181", "DE PIE USANDO PC - Hora de inicio"),
-        ("D182", "DE PIE USANDO PC - Hora de fin"),
-        ("D190", "DE PIE DOBLANDO TOALLAS - Hora de inicio"),
-        ("D191", "DE PIE DOBLANDO TOALLAS - Hora de fin"),
-        ("D199", "DE PIE MOVIENDO LIBROS - Hora de inicio"),
-        ("D200", "DE PIE MOVIENDO LIBROS - Hora de fin"),
-        ("D208", "DE PIE BARRIENDO - Hora de inicio"),
-        ("D209", "DE PIE BARRIENDO - Hora de fin"),
-        ("D219", "CAMINAR USUAL SPEED - Hora de inicio"),
-        ("D220", "CAMINAR USUAL SPEED - Hora de fin"),
-        ("D228", "CAMINAR CON MÓVIL O LIBRO - Hora de inicio"),
-        ("D229", "CAMINAR CON MÓVIL O LIBRO - Hora de fin"),
-        ("D237", "CAMINAR CON LA COMPRA - Hora de inicio"),
-        ("D238", "CAMINAR CON LA COMPRA - Hora de fin"),
-        ("D246", "CAMINAR ZIGZAG - Hora de inicio"),
-        ("D247", "CAMINAR ZIGZAG - Hora de fin"),
-        ("D255", "TROTAR - Hora de inicio"),
-        ("D256", "TROTAR - Hora de fin"),
-        ("D264", "SUBIR Y BAJAR ESCALERAS - Hora de inicio"),
-        ("D265", "SUBIR Y BAJAR ESCALERAS - Hora de fin")
-    ]
+    # The workbook is parsed once for all the cells
+    activity_log = load_activity_log(file_path)
 
     # Loop through each defined cell to extract and store data
-    for cell, label in cell_definitions:
+    for cell, label in WPM_INFO_CELLS:
         if "fecha" in label.lower():
-            result = read_date_from_excel(file_path, 'Hoja1', cell)
+            result = read_date_from_excel(activity_log, ACTIVITY_LOG_SHEET, cell)
         else:
-            result = read_time_from_excel(file_path, 'Hoja1', cell)
+            result = read_time_from_excel(activity_log, ACTIVITY_LOG_SHEET, cell)
 
         time_data[label] = result
         
@@ -208,21 +368,264 @@ def extract_WPM_info_from_excel(file_path):
     return time_data
 
 
-def load_MATRIX_data_by_index(csv_file, axes_indices = [1, 2, 3]):
+def _native_values(data, name):
+    """Values of one sensor of a native-rate archive; raw int16 counts are converted here, on demand."""
+    values = data[name]
+    if 'raw' not in data:
+        return values
+    if name == 'acc':
+        return acc_gyro_from_counts(values, data['acc_range'])
+    if name == 'gyr':
+        return acc_gyro_from_counts(values, data['gyro_range'])
+    if name == 'temps':
+        return values / 10
+    return values.astype(np.float64)
+
+
+def _load_native_npz(data, temp_ppg=True):
+    """Rebuild the CSV row layout from a native-rate archive written by bin2csv.bin2npz(native=True or raw=True)."""
+    imu_channels = ('acc', 'gyr')
+    if not temp_ppg and np.array_equal(data['acc_row'], data['gyr_row']):
+        # Same rows for both IMU sensors: the sparse channels are never read
+        return data['acc_dateTime'].reshape(-1, 1), np.hstack([_native_values(data, name) for name in imu_channels]), None
+    channels = imu_channels + (('temps', 'hr') if temp_ppg else ())
+    rows = np.arange(int(data['rows'])) if temp_ppg else np.union1d(data['acc_row'], data['gyr_row'])
+    timestamps = np.zeros(len(rows), dtype=np.int64)
+    columns = {}
+    for name in channels:
+        values = _native_values(data, name)
+        position = np.searchsorted(rows, data[name + '_row'])
+        timestamps[position] = data[name + '_dateTime']
+        columns[name] = np.full((len(rows), values.shape[1]), np.nan)
+        columns[name][position] = values
+    imu_data = np.hstack([columns[name] for name in imu_channels])
+    temp_ppg_data = np.hstack([columns['temps'], columns['hr']]) if temp_ppg else None
+    return timestamps.reshape(-1, 1), imu_data, temp_ppg_data
+
+
+# Columns of the CSV written by bin2csv (csvFileHead) loaded into the WPM arrays
+WPM_IMU_COLUMNS = ['acc_x', 'acc_y', 'acc_z', 'gyr_x', 'gyr_y', 'gyr_z']
+WPM_TEMP_PPG_COLUMNS = ['bodySurface_temp', 'ambient_temp', 'hr_raw', 'hr']
+
+# Rows parsed at a time by load_wpm_csv, and bytes read at a time to count them
+CSV_CHUNK_ROWS = 1 << 18
+CSV_COUNT_BUFFER_SIZE = 1 << 24
+CSV_ENGINES = ('c', 'pyarrow')
+COMPRESSED_CSV_EXTENSIONS = ('.gz', '.bz2', '.xz', '.zst', '.zip', '.tar')
+
+
+def _axes_indices(segment):
+    """Signed 1-based IMU axes of a body segment ('Wrist', 'Thigh', 'Hip'), of explicit indices or of None."""
+    if isinstance(segment, str):
+        if segment not in SEGMENT_AXES:
+            raise ValueError(f"Unknown body segment {segment}, expected one of {list(SEGMENT_AXES)}")
+        return np.array(SEGMENT_AXES[segment])
+    return np.array([1, 2, 3] if segment is None else segment)
+
+
+def _scale_timestamps(data, K):
+    """Same scaling as apply_scaling_to_matrix_data, in place on the timestamps column of data."""
+    if K != 1 and len(data):
+        first_timestamp = data[0, 0]
+        data[:, 0] -= first_timestamp
+        data[:, 0] /= K
+        data[:, 0] += first_timestamp
+    return data
+
+
+def _count_csv_rows(csv_file):
+    """Upper bound of the data rows of a CSV file: its lines without the header."""
+    lines, last = 0, b'\n'
+    with open(csv_file, 'rb') as f:
+        for block in iter(lambda: f.read(CSV_COUNT_BUFFER_SIZE), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    return max(lines + (last != b'\n') - 1, 0)
+
+
+def _csv_chunks(csv_file, columns, engine, chunk_rows):
+    """Consecutive blocks of rows of the CSV, as {column: float64 or int64 array}."""
+    dtypes = {column: np.float64 for column in columns}
+    dtypes['dateTime'] = np.int64
+    if engine == 'pyarrow':
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pa_csv
+        except ImportError:
+            raise ImportError("load_wpm_csv(engine='pyarrow') needs pyarrow: pip install pyarrow")
+        reader = pa_csv.open_csv(
+            csv_file,
+            read_options=pa_csv.ReadOptions(block_size=chunk_rows * 96),
+            convert_options=pa_csv.ConvertOptions(include_columns=columns,
+                                                  column_types={column: pa.from_numpy_dtype(dtype)
+                                                                for column, dtype in dtypes.items()}))
+        for batch in reader:
+            yield {column: batch.column(column).to_numpy(zero_copy_only=False) for column in columns}
+    else:
+        with pd.read_csv(csv_file, usecols=columns, dtype=dtypes, engine=engine, chunksize=chunk_rows) as reader:
+            for df in reader:
+                yield {column: df[column].to_numpy() for column in columns}
+
+
+def _write_npy_header(f, rows, width):
+    # The header of a float64 .npy file has room for any number of rows, so it is
+    # written first and rewritten with the final shape once the rows are known
+    np.lib.format.write_array_header_1_0(f, {'descr': np.lib.format.dtype_to_descr(np.dtype(np.float64)),
+                                             'fortran_order': False, 'shape': (rows, width)})
+
+
+def load_wpm_csv(csv_file, segment=None, K=1, temp_ppg=True, engine='c', chunk_rows=CSV_CHUNK_ROWS,
+                 time_ranges=None, npy_file=None):
+    """Load a CSV file written by bin2csv into the array of load_WPM_data.
+
+    Only the timestamp, IMU and (with ``temp_ppg``) temperature and PPG columns are
+    parsed, with their types given up front ('remarks' is skipped). The rows are read in
+    blocks of ``chunk_rows``; the axis remap of the body segment and the drift scaling
+    are applied to each block as it is copied into one preallocated float64 array, so
+    the peak memory is the result plus one block.
+
+    For recordings that do not fit in memory, ``time_ranges`` keeps only the rows inside
+    some time ranges (e.g. segmentation.activity_time_ranges) and ``npy_file`` writes
+    the rows to a .npy file, block by block, and returns it memory-mapped.
+
+    Args:
+        csv_file (str): Path to the CSV file (compressed files are read too, but then
+            the blocks are joined at the end instead of filling a preallocated array).
+        segment (str or list): 'Wrist', 'Thigh' or 'Hip' (see bin2csv.SEGMENT_AXES), the
+            signed 1-based axes indices of load_MATRIX_data_by_index, or None to keep
+            the axes of the device.
+        K (float): Drift factor applied to the timestamps, as apply_scaling_to_matrix_data
+            (relative to the first timestamp of the file). Defaults to 1 (no scaling).
+        temp_ppg (bool): Also load the temperature and PPG columns. Defaults to True.
+        engine (str): CSV parser: 'c' (pandas, default) or 'pyarrow' (multithreaded,
+            needs the optional pyarrow package).
+        chunk_rows (int): Rows parsed at a time.
+        time_ranges (list): (start, end) timestamps in milliseconds, compared with the
+            scaled timestamps. Only the rows inside one of them are kept. Default is all rows.
+        npy_file (str): Path of a .npy file (overwritten) where the rows are written.
+
+    Returns:
+        np.array: n x 7 (n x 11 with ``temp_ppg``) float64 array, a read-write np.memmap
+        of ``npy_file`` if given.
+
+    Raises:
+        ValueError: If the segment or the engine is unknown.
+    """
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Unknown CSV engine {engine}, expected one of {list(CSV_ENGINES)}")
+    axes_indices = _axes_indices(segment)
+    columns = ['dateTime'] + WPM_IMU_COLUMNS + (WPM_TEMP_PPG_COLUMNS if temp_ppg else [])
+    width = len(columns)
+    # CSV column of each output column, after the axis remap
+    axes = np.abs(axes_indices)
+    order = [columns[i] for i in np.concatenate([[0], axes, axes + 3, np.arange(7, width)])]
+    signs = np.concatenate([np.sign(axes_indices), np.sign(axes_indices)])
+    time_ranges = None if time_ranges is None else np.array(time_ranges, dtype=np.float64).reshape(-1, 2)
+
+    # Rows go straight into a preallocated array unless they are filtered, compressed or written to disk
+    preallocated = time_ranges is None and npy_file is None and \
+        not str(csv_file).lower().endswith(COMPRESSED_CSV_EXTENSIONS)
+    data = np.empty((_count_csv_rows(csv_file) if preallocated else 0, width))
+    parts = []
+    npy = open(npy_file, 'wb') if npy_file is not None else None
+    try:
+        if npy is not None:
+            _write_npy_header(npy, 0, width)
+        row, first_timestamp = 0, None
+        for chunk in _csv_chunks(csv_file, columns, engine, chunk_rows):
+            count = len(chunk['dateTime'])
+            rows = data[row:row + count] if preallocated else np.empty((count, width))
+            for i, column in enumerate(order):
+                rows[:, i] = chunk[column]
+            rows[:, 1:7] *= signs
+            if count and first_timestamp is None:
+                first_timestamp = rows[0, 0]
+            if K != 1 and count:
+                # Same scaling as apply_scaling_to_matrix_data, relative to the first row of the file
+                rows[:, 0] -= first_timestamp
+                rows[:, 0] /= K
+                rows[:, 0] += first_timestamp
+            if time_ranges is not None:
+                timestamps = rows[:, :1]
+                inside = ((timestamps >= time_ranges[:, 0]) & (timestamps <= time_ranges[:, 1])).any(axis=1)
+                rows = rows[inside]
+            if npy is not None:
+                rows.tofile(npy)
+            elif not preallocated:
+                parts.append(rows)
+            row += len(rows)
+        if npy is not None:
+            npy.seek(0)
+            _write_npy_header(npy, row, width)
+    finally:
+        if npy is not None:
+            npy.close()
+    if npy_file is not None:
+        return np.load(npy_file, mmap_mode='r+')
+    if preallocated:
+        return data[:row]
+    return np.concatenate(parts) if parts else np.empty((0, width))
+
+
+def load_MATRIX_data_by_index(csv_file, axes_indices = [1, 2, 3], temp_ppg=True, K=1, csv_engine='c',
+                              time_ranges=None, npy_file=None):
     """Load and process IMU data from a CSV file based on specific indices for axes of the IMU.
     
     Args:
-        csv_file (str): Path to the CSV file.
+        csv_file (str): Path to the CSV file (parsed by load_wpm_csv), or to the
+            .npz/.parquet file written by bin2csv.bin2npz/bin2csv.bin2parquet. The
+            int16 counts of raw archives are converted to g and deg/s when they are
+            loaded. A .BIN file (possibly compressed) is decoded directly with
+            bin2csv.load_wpm_bin.
         axes_indices (np.array): Array of indices to select specific IMU axes.
-    
+        temp_ppg (bool): Also load the temperature and PPG columns. With False only the
+            timestamps and IMU columns are read and returned.
+        K (float): Known drift factor; the timestamps are scaled in place as by
+            apply_scaling_to_matrix_data. Defaults to 1 (no scaling).
+        csv_engine (str): Parser of CSV files, 'c' or 'pyarrow' (see load_wpm_csv).
+        time_ranges (list): CSV files only: keep only the rows inside these (start, end)
+            timestamps in milliseconds (see load_wpm_csv).
+        npy_file (str): CSV files only: write the rows to this .npy file block by block
+            and return it memory-mapped (see load_wpm_csv).
+
     Returns:
         np.array: Array of timestamps and IMU data with the appropriate transformations.
     """
-    # Read the CSV file
-    df = pd.read_csv(csv_file)
-    
-    # Extract relevant IMU data (accelerometer and gyroscope)
-    imu_data = df[['acc_x', 'acc_y', 'acc_z', 'gyr_x', 'gyr_y', 'gyr_z']].to_numpy()
+    binary_formats = ('.bin', '.bin.gz', '.bin.xz', '.bin.zst', '.npz', '.parquet')
+    if str(csv_file).lower().endswith(binary_formats) and (time_ranges is not None or npy_file is not None):
+        raise ValueError("time_ranges and npy_file are only supported for CSV files")
+    if str(csv_file).lower().endswith(('.bin', '.bin.gz', '.bin.xz', '.bin.zst')):
+        # Axis remap and drift scaling are applied while the packages are decoded
+        return load_wpm_bin(csv_file, axes_indices, K, temp_ppg)
+    if not str(csv_file).lower().endswith(('.npz', '.parquet')):
+        # Typed columns parsed in blocks into one preallocated array
+        return load_wpm_csv(csv_file, axes_indices, K, temp_ppg, csv_engine, time_ranges=time_ranges,
+                            npy_file=npy_file)
+    imu_columns = WPM_IMU_COLUMNS
+    temp_ppg_columns = WPM_TEMP_PPG_COLUMNS if temp_ppg else []
+    if str(csv_file).lower().endswith('.npz'):
+        # Binary columns written by bin2npz: no text parsing needed
+        with np.load(csv_file) as data:
+            if 'rows' in data:
+                # Native-rate archive: every sensor with its own timestamps
+                timestamps, imu_data, temp_ppg_data = _load_native_npz(data, temp_ppg)
+            else:
+                imu_data = np.hstack([data['acc'], data['gyr']])
+                timestamps = data['dateTime'].reshape(-1, 1)
+                temp_ppg_data = np.hstack([data['temps'], data['hr']]) if temp_ppg else None
+    else:
+        # Typed columns written by bin2parquet (float32/int16, nulls as NaN)
+        df = pd.read_parquet(csv_file, columns=['dateTime'] + imu_columns + temp_ppg_columns)
+        df = df.astype(np.float64).astype({'dateTime': np.int64})
+
+        # Extract relevant IMU data (accelerometer and gyroscope)
+        imu_data = df[imu_columns].to_numpy()
+
+        # Extract timestamps
+        timestamps = df['dateTime'].to_numpy().reshape(-1, 1)
+
+        #Get remaining fields: temperatures and PPG data
+        temp_ppg_data = df[temp_ppg_columns].to_numpy() if temp_ppg else None
 
     # Apply index adjustments for axes selection
     #It is necessary to do this before sign correction, the order is RELEVANT
@@ -233,32 +636,131 @@ def load_MATRIX_data_by_index(csv_file, axes_indices = [1, 2, 3]):
     axis_signs = np.concatenate([np.sign(axes_indices), np.sign(axes_indices)])
     imu_data = imu_data * axis_signs
 
-    # Extract timestamps
-    timestamps = df['dateTime'].to_numpy().reshape(-1, 1)
- 
-    #Get remaining fields: temperatures and PPG data
-    temp_ppg_data = df[['bodySurface_temp','ambient_temp','hr_raw','hr']].to_numpy()    
-    combined_data = np.hstack([timestamps, imu_data, temp_ppg_data])
+    if temp_ppg_data is None:
+        combined_data = np.hstack([timestamps, imu_data])
+    else:
+        combined_data = np.hstack([timestamps, imu_data, temp_ppg_data])
+
+    # Same scaling as apply_scaling_to_matrix_data, on the new array instead of a copy
+    return _scale_timestamps(combined_data, K)
+
+
+# Binary sidecar of load_WPM_data(cache=True): <source>.<segment>.npy and its JSON header
+WPM_CACHE_SUFFIX = '.npy'
+WPM_CACHE_HEADER_SUFFIX = '.json'
+WPM_CACHE_VERSION = 1
+
+
+def _wpm_columns(axes_indices, temp_ppg=True):
+    """Columns of the array of load_MATRIX_data_by_index, with '-' on the inverted axes."""
+    imu = [('-' if index < 0 else '') + columns[abs(index) - 1]
+           for columns in (WPM_IMU_COLUMNS[:3], WPM_IMU_COLUMNS[3:]) for index in axes_indices]
+    return ['dateTime'] + imu + (WPM_TEMP_PPG_COLUMNS if temp_ppg else [])
+
+
+def wpm_cache_file(csv_file, segment, temp_ppg=True, cache_dir=None):
+    """Path of the .npy cache of load_WPM_data: next to the source file, or in cache_dir if given."""
+    name = f"{csv_file}.{segment}{'' if temp_ppg else '.imu'}{WPM_CACHE_SUFFIX}"
+    if cache_dir is None:
+        return name
+    return os.path.join(cache_dir, os.path.basename(name))
+
+
+def _load_wpm_cache(csv_file, segment, axes_indices, temp_ppg, csv_engine, cache_dir):
+    """Memory map of the cached array (K=1) of a recording, built first if it is missing or stale."""
+    cache_file = wpm_cache_file(csv_file, segment, temp_ppg, cache_dir)
+    header_file = cache_file + WPM_CACHE_HEADER_SUFFIX
+    columns = _wpm_columns(axes_indices, temp_ppg)
+    source = os.stat(csv_file)
+    try:
+        with open(header_file) as f:
+            header = json.load(f)
+        if header['version'] == WPM_CACHE_VERSION and header['segment'] == segment and header['columns'] == columns:
+            if (header['size'], header['mtime_ns']) != (source.st_size, source.st_mtime_ns):
+                # Touched or copied: only a change of content invalidates the cache
+                if header['sha256'] != _file_sha256(csv_file):
+                    raise ValueError('stale cache')
+                header['size'], header['mtime_ns'] = source.st_size, source.st_mtime_ns
+                with open(header_file, 'w') as f:
+                    json.dump(header, f)
+            return np.load(cache_file, mmap_mode='c')
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    header = {'version': WPM_CACHE_VERSION, 'source': os.path.basename(csv_file), 'sha256': _file_sha256(csv_file),
+              'size': source.st_size, 'mtime_ns': source.st_mtime_ns, 'segment': segment, 'columns': columns}
+    temporary_file = cache_file[:-len(WPM_CACHE_SUFFIX)] + '.tmp' + WPM_CACHE_SUFFIX
+    try:
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        if os.path.exists(header_file):
+            os.remove(header_file)
+        if str(csv_file).lower().endswith(('.bin', '.bin.gz', '.bin.xz', '.bin.zst', '.npz', '.parquet')):
+            np.save(temporary_file, load_MATRIX_data_by_index(csv_file, axes_indices, temp_ppg))
+        else:
+            # CSV rows go to the file block by block
+            load_MATRIX_data_by_index(csv_file, axes_indices, temp_ppg, csv_engine=csv_engine, npy_file=temporary_file)
+        os.replace(temporary_file, cache_file)
+        # The header is written last: without it the .npy file is never used
+        with open(header_file, 'w') as f:
+            json.dump(header, f)
+    except OSError:
+        # Read-only folder: load without cache
+        if os.path.exists(temporary_file):
+            os.remove(temporary_file)
+        return None
+    return np.load(cache_file, mmap_mode='c')
 
-    return combined_data
 
+def _scaled_cache_rows(data, K, time_ranges):
+    """Rows of a cached array with the drift scaling of load_wpm_csv and inside time_ranges."""
+    if K == 1 and time_ranges is None:
+        return data
+    timestamps = _scale_timestamps(np.array(data[:, :1]), K)
+    if time_ranges is None:
+        rows = np.array(data)
+    else:
+        time_ranges = np.array(time_ranges, dtype=np.float64).reshape(-1, 2)
+        inside = ((timestamps >= time_ranges[:, 0]) & (timestamps <= time_ranges[:, 1])).any(axis=1)
+        rows, timestamps = data[inside], timestamps[inside]
+    rows[:, :1] = timestamps
+    return rows
 
-def load_WPM_data(csv_file, segment):
+
+def load_WPM_data(csv_file, segment, temp_ppg=True, K=1, csv_engine='c', time_ranges=None, npy_file=None,
+                  cache=False, cache_dir=None):
     """Load IMU data based on the segment of the body being analyzed (e.g., Wrist, Thigh, Hip).
     
     Args:
-        csv_file (str): Path to the CSV file.
-        segment (str): Segment of the body (e.g., 'Wrist', 'Thigh').
+        csv_file (str): Path to the CSV file (or any file load_MATRIX_data_by_index reads,
+            .BIN recordings included).
+        segment (str): Segment of the body, 'Wrist', 'Thigh' or 'Hip' (see bin2csv.SEGMENT_AXES).
+        temp_ppg (bool): Also load the temperature and PPG columns (see load_MATRIX_data_by_index).
+        K (float): Known drift factor applied to the timestamps while loading. Defaults to 1.
+        csv_engine (str): Parser of CSV files, 'c' or 'pyarrow' (see load_wpm_csv).
+        time_ranges (list): CSV files only: rows kept (see load_MATRIX_data_by_index).
+        npy_file (str): CSV files only: .npy file the rows are written to (see load_MATRIX_data_by_index).
+        cache (bool): Keep the loaded array (without drift scaling) in a .npy sidecar
+            (wpm_cache_file) with a JSON header recording the SHA-256 of the source file,
+            the body segment and the column layout. Later loads memory-map it instead of
+            parsing the source again; a change of the file content or of the axes of the
+            segment rebuilds it. Defaults to False.
+        cache_dir (str): Folder of the cache files. Default is next to the source file.
     
     Returns:
-        np.array: Processed IMU data for the specified body segment.
+        np.array: Processed IMU data for the specified body segment. With ``cache``, a
+        copy-on-write np.memmap of the sidecar when K is 1 and there are no time_ranges.
     """
-    if segment == "Wrist":
-        return load_MATRIX_data_by_index(csv_file, np.array([-1, 3, -2]))
-    elif segment == "Thigh":
-        return load_MATRIX_data_by_index(csv_file, np.array([3, -1, 2]))
-    elif segment == "Hip":
-        return load_MATRIX_data_by_index(csv_file, np.array([-1, -3, -2]))
+    if segment not in SEGMENT_AXES:
+        return None
+    axes_indices = _axes_indices(segment)
+    if cache:
+        if npy_file is not None:
+            raise ValueError("npy_file can not be used together with cache")
+        data = _load_wpm_cache(csv_file, segment, axes_indices, temp_ppg, csv_engine, cache_dir)
+        if data is not None:
+            return _scaled_cache_rows(data, K, time_ranges)
+    return load_MATRIX_data_by_index(csv_file, axes_indices, temp_ppg, K, csv_engine, time_ranges, npy_file)
 
 
 def calculate_accelerometer_drift(WPM_data, excel_file_path, body_segment, walk_usual_speed_start_sample=None):
@@ -269,7 +771,8 @@ def calculate_accelerometer_drift(WPM_data, excel_file_path, body_segment, walk_
     Parameters:
     -----------
     * WPM_data: np.array containing the data from the MATRIX .CSV file (m samples and 11 features).
-    * excel_file_path: Path to the corresponding Activity Log (Excel) in the PMP dataset.
+    * excel_file_path: Path to the corresponding Activity Log (Excel) in the PMP dataset,
+      or an ActivityLog already parsed.
     * body_segment: string, Body segment where the IMU is placed ("Thigh", "Wrist" or "Hip").
     * walk_usual_speed_start_sample: Sample, identified through visual inspection, corresponding to
       the start of the "WALK-USUAL SPEED" activity. Default is None if not specified.
@@ -279,6 +782,8 @@ def calculate_accelerometer_drift(WPM_data, excel_file_path, body_segment, walk_
     * K: float, scaling factor for the MATRIX timestamps.
     """
 
+    activity_log = load_activity_log(excel_file_path)  # The workbook is parsed once for all the cells
+
     # MATRIX power-on/off timestamps from the Excel log
     imu_power_on_date_cell = "E13"  # Cell with the MATRIX power-on date
     imu_power_off_date_cell = "E112"  # Cell with the MATRIX power-off date
@@ -308,8 +813,8 @@ def calculate_accelerometer_drift(WPM_data, excel_file_path, body_segment, walk_
     # Calculate the difference between power-on and power-off timestamps
     matrix_timestamp_difference_ms = last_matrix_timestamp_ms - initial_matrix_timestamp_ms
     if not walk_usual_speed_start_sample:
-        matrix_power_off_date = read_date_from_excel(excel_file_path, "Hoja1", imu_power_off_date_cell)
-        matrix_power_off_time = read_time_from_excel(excel_file_path, "Hoja1", imu_power_off_time_cell)
+        matrix_power_off_date = read_date_from_excel(activity_log, "Hoja1", imu_power_off_date_cell)
+        matrix_power_off_time = read_time_from_excel(activity_log, "Hoja1", imu_power_off_time_cell)
     else:
         walk_start_matrix_timestamp_ms = WPM_data[walk_usual_speed_start_sample, 0]
         matrix_timestamp_difference_ms = walk_start_matrix_timestamp_ms - initial_matrix_timestamp_ms
@@ -320,8 +825,8 @@ def calculate_accelerometer_drift(WPM_data, excel_file_path, body_segment, walk_
     # *******************************************************************************************
 
     # *************************** EXCEL TIMESTAMPS ********************************
-    matrix_power_on_date = read_date_from_excel(excel_file_path, "Hoja1", imu_power_on_date_cell)
-    matrix_power_on_time = read_time_from_excel(excel_file_path, "Hoja1", imu_power_on_time_cell)
+    matrix_power_on_date = read_date_from_excel(activity_log, "Hoja1", imu_power_on_date_cell)
+    matrix_power_on_time = read_time_from_excel(activity_log, "Hoja1", imu_power_on_time_cell)
     matrix_power_on_datetime = datetime.combine(matrix_power_on_date, matrix_power_on_time)
     
     excel_power_on_timestamp_sec = matrix_power_on_datetime.timestamp()
@@ -336,8 +841,8 @@ def calculate_accelerometer_drift(WPM_data, excel_file_path, body_segment, walk_
     elif matrix_power_off_date is None:
         walk_start_date_cell = "E112"
         walk_start_time_cell = "D219"
-        walk_start_date = read_date_from_excel(excel_file_path, "Hoja1", walk_start_date_cell)
-        walk_start_time = read_time_from_excel(excel_file_path, "Hoja1", walk_start_time_cell)
+        walk_start_date = read_date_from_excel(activity_log, "Hoja1", walk_start_date_cell)
+        walk_start_time = read_time_from_excel(activity_log, "Hoja1", walk_start_time_cell)
         walk_start_datetime = datetime.combine(walk_start_date, walk_start_time)
         excel_walk_start_timestamp_sec = walk_start_datetime.timestamp()
         excel_walk_start_timestamp_ms = excel_walk_start_timestamp_sec * 1000
@@ -385,7 +890,8 @@ def apply_scaling_to_matrix_data(WPM_data, K):
 
     return WPM_data_scaled
 
-def load_scale_WPM_data(csv_file_PMP, segment_body, excel_file_path, calibrate_with_start_WALKING_USUAL_SPEED=None):
+def load_scale_WPM_data(csv_file_PMP, segment_body, excel_file_path, calibrate_with_start_WALKING_USUAL_SPEED=None, K=None,
+                        npy_file=None, only_activities=None, cache=False):
     """
     This function encapsulates the code to perform load and scaling of WPM data
     Segmentation is not applied in this function.
@@ -397,10 +903,23 @@ def load_scale_WPM_data(csv_file_PMP, segment_body, excel_file_path, calibrate_w
     * segment_body: string, body segment where the IMU is placed 
       ("Thigh", "Wrist", or "Hip").
     * excel_file_path: string, path to the corresponding Activity 
-      Log of the PMP dataset.
+      Log of the PMP dataset (or an ActivityLog already parsed).
     * calibrate_with_start_WALKING_USUAL_SPEED: int. The sample, visually 
       inspected, that corresponds to the start of the "WALKING-USUAL SPEED" 
       activity. If not specified, its default value is None.
+    * K: float. Drift factor already known for this recording. The timestamps are then
+      scaled while the data is loaded (decoded, for .BIN files) and the drift is not
+      calculated again. If not specified, its default value is None.
+    * npy_file: string. For CSV files, path of a .npy file where the data is written
+      block by block; it is returned memory-mapped and scaled in place, so recordings
+      larger than the memory can be processed. If not specified, its default value is None.
+    * only_activities: list of activity names (see segmentation.WPM_ACTIVITIES), or True
+      for all of them. For CSV files, only the samples of those activities are loaded
+      (see segmentation.activity_time_ranges). Needs K, as the drift can not be
+      calculated from part of the recording. If not specified, its default value is None.
+    * cache: bool. Reuse the binary sidecar of the loaded data (see load_WPM_data) and the
+      cache of the activity log (see load_activity_log), so segmenting again with other
+      parameters does not parse the CSV nor the Excel file. Default is False.
       
     - Return Value:
     --------------------
@@ -408,11 +927,23 @@ def load_scale_WPM_data(csv_file_PMP, segment_body, excel_file_path, calibrate_w
     """
     
     # ********************************** DATA READING ***************************************
-    WPM_data_W1 = load_WPM_data(csv_file_PMP, segment_body)                                                   # Read data: accelerometer placed on a body segment
-    dictionary_timing_WPM_PMP = extract_WPM_info_from_excel(excel_file_path)                         # Read timestamps stored in the cells of the activity log
+    activity_log = load_activity_log(excel_file_path, cache=cache)                                   # Parse the activity log once (or read its cache)
+    dictionary_timing_WPM_PMP = extract_WPM_info_from_excel(activity_log)                            # Read timestamps stored in the cells of the activity log
+    time_ranges = None
+    if only_activities is not None:
+        if K is None:
+            raise ValueError("only_activities needs the drift factor K of the recording")
+        time_ranges = activity_time_ranges(dictionary_timing_WPM_PMP, None if only_activities is True else only_activities)
+    if K is not None:
+        WPM_data_PMP_W1_SCALED = load_WPM_data(csv_file_PMP, segment_body, K=K, time_ranges=time_ranges,
+                                               npy_file=npy_file, cache=cache)                        # Read data already scaled
+        return WPM_data_PMP_W1_SCALED, dictionary_timing_WPM_PMP
+    WPM_data_W1 = load_WPM_data(csv_file_PMP, segment_body, npy_file=npy_file, cache=cache)                 # Read data: accelerometer placed on a body segment
 
     # ******************************* TIMESTAMP SCALING *************************************
-    K = calculate_accelerometer_drift(WPM_data_W1, excel_file_path, segment_body, calibrate_with_start_WALKING_USUAL_SPEED) # Calculate scaling factor for MATRIX timestamps
+    K = calculate_accelerometer_drift(WPM_data_W1, activity_log, segment_body, calibrate_with_start_WALKING_USUAL_SPEED) # Calculate scaling factor for MATRIX timestamps
+    if npy_file is not None:
+        return _scale_timestamps(WPM_data_W1, K), dictionary_timing_WPM_PMP                           # Scaled in place in the memory-mapped file
     WPM_data_PMP_W1_SCALED = apply_scaling_to_matrix_data(WPM_data_W1, K)                                                              # Apply scaling
     
     return WPM_data_PMP_W1_SCALED, dictionary_timing_WPM_PMP
@@ -422,7 +953,7 @@ def load_scale_WPM_data(csv_file_PMP, segment_body, excel_file_path, calibrate_w
 SECTION EXAMPLES
 """
 
-def load_segment_wpm_data(csv_file, excel_activity_log, body_segment, plot_data = True, out_file = None, sample_init_CAMINAR_USUAL_SPEED=None):
+def load_segment_wpm_data(csv_file, excel_activity_log, body_segment, plot_data = True, out_file = None, sample_init_CAMINAR_USUAL_SPEED=None, npy_file=None, cache=False):
     """
     Loads, scales, segments, and plots WPM data for two datasets.
 
@@ -433,12 +964,16 @@ def load_segment_wpm_data(csv_file, excel_activity_log, body_segment, plot_data
         plot_data (bool, optional): Whether to plot the segmented data. Defaults to True.
         out_file (str, optional): Name of the output file to save the segmented data. Do not include extension, it will be saved as a compressed .npz file.
         sample_init_CAMINAR_USUAL_SPEED_PMP1020_PI (int, optional): Sample index for "CAMINAR - USUAL SPEED". If not included, it assumed that the stopping time for the accelerometer is registered in the Excel file.
+        npy_file (str, optional): Memory-mapped .npy file for the loaded CSV data, for recordings larger than the memory (see load_scale_WPM_data).
+        cache (bool, optional): Reuse the binary sidecar of the loaded data and the cache of the activity log instead of parsing them again (see load_WPM_data and load_activity_log). Defaults to False.
         """
     scaled_data, dictionary_timing = load_scale_WPM_data(
         csv_file,
         body_segment,
         excel_activity_log,
-        sample_init_CAMINAR_USUAL_SPEED
+        sample_init_CAMINAR_USUAL_SPEED,
+        npy_file=npy_file,
+        cache=cache
     )
 
     segmented_activity_data = segment_WPM_activity_data(dictionary_timing,
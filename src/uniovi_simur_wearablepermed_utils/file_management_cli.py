@@ -51,6 +51,16 @@ def main():
         type=int,
         help="Índice de muestra para el inicio de \"CAMINAR - USUAL SPEED\""
     )
+    parser.add_argument(
+        "--npy-file",
+        type=str,
+        help="Archivo .npy donde se vuelcan los datos del CSV por bloques (memoria mapeada), para registros que no caben en memoria"
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Guardar los datos cargados en un .npy junto al CSV (y las celdas del registro de actividades en un .json junto al Excel) y reutilizarlos mientras no cambien"
+    )
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
@@ -95,7 +105,9 @@ def main():
             body_segment=args.body_segment,
             plot_data=plot,
             out_file=args.output,
-            sample_init_CAMINAR_USUAL_SPEED=args.sample_init
+            sample_init_CAMINAR_USUAL_SPEED=args.sample_init,
+            npy_file=args.npy_file,
+            cache=args.cache
         )
         
         if args.verbose:
@@ -89,6 +89,10 @@ def create_sample_config(output_file="wpm_pipeline_config.json"):
         ],
         "stages": [1, 2, 3, 4],
         "parameters": {
+            "stage1": {
+                "format": "csv",
+                "workers": 1
+            },
             "stage2": {
                 "activity_log": "/Users/antoniolopez/desarrollo_codigo/wearablepermed/uniovi-simur-wearablepermed-utils/tests/sandbox/pipe_test/PMP1020_RegistroActividades.xlsx"
             },
@@ -163,6 +167,10 @@ def run_from_config(config_file, force_regenerate=False, skip_existing=False, dr
     print(f"🔧 Stages to run: {stages}")
     print()
     
+    # Stage 1 output format ("csv" or "npz"), also the input of stage 2
+    data_format = params.get('stage1', {}).get('format', 'csv')
+    workers = params.get('stage1', {}).get('workers', 1)
+    
     # Track regeneration cascade
     regenerate_from_stage = None
     
@@ -176,9 +184,9 @@ def run_from_config(config_file, force_regenerate=False, skip_existing=False, dr
         stage_regenerated = False
         
         if stage_num == 1:
-            success, stage_regenerated = execute_stage1_multi(base_folder, subjects, force_regenerate, skip_existing, regenerate_from_stage, dry_run)
+            success, stage_regenerated = execute_stage1_multi(base_folder, subjects, force_regenerate, skip_existing, regenerate_from_stage, dry_run, data_format, workers)
         elif stage_num == 2:
-            success, stage_regenerated = execute_stage2_multi(base_folder, subjects, params.get('stage2', {}), force_regenerate, skip_existing, regenerate_from_stage, dry_run)
+            success, stage_regenerated = execute_stage2_multi(base_folder, subjects, params.get('stage2', {}), force_regenerate, skip_existing, regenerate_from_stage, dry_run, data_format)
         elif stage_num == 3:
             success, stage_regenerated = execute_stage3_multi(base_folder, subjects, params.get('stage3', {}), force_regenerate, skip_existing, regenerate_from_stage, dry_run)
         elif stage_num == 4:
@@ -333,8 +341,8 @@ def execute_stage4(base_folder, subject_name, force_regenerate=False, skip_exist
     return run_command(command)
 
 
-def execute_stage1_multi(base_folder, subjects, force_regenerate=False, skip_existing=False, regenerate_from_stage=None, dry_run=False):
-    """Execute Stage 1 for multiple subjects: BIN to CSV."""
+def execute_stage1_multi(base_folder, subjects, force_regenerate=False, skip_existing=False, regenerate_from_stage=None, dry_run=False, data_format='csv', workers=1):
+    """Execute Stage 1 for multiple subjects: BIN to CSV (or NPZ with data_format='npz')."""
     dry_run_text = " [DRY RUN]" if dry_run else ""
     print(f"\n🔄 Executing Stage 1 - Binary to CSV for {len(subjects)} subjects...{dry_run_text}")
     
@@ -345,7 +353,7 @@ def execute_stage1_multi(base_folder, subjects, force_regenerate=False, skip_exi
         print(f"\n  [{i}/{len(subjects)}] Processing {subject_name}...")
         
         bin_file = os.path.join(base_folder, f"{subject_name}.BIN")
-        csv_file = os.path.join(base_folder, f"{subject_name}.csv")
+        csv_file = os.path.join(base_folder, f"{subject_name}.{data_format}")
         
         if not os.path.exists(bin_file):
             print(f"    ❌ BIN file not found: {bin_file}")
@@ -360,6 +368,8 @@ def execute_stage1_multi(base_folder, subjects, force_regenerate=False, skip_exi
         
         any_regenerated = True
         command = ['sensor_bin_to_csv', bin_file, csv_file]
+        if workers > 1:
+            command.extend(['--workers', str(workers)])
         if not run_command(command, dry_run):
             print(f"    ❌ Failed processing {subject_name}")
             return False, any_regenerated
@@ -368,8 +378,8 @@ def execute_stage1_multi(base_folder, subjects, force_regenerate=False, skip_exi
     return True, any_regenerated
 
 
-def execute_stage2_multi(base_folder, subjects, stage2_params, force_regenerate=False, skip_existing=False, regenerate_from_stage=None, dry_run=False):
-    """Execute Stage 2 for multiple subjects: CSV to Segmented."""
+def execute_stage2_multi(base_folder, subjects, stage2_params, force_regenerate=False, skip_existing=False, regenerate_from_stage=None, dry_run=False, data_format='csv'):
+    """Execute Stage 2 for multiple subjects: CSV (or NPZ) to Segmented."""
     dry_run_text = " [DRY RUN]" if dry_run else ""
     print(f"\n🔄 Executing Stage 2 - CSV to Segmented Activity for {len(subjects)} subjects...{dry_run_text}")
     
@@ -379,7 +389,7 @@ def execute_stage2_multi(base_folder, subjects, stage2_params, force_regenerate=
         subject_name = subject['name']
         print(f"\n  [{i}/{len(subjects)}] Processing {subject_name}...")
         
-        csv_file = os.path.join(base_folder, f"{subject_name}.csv")
+        csv_file = os.path.join(base_folder, f"{subject_name}.{data_format}")
         output_file = os.path.join(base_folder, f"{subject_name}_segmented.npz")
         
         if not os.path.exists(csv_file):
@@ -12,6 +12,35 @@ import openpyxl
 from datetime import time, timedelta, date
 from matplotlib.backends.backend_pdf import PdfPages
 
+# Activities segmented by segment_WPM_activity_data, with the keys of their start/end
+# times and dates in the dictionary of file_management.extract_WPM_info_from_excel
+WPM_ACTIVITIES = [
+    ('FASE REPOSO CON K5', 'FASE REPOSO CON K5 - Hora de inicio', 'FASE REPOSO CON K5 - Hora de fin', 'Fecha día 1', 'Fecha día 1'),
+    ('TAPIZ RODANTE', 'TAPIZ RODANTE - Hora de inicio', 'TAPIZ RODANTE - Hora de fin', 'Fecha día 1', 'Fecha día 1'),
+    ('SIT TO STAND 30 s', 'SIT TO STAND 30 s - Hora de inicio', 'SIT TO STAND 30 s - Hora de fin', 'Fecha día 1', 'Fecha día 1'),
+    ('INCREMENTAL CICLOERGOMETRO', 'INCREMENTAL CICLOERGOMETRO - Hora de inicio REPOSO', 'INCREMENTAL CICLOERGOMETRO - Hora de fin', 'Fecha día 1', 'Fecha día 1'),
+    ('YOGA', 'YOGA - Hora de inicio', 'YOGA - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('SENTADO VIENDO LA TV', 'SENTADO VIENDO LA TV - Hora de inicio', 'SENTADO VIENDO LA TV - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('SENTADO LEYENDO', 'SENTADO LEYENDO - Hora de inicio', 'SENTADO LEYENDO - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('SENTADO USANDO PC', 'SENTADO USANDO PC - Hora de inicio', 'SENTADO USANDO PC - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('DE PIE USANDO PC', 'DE PIE USANDO PC - Hora de inicio', 'DE PIE USANDO PC - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('DE PIE DOBLANDO TOALLAS', 'DE PIE DOBLANDO TOALLAS - Hora de inicio', 'DE PIE DOBLANDO TOALLAS - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('DE PIE MOVIENDO LIBROS', 'DE PIE MOVIENDO LIBROS - Hora de inicio', 'DE PIE MOVIENDO LIBROS - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('DE PIE BARRIENDO', 'DE PIE BARRIENDO - Hora de inicio', 'DE PIE BARRIENDO - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('CAMINAR USUAL SPEED', 'CAMINAR USUAL SPEED - Hora de inicio', 'CAMINAR USUAL SPEED - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('CAMINAR CON MÓVIL O LIBRO', 'CAMINAR CON MÓVIL O LIBRO - Hora de inicio', 'CAMINAR CON MÓVIL O LIBRO - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('CAMINAR CON LA COMPRA', 'CAMINAR CON LA COMPRA - Hora de inicio', 'CAMINAR CON LA COMPRA - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('CAMINAR ZIGZAG', 'CAMINAR ZIGZAG - Hora de inicio', 'CAMINAR ZIGZAG - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('TROTAR', 'TROTAR - Hora de inicio', 'TROTAR - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('SUBIR Y BAJAR ESCALERAS', 'SUBIR Y BAJAR ESCALERAS - Hora de inicio', 'SUBIR Y BAJAR ESCALERAS - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
+    ('ACTIVIDAD NO ESTRUCTURADA', 'ACTIVIDAD NO ESTRUCTURADA - Hora de inicio', 'ACTIVIDAD NO ESTRUCTURADA - Hora de fin', 'Fecha día 1', 'Fecha día 7')
+]
+
+# Margin kept around each activity by activity_time_ranges: segment_MATRIX_data_by_dates
+# takes the closest sample to each boundary, which may fall just outside the activity
+ACTIVITY_RANGE_MARGIN_MS = 1000
+
+
 ######## Segmentations Functions ########
 
 def find_closest_timestamp(arr, target_timestamp):
@@ -95,31 +124,9 @@ def segment_WPM_activity_data(dictionary_hours_wpm, imu_data):
     # Create a new dictionary to store segmented data
     segmented_data_wpm = {}
 
-    # List of activities to segment with their corresponding sheet keys
-    activities = [
-        ('FASE REPOSO CON K5', 'FASE REPOSO CON K5 - Hora de inicio', 'FASE REPOSO CON K5 - Hora de fin', 'Fecha día 1', 'Fecha día 1'),
-        ('TAPIZ RODANTE', 'TAPIZ RODANTE - Hora de inicio', 'TAPIZ RODANTE - Hora de fin', 'Fecha día 1', 'Fecha día 1'),
-        ('SIT TO STAND 30 s', 'SIT TO STAND 30 s - Hora de inicio', 'SIT TO STAND 30 s - Hora de fin', 'Fecha día 1', 'Fecha día 1'),
-        ('INCREMENTAL CICLOERGOMETRO', 'INCREMENTAL CICLOERGOMETRO - Hora de inicio REPOSO', 'INCREMENTAL CICLOERGOMETRO - Hora de fin', 'Fecha día 1', 'Fecha día 1'),
-        ('YOGA', 'YOGA - Hora de inicio', 'YOGA - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('SENTADO VIENDO LA TV', 'SENTADO VIENDO LA TV - Hora de inicio', 'SENTADO VIENDO LA TV - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('SENTADO LEYENDO', 'SENTADO LEYENDO - Hora de inicio', 'SENTADO LEYENDO - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('SENTADO USANDO PC', 'SENTADO USANDO PC - Hora de inicio', 'SENTADO USANDO PC - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('DE PIE USANDO PC', 'DE PIE USANDO PC - Hora de inicio', 'DE PIE USANDO PC - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('DE PIE DOBLANDO TOALLAS', 'DE PIE DOBLANDO TOALLAS - Hora de inicio', 'DE PIE DOBLANDO TOALLAS - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('DE PIE MOVIENDO LIBROS', 'DE PIE MOVIENDO LIBROS - Hora de inicio', 'DE PIE MOVIENDO LIBROS - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('DE PIE BARRIENDO', 'DE PIE BARRIENDO - Hora de inicio', 'DE PIE BARRIENDO - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('CAMINAR USUAL SPEED', 'CAMINAR USUAL SPEED - Hora de inicio', 'CAMINAR USUAL SPEED - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('CAMINAR CON MÓVIL O LIBRO', 'CAMINAR CON MÓVIL O LIBRO - Hora de inicio', 'CAMINAR CON MÓVIL O LIBRO - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('CAMINAR CON LA COMPRA', 'CAMINAR CON LA COMPRA - Hora de inicio', 'CAMINAR CON LA COMPRA - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('CAMINAR ZIGZAG', 'CAMINAR ZIGZAG - Hora de inicio', 'CAMINAR ZIGZAG - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('TROTAR', 'TROTAR - Hora de inicio', 'TROTAR - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('SUBIR Y BAJAR ESCALERAS', 'SUBIR Y BAJAR ESCALERAS - Hora de inicio', 'SUBIR Y BAJAR ESCALERAS - Hora de fin', 'Fecha día 7', 'Fecha día 7'),
-        ('ACTIVIDAD NO ESTRUCTURADA', 'ACTIVIDAD NO ESTRUCTURADA - Hora de inicio', 'ACTIVIDAD NO ESTRUCTURADA - Hora de fin', 'Fecha día 1', 'Fecha día 7')
-    ]
 
     # Iterate over the activity definitions and segment data
-    for activity_name, start_key, end_key, start_date_key, end_date_key in activities:
+    for activity_name, start_key, end_key, start_date_key, end_date_key in WPM_ACTIVITIES:
         start_time = datetime.combine(dictionary_hours_wpm[start_date_key], dictionary_hours_wpm[start_key])
         end_time = datetime.combine(dictionary_hours_wpm[end_date_key], dictionary_hours_wpm[end_key])
         data = segment_MATRIX_data_by_dates(imu_data, start_time, end_time)
@@ -128,6 +135,37 @@ def segment_WPM_activity_data(dictionary_hours_wpm, imu_data):
     return segmented_data_wpm
 
 
+def activity_time_ranges(dictionary_hours_wpm, activities=None, margin_ms=ACTIVITY_RANGE_MARGIN_MS):
+    """
+    Time ranges of the activities segmented by segment_WPM_activity_data.
+
+    Loading only the samples inside these ranges (file_management.load_wpm_csv with
+    time_ranges) gives the same segments as loading the whole recording, as long as
+    there is data within margin_ms of every boundary. Note that 'ACTIVIDAD NO
+    ESTRUCTURADA' goes from day 1 to day 7; leave it out of activities to skip the
+    days between the two laboratory sessions.
+
+    Parameters:
+    dictionary_hours_wpm (dict): Dictionary containing time data for various activities.
+    activities (list): Names of the activities (first item of WPM_ACTIVITIES). Default is all.
+    margin_ms (float): Milliseconds added before the start and after the end of each activity.
+
+    Returns:
+    list: (start, end) timestamps in milliseconds, one per activity with its dates and times.
+    """
+    time_ranges = []
+    for activity_name, start_key, end_key, start_date_key, end_date_key in WPM_ACTIVITIES:
+        keys = (start_key, end_key, start_date_key, end_date_key)
+        if activities is not None and activity_name not in activities:
+            continue
+        if any(dictionary_hours_wpm.get(key) is None for key in keys):
+            continue
+        start_time = datetime.combine(dictionary_hours_wpm[start_date_key], dictionary_hours_wpm[start_key])
+        end_time = datetime.combine(dictionary_hours_wpm[end_date_key], dictionary_hours_wpm[end_key])
+        time_ranges.append((start_time.timestamp() * 1000 - margin_ms, end_time.timestamp() * 1000 + margin_ms))
+    return time_ranges
+
+
 def plot_segmented_WPM_data(WPM_data, file_name=None):
     """
     Plot activity-by-activity segmented data from MATRIX.
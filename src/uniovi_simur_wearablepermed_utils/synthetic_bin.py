@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Synthetic MATRIX .BIN recordings for benchmarks and regression tests.
+
+The files follow the layout ``bin2csv`` reads: REMARKES_SIZE bytes of remarks, the
+'4sIHH' file header and one 'MDTCPACK' package per ``package_seconds`` with its
+'8sIIIIIII' header, the CRC32 of the package and the int16 samples of every sensor.
+No patient data is needed to test or time the decoder on long recordings.
+"""
+
+import argparse
+import binascii
+import sys
+
+import numpy as np
+
+from .bin2csv import (ACC_GYRO_CHANNELS, FILE_HEADER_STRUCT, PACKAGE_HEARD_KEY, RAW_SAMPLE_DTYPE, REMARKES_SIZE,
+                      TEMPER_HEART_CHANNELS, WRITE_BUFFER_SIZE, _parse_channels)
+
+__all__ = ['write_synthetic_bin', 'parse_duration']
+
+# Paquetes que se generan y escriben de una vez
+SYNTHETIC_BLOCK_PACKAGES = 4096
+
+# Duraciones con sufijo: '90s', '30m', '1h', '7d'
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_duration(text):
+    """Seconds of a duration given as a number of seconds or with an s/m/h/d suffix ('1h', '7d')."""
+    text = str(text).strip().lower()
+    if text and text[-1] in DURATION_UNITS:
+        return float(text[:-1]) * DURATION_UNITS[text[-1]]
+    return float(text)
+
+
+def _samples_per_package(rate, package_seconds, name):
+    count = rate * package_seconds
+    if count != int(count) or count < 0:
+        raise ValueError(f'{name} rate {rate} Hz does not give a whole number of samples per package')
+    return int(count)
+
+
+def _package_dtype(sampleCounts):
+    # Un paquete completo: cabecera '8sIIIIIII' seguida de los bloques int16 de cada sensor
+    fields = [('recString', 'S8'), ('crc32', '<u4'), ('start', '<u4'), ('end', '<u4'),
+              ('acc_count', '<u4'), ('gyr_count', '<u4'), ('temp_count', '<u4'), ('hr_count', '<u4')]
+    widths = (ACC_GYRO_CHANNELS, ACC_GYRO_CHANNELS, TEMPER_HEART_CHANNELS, TEMPER_HEART_CHANNELS)
+    for name, count, width in zip(('acc', 'gyr', 'temp', 'hr'), sampleCounts, widths):
+        if count:
+            fields.append((name, RAW_SAMPLE_DTYPE, (count, width)))
+    return np.dtype(fields)
+
+
+def _fill_samples(block, sampleCounts, accRange, rng):
+    # Señales sencillas pero plausibles: gravedad en z con ruido, giroscopio en reposo, 33 ºC y 60-100 lpm
+    n = len(block)
+    accCount, gyrCount, tempCount, hrCount = sampleCounts
+    if accCount:
+        acc = rng.normal(0, 0.05 * 0x7fff / accRange, (n, accCount, ACC_GYRO_CHANNELS))
+        acc[:, :, 2] += 0x7fff / accRange
+        block['acc'] = np.clip(np.rint(acc), -0x8000, 0x7fff)
+    if gyrCount:
+        block['gyr'] = np.clip(np.rint(rng.normal(0, 200, (n, gyrCount, ACC_GYRO_CHANNELS))), -0x8000, 0x7fff)
+    if tempCount:
+        block['temp'] = rng.integers(320, 345, (n, tempCount, TEMPER_HEART_CHANNELS))
+    if hrCount:
+        block['hr'] = rng.integers(60, 100, (n, hrCount, TEMPER_HEART_CHANNELS))
+
+
+def write_synthetic_bin(bin_file, duration=3600, sample_rate=25, channels='all', temp_rate=1, hr_rate=1,
+                        package_seconds=2, start=1700000000, acc_range=8, gyro_range=2000,
+                        remarks='synthetic recording', corrupt_packages=(), gaps=None, duplicate_last=False,
+                        seed=0):
+    """Write a synthetic MATRIX .BIN file.
+
+    Packages cover ``package_seconds`` each and follow one another without gaps, except
+    where ``gaps`` says otherwise. The samples are random but reproducible for a given
+    ``seed``. The file is written in blocks of SYNTHETIC_BLOCK_PACKAGES packages, so a
+    recording of several days needs little memory.
+
+    Args:
+        bin_file (str): Path to the output .BIN file (overwritten).
+        duration (float or str): Length of the recording in seconds, or with a suffix
+            as in ``parse_duration`` ('1h', '1d', '7d').
+        sample_rate (float): Accelerometer and gyroscope rate in Hz.
+        channels (str or list): Sensors with samples, as in ``bin2csv.iter_wpm_packages``
+            ('all', 'acc', 'acc+gyr', ...). The others get zero samples per package.
+        temp_rate, hr_rate (float): Temperature and heart rate rates in Hz.
+        package_seconds (int): Seconds covered by each package.
+        start (int): Start of the first package, in epoch seconds.
+        acc_range, gyro_range (int): Ranges written in the file header.
+        remarks (str): Text of the remarks block.
+        corrupt_packages (iterable): Numbers of the packages written with a wrong CRC32.
+        gaps (dict): ``{package: seconds}``, time without data before those packages.
+        duplicate_last (bool): Write the last package twice, as the device sometimes does.
+        seed (int): Seed of the random samples.
+
+    Returns:
+        int: Number of packages written (``headerPackeNum``).
+
+    Raises:
+        ValueError: If a rate does not give a whole number of samples per package.
+    """
+    channels = _parse_channels(channels)
+    rates = {'acc': sample_rate, 'gyr': sample_rate, 'temps': temp_rate, 'hr': hr_rate}
+    sampleCounts = tuple(_samples_per_package(rates[name], package_seconds, name) if name in channels else 0
+                         for name in ('acc', 'gyr', 'temps', 'hr'))
+    if max(sampleCounts) <= 0:
+        raise ValueError('write_synthetic_bin: the packages would have no samples')
+    packageCount = max(1, int(np.ceil(parse_duration(duration) / package_seconds)))
+    corrupt = np.zeros(packageCount, dtype=bool)
+    corrupt[[j for j in corrupt_packages if 0 <= j < packageCount]] = True
+    # Inicio de cada paquete: uno tras otro, con los huecos pedidos
+    delays = np.zeros(packageCount, dtype=np.int64)
+    for j, seconds in (gaps or {}).items():
+        if 0 <= j < packageCount:
+            delays[j] = seconds
+    starts = start + np.arange(packageCount, dtype=np.int64) * package_seconds + np.cumsum(delays)
+    dtype = _package_dtype(sampleCounts)
+    rng = np.random.default_rng(seed)
+    with open(bin_file, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(remarks.encode('utf-8')[:REMARKES_SIZE].ljust(REMARKES_SIZE, b'\0'))
+        f.write(FILE_HEADER_STRUCT.pack(b'MDTC', packageCount + bool(duplicate_last), acc_range, gyro_range))
+        for first in range(0, packageCount, SYNTHETIC_BLOCK_PACKAGES):
+            block = np.zeros(min(SYNTHETIC_BLOCK_PACKAGES, packageCount - first), dtype=dtype)
+            block['recString'] = PACKAGE_HEARD_KEY
+            block['start'] = starts[first:first + len(block)]
+            block['end'] = block['start'] + package_seconds
+            block['acc_count'], block['gyr_count'], block['temp_count'], block['hr_count'] = sampleCounts
+            _fill_samples(block, sampleCounts, acc_range, rng)
+            # El CRC32 cubre el paquete desde el campo 'start'
+            raw = memoryview(block.view(np.uint8))
+            crcStart = dtype.fields['start'][1]
+            block['crc32'] = [binascii.crc32(raw[offset + crcStart:offset + dtype.itemsize])
+                              for offset in range(0, len(raw), dtype.itemsize)]
+            block['crc32'][corrupt[first:first + len(block)]] ^= 0xffffffff
+            f.write(block.tobytes())
+        if duplicate_last:
+            f.write(block[-1:].tobytes())
+    return packageCount + bool(duplicate_last)
+
+
+def main():
+    """Main CLI function to write synthetic .BIN files."""
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic MATRIX .BIN file for benchmarks and tests."
+    )
+    parser.add_argument(
+        "bin_file",
+        type=str,
+        help="Path to the output .BIN file"
+    )
+    parser.add_argument(
+        "--duration",
+        default="1h",
+        help="Length of the recording: seconds or a number with s/m/h/d (default: 1h)"
+    )
+    parser.add_argument(
+        "--sample-rate",
+        type=float,
+        default=25,
+        help="Accelerometer and gyroscope rate in Hz (default: 25)"
+    )
+    parser.add_argument(
+        "--channels",
+        default="all",
+        help="Sensors with samples: 'all' (default) or some of acc, gyr, temps, hr joined with '+'"
+    )
+    parser.add_argument(
+        "--corrupt",
+        type=int,
+        nargs="*",
+        default=[],
+        help="Numbers of the packages written with a wrong CRC32"
+    )
+    parser.add_argument(
+        "--gap",
+        nargs="*",
+        default=[],
+        help="Gaps before some packages as PACKAGE:SECONDS (e.g. 100:30)"
+    )
+    parser.add_argument(
+        "--duplicate-last",
+        action="store_true",
+        help="Write the last package twice"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the random samples (default: 0)"
+    )
+
+    args = parser.parse_args()
+
+    gaps = {}
+    for gap in args.gap:
+        package, seconds = gap.split(":")
+        gaps[int(package)] = int(seconds)
+    packages = write_synthetic_bin(args.bin_file, args.duration, args.sample_rate, args.channels,
+                                   corrupt_packages=args.corrupt, gaps=gaps, duplicate_last=args.duplicate_last,
+                                   seed=args.seed)
+    print(f"{args.bin_file}: {packages} packages")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
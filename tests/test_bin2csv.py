@@ -1,8 +1,601 @@
 import pytest
-from uniovi_simur_wearablepermed_utils.bin2csv import bin2csv
+from uniovi_simur_wearablepermed_utils.bin2csv import *
+from uniovi_simur_wearablepermed_utils.bin2csv import calcAccGryro, csvFileHead
+import binascii
+import csv
 import filecmp
+import struct
+import numpy as np
 
 
 def test_matrix_bin2csv():
     res = bin2csv('tests/data_import/MATA00.bin', 'tests/data_import/MATA00_conversion_result.csv')
     assert res == 0 and filecmp.cmp('tests/data_import/MATA00_expected_conversion.csv', 'tests/data_import/MATA00_conversion_result.csv', shallow=False)
+
+
+def write_mock_bin(path, packages, acc_range=8, gyro_range=2000, remarks=b'mock device'):
+    """Write a MATRIX .BIN file; each package is (start, end, acc, gyr, temp, hr) with int16 lists of tuples."""
+    data = bytearray(remarks.ljust(512, b'\0'))
+    data += struct.pack('4sIHH', b'MDTC', len(packages), acc_range, gyro_range)
+    for start, end, acc, gyr, temp, hr in packages:
+        payload = b''.join(struct.pack('%dh' % len(v), *v) for block in (acc, gyr, temp, hr) for v in block)
+        body = struct.pack('IIIIII', start, end, len(acc), len(gyr), len(temp), len(hr)) + payload
+        data += struct.pack('8sI', b'MDTCPACK', binascii.crc32(body)) + body
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def write_corrupt_count_bin(path):
+    """Write a synthetic .BIN file whose package 3 fails the CRC check and announces 2**31 acc samples."""
+    from uniovi_simur_wearablepermed_utils.synthetic_bin import write_synthetic_bin
+    write_synthetic_bin(path, '1m', corrupt_packages=(3,))
+    with WPMBinIndex(path, sidecar=False) as index:
+        field = int(index.packages['offset'][3]) + 20
+    data = bytearray(path.read_bytes())
+    data[field:field + 4] = struct.pack('<I', 0x80000000)
+    path.write_bytes(data)
+
+
+def test_calc_acc_gyro_block_matches_calcAccGryro():
+    values = np.array([-32768, -1, 0, 1, 12345, 32767])
+    result = calc_acc_gyro_block(values, 8)
+    expected = [calcAccGryro(v, 8) for v in values.tolist()]
+    assert [format(v, '.8f') for v in result] == expected
+
+
+def test_decode_package_payload_places_slow_sensors():
+    acc = [(i, -i, 2 * i) for i in range(4)]
+    temp = [(365, 210)]
+    payload = b''.join(struct.pack('hhh', *v) for v in acc) + b''.join(struct.pack('hh', *v) for v in temp)
+    package = decode_package_payload(payload, (4, 0, 1, 0))
+    np.testing.assert_array_equal(package['acc'], np.array(acc))
+    np.testing.assert_array_equal(package['acc_index'], [0, 1, 2, 3])
+    np.testing.assert_array_equal(package['temp_index'], [0])
+    assert package['gyr'].shape == (0, 3)
+    assert decode_package_payload(payload[:-1], (4, 0, 1, 0)) is None
+
+
+def test_bin2csv_mock_file(tmp_path):
+    bin_file = tmp_path / 'mock.BIN'
+    csv_file = tmp_path / 'mock.csv'
+    acc = [(16384, -16384, 0), (1, 2, 3)]
+    gyr = [(100, 200, 300), (-100, -200, -300)]
+    write_mock_bin(bin_file, [(1700000000, 1700000001, acc, gyr, [(365, 210)], [(60, 70)]),
+                              (1700000002, 1700000003, acc, gyr, [], [])])
+
+    assert bin2csv(str(bin_file), str(csv_file)) == 0
+    with open(csv_file, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == csvFileHead[0]
+    assert rows[1] == ['1700000000000', '4.00012207', '-4.00000000', '0.00000000', '6.10370190', '12.20740379',
+                       '18.31110569', '36.5', '21.0', '60', '70', 'mock device']
+    assert rows[2][7:] == ['', '', '', '', '']
+    # The second package starts one second after the first one ends and is pulled back
+    assert [row[0] for row in rows[3:]] == ['1700000001000', '1700000002000']
+
+
+def test_wpm_bin_index(tmp_path):
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(1, 2, 3)] * 25
+    write_mock_bin(bin_file, [(1700000000, 1700000001, acc, acc, [(365, 210)], []),
+                              (1700000001, 1700000002, acc, [], [], [(60, 70)])])
+
+    with WPMBinIndex(bin_file, sidecar=True) as index:
+        assert (index.package_count, index.acc_range, index.gyro_range) == (2, 8, 2000)
+        assert index.remarks == 'mock device'
+        np.testing.assert_array_equal(index.packages['offset'], [524, 524 + 36 + 304])
+        np.testing.assert_array_equal(index.packages['acc'], [25, 25])
+        np.testing.assert_array_equal(index.packages['gyr'], [25, 0])
+        np.testing.assert_array_equal(index.packages['end'], [1700000001, 1700000002])
+        assert index.package_bytes(1)[:8] == b'MDTCPACK'
+        packages = index.packages.copy()
+
+    # The sidecar is reused while the recording is unchanged and rebuilt when it grows
+    assert (tmp_path / 'mock.BIN.idx.npz').exists()
+    with WPMBinIndex(bin_file, sidecar=True) as index:
+        np.testing.assert_array_equal(index.packages, packages)
+    write_mock_bin(bin_file, [(1700000000, 1700000001, acc, [], [], [])] * 3)
+    with WPMBinIndex(bin_file, sidecar=True) as index:
+        assert len(index) == 3
+
+    # Read-only uses of the recording write no sidecar by default
+    other_file = tmp_path / 'other.BIN'
+    write_mock_bin(other_file, [(1700000000 + i, 1700000001 + i, acc, [], [], []) for i in range(3)])
+    assert len(list(iter_wpm_packages(other_file, start=1700000001.5))) == 2
+    assert len(load_wpm_bin(str(other_file))) == 75
+    assert not (tmp_path / 'other.BIN.idx.npz').exists()
+
+
+def test_wpm_bin_index_rejects_other_files(tmp_path):
+    bin_file = tmp_path / 'other.BIN'
+    bin_file.write_bytes(b'\0' * 600)
+    with pytest.raises(ValueError):
+        WPMBinIndex(bin_file)
+
+
+def test_bin2npz_matches_csv(tmp_path):
+    from uniovi_simur_wearablepermed_utils.file_management import load_WPM_data
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(16384, -16384, 0), (1, 2, 3), (-7, 8, 9)]
+    write_mock_bin(bin_file, [(1700000000, 1700000001, acc, acc[:2], [(365, 210)], [(60, 70)]),
+                              (1700000002, 1700000003, acc, acc, [], [])])
+
+    assert bin2csv(str(bin_file), str(tmp_path / 'mock.csv')) == 0
+    assert bin2npz(str(bin_file), str(tmp_path / 'mock.npz')) == 0
+    with np.load(tmp_path / 'mock.npz') as data:
+        assert data['dateTime'].dtype == np.int64 and data['acc'].shape == (6, 3)
+        assert str(data['remarks']) == 'mock device' and int(data['acc_range']) == 8
+    for segment in ('Thigh', 'Wrist'):
+        np.testing.assert_array_equal(load_WPM_data(str(tmp_path / 'mock.npz'), segment),
+                                      load_WPM_data(str(tmp_path / 'mock.csv'), segment))
+
+
+def test_bin2npz_corrupt_sample_count(tmp_path):
+    from uniovi_simur_wearablepermed_utils.file_management import load_WPM_data
+    bin_file = tmp_path / 'corrupt.BIN'
+    write_corrupt_count_bin(bin_file)
+
+    # The output is sized from the packages the decoder keeps, not from the corrupt count
+    assert bin2csv(str(bin_file), str(tmp_path / 'corrupt.csv')) == 0
+    assert bin2npz(str(bin_file), str(tmp_path / 'corrupt.npz')) == 0
+    np.testing.assert_array_equal(load_WPM_data(str(tmp_path / 'corrupt.npz'), 'Thigh'),
+                                  load_WPM_data(str(tmp_path / 'corrupt.csv'), 'Thigh'))
+
+
+def test_bin2csv_workers_match_serial(tmp_path):
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(1, 2, 3), (4, 5, 6)]
+    packages = [(1700000000 + 2 * i, 1700000001 + 2 * i, acc, acc, [(365, 210)], []) for i in range(9)]
+    write_mock_bin(bin_file, packages + packages[-1:])
+
+    assert bin2csv(str(bin_file), str(tmp_path / 'serial.csv')) == 0
+    assert bin2csv(str(bin_file), str(tmp_path / 'parallel.csv'), workers=3) == 0
+    assert filecmp.cmp(tmp_path / 'serial.csv', tmp_path / 'parallel.csv', shallow=False)
+
+    # A corrupt package with a huge sample count does not size the chunks of the workers
+    corrupt_file = tmp_path / 'corrupt.BIN'
+    write_corrupt_count_bin(corrupt_file)
+    assert bin2npz(str(corrupt_file), str(tmp_path / 'serial.npz')) == 0
+    assert bin2npz(str(corrupt_file), str(tmp_path / 'parallel.npz'), workers=2) == 0
+    with np.load(tmp_path / 'serial.npz') as serial, np.load(tmp_path / 'parallel.npz') as parallel:
+        for name in ('dateTime', 'acc', 'gyr', 'temps', 'hr'):
+            np.testing.assert_array_equal(serial[name], parallel[name])
+    np.testing.assert_array_equal(load_wpm_bin(str(corrupt_file), 'Thigh', workers=2),
+                                  load_wpm_bin(str(corrupt_file), 'Thigh'))
+
+
+def test_iter_wpm_packages(tmp_path):
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(1, 2, 3), (4, 5, 6)]
+    write_mock_bin(bin_file, [(1700000000 + i, 1700000001 + i, acc, acc, [(365, 210)], []) for i in range(5)])
+    assert bin2npz(str(bin_file), str(tmp_path / 'mock.npz')) == 0
+
+    blocks = list(iter_wpm_packages(bin_file, channels='acc+temps', packages_per_batch=2))
+    assert [len(block['dateTime']) for block in blocks] == [4, 4, 2]
+    assert set(blocks[0]) == {'dateTime', 'acc', 'temps'}
+    with np.load(tmp_path / 'mock.npz') as data:
+        for name in ('dateTime', 'acc', 'temps'):
+            np.testing.assert_array_equal(np.concatenate([block[name] for block in blocks]), data[name])
+    with pytest.raises(ValueError):
+        next(iter_wpm_packages(bin_file, channels='acc+ppg'))
+
+
+def test_bin2csv_read_buffer_size(tmp_path, monkeypatch):
+    from uniovi_simur_wearablepermed_utils import bin2csv as bin2csv_module
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(1, 2, 3)] * 10
+    write_mock_bin(bin_file, [(1700000000 + i, 1700000001 + i, acc, acc, [], []) for i in range(4)])
+    assert bin2csv(str(bin_file), str(tmp_path / 'large.csv')) == 0
+
+    # Packages split across reads are put back together
+    monkeypatch.setattr(bin2csv_module, 'READ_BUFFER_SIZE', 50)
+    assert bin2csv(str(bin_file), str(tmp_path / 'small.csv')) == 0
+    assert filecmp.cmp(tmp_path / 'large.csv', tmp_path / 'small.csv', shallow=False)
+
+
+def test_bin2csv_not_a_bin_file(tmp_path):
+    bin_file = tmp_path / 'other.BIN'
+    bin_file.write_bytes(b'\0' * 600)
+    assert bin2csv(str(bin_file), str(tmp_path / 'other.csv')) == 1
+    assert bin2csv(str(tmp_path / 'missing.BIN'), str(tmp_path / 'other.csv')) == 1
+
+
+def test_package_csv_text_matches_csv_writer(tmp_path):
+    import io
+    from uniovi_simur_wearablepermed_utils.bin2csv import _iter_decoded_packages
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(16384, -16384, 0), (1, 2, 3), (-7, 8, 9)]
+    write_mock_bin(bin_file, [(1700000000, 1700000001, acc, acc[:2], [(365, 210)], [(60, 70)])],
+                   remarks=b'left wrist, "P01"')
+
+    with WPMBinIndex(bin_file) as index:
+        j, package = next(_iter_decoded_packages(index))
+        text = io.StringIO()
+        csv.writer(text, dialect='excel').writerows(package_csv_rows(package, 8, 2000, index.remarks))
+        assert package_csv_text(package, 8, 2000, index.remarks) == text.getvalue()
+
+    # Remarks with commas and quotes stay a single field in the single-handle output
+    assert bin2csv(str(bin_file), str(tmp_path / 'mock.csv')) == 0
+    with open(tmp_path / 'mock.csv', encoding='utf-8-sig', newline='') as f:
+        assert list(csv.reader(f))[1][-1] == 'left wrist, "P01"'
+
+
+def test_bin2csv_time_range(tmp_path):
+    from datetime import datetime
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(1, 2, 3), (4, 5, 6)]
+    write_mock_bin(bin_file, [(1700000000 + 2 * i, 1700000001 + 2 * i, acc, acc, [(365, 210)], []) for i in range(10)])
+
+    with WPMBinIndex(bin_file) as index:
+        assert index.package_range() == (0, 10)
+        assert index.package_range(1700000005, 1700000008) == (2, 5)
+        assert index.package_range(datetime.fromtimestamp(1700000005.5), None) == (3, 10)
+        assert index.package_range(1800000000, None) == (10, 10)
+
+    assert bin2csv(str(bin_file), str(tmp_path / 'full.csv')) == 0
+    assert bin2csv(str(bin_file), str(tmp_path / 'range.csv'), start=1700000005, end=1700000008) == 0
+    assert bin2csv(str(bin_file), str(tmp_path / 'range3.csv'), workers=3, start=1700000005, end=1700000008) == 0
+    assert filecmp.cmp(tmp_path / 'range.csv', tmp_path / 'range3.csv', shallow=False)
+    with open(tmp_path / 'full.csv', encoding='utf-8-sig', newline='') as f:
+        full = list(csv.reader(f))
+    with open(tmp_path / 'range.csv', encoding='utf-8-sig', newline='') as f:
+        assert list(csv.reader(f)) == full[:1] + full[5:11]
+
+    blocks = list(iter_wpm_packages(bin_file, start=1700000005, end=1700000008))
+    assert [block['dateTime'][0] for block in blocks] == [1700000003000, 1700000005000, 1700000007000]
+
+
+def test_package_range_skips_corrupt_timestamps(tmp_path):
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(1, 2, 3), (4, 5, 6)]
+    write_mock_bin(bin_file, [(1700000000 + 2 * i, 1700000001 + 2 * i, acc, acc, [(365, 210)], []) for i in range(10)])
+    with WPMBinIndex(bin_file, sidecar=False) as index:
+        corrupt = int(index.packages['offset'][4]) + 12
+    # Un paquete corrupto en medio del fichero con un tiempo muy posterior
+    data = bytearray(bin_file.read_bytes())
+    data[corrupt:corrupt + 4] = struct.pack('<I', 0xFFFFFF00)
+    bin_file.write_bytes(data)
+
+    with WPMBinIndex(bin_file, sidecar=False) as index:
+        assert index.package_range(1700000005, 1700000008) == (2, 4)
+        assert index.package_range(1700000010, 1700000016) == (5, 9)
+        assert index.package_range(1700000008, 1700000009) == (5, 5)
+    full = [block['dateTime'][0] for block in iter_wpm_packages(bin_file)]
+    assert len(full) == 9
+    blocks = list(iter_wpm_packages(bin_file, start=1700000010, end=1700000016))
+    assert [block['dateTime'][0] for block in blocks] == full[4:8]
+
+
+def test_wpm_bin_info(tmp_path):
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(1, 2, 3)] * 4
+    write_mock_bin(bin_file, [(1700000000 + 2 * i, 1700000002 + 2 * i, acc, acc[:2], [(365, 210)], []) for i in range(3)],
+                   acc_range=16, gyro_range=500)
+
+    info = wpm_bin_info(bin_file)
+    assert info['remarks'] == 'mock device' and info['headerPackeNum'] == info['packages'] == 3
+    assert (info['acc_range'], info['gyro_range']) == (16, 500)
+    assert (info['first_timestamp'], info['last_timestamp']) == (1700000000, 1700000006)
+    assert info['sample_counts'] == {'acc': 12, 'gyr': 6, 'temps': 3, 'hr': 0}
+    assert info['sample_rate'] == {'acc': 2.0, 'gyr': 1.0, 'temps': 0.5, 'hr': 0.0}
+
+
+def test_wpm_bin_info_skips_invalid_packages(tmp_path):
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(1, 2, 3)] * 4
+    write_mock_bin(bin_file, [(1700000000 + 2 * i, 1700000002 + 2 * i, acc, acc[:2], [(365, 210)], []) for i in range(5)])
+    with WPMBinIndex(bin_file, sidecar=False) as index:
+        packages = index.packages.copy()
+    with WPMBinIndex(bin_file, sidecar=False, hop_headers=True) as index:
+        np.testing.assert_array_equal(index.packages, packages)
+    # Primer paquete con el CRC roto y un último paquete cortado en mitad de la cabecera
+    data = bytearray(bin_file.read_bytes())
+    data[int(packages['offset'][0] + packages['size'][0]) - 1] ^= 0xff
+    bin_file.write_bytes(data[:int(packages['offset'][4]) + 20])
+
+    info = wpm_bin_info(bin_file)
+    assert info['packages'] == 5
+    assert (info['first_timestamp'], info['last_timestamp']) == (1700000002, 1700000008)
+    assert not (tmp_path / 'mock.BIN.idx.npz').exists()
+
+    # A corrupt count field is left out of the sample counts
+    corrupt_file = tmp_path / 'corrupt.BIN'
+    write_corrupt_count_bin(corrupt_file)
+    info = wpm_bin_info(corrupt_file)
+    assert info['skipped_packages'] == 1
+    rows = sum(len(block['dateTime']) for block in iter_wpm_packages(corrupt_file))
+    assert info['sample_counts']['acc'] == rows
+
+
+def test_validate_wpm_bin(tmp_path):
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(1, 2, 3)] * 4
+    times = [(0, 1), (1, 2), (2, 3), (10, 11), (5, 6), (5, 6)]
+    write_mock_bin(bin_file, [(1700000000 + a, 1700000000 + b, acc, acc[:2], [(365, 210)], []) for a, b in times])
+    with WPMBinIndex(bin_file, sidecar=False) as index:
+        corrupt = int(index.packages['offset'][2] + index.packages['size'][2] - 1)
+    data = bytearray(bin_file.read_bytes())
+    data[corrupt] ^= 0xff
+    bin_file.write_bytes(data)
+
+    report = validate_wpm_bin(str(bin_file), gap_seconds=2)
+    assert report['crc_failures'] == [2] and report['duplicates'] == [5]
+    assert report['truncated'] == report['size_mismatches'] == report['empty'] == []
+    assert report['gaps'] == [{'package': 3, 'previous_end': 1700000002, 'start': 1700000010, 'seconds': 8}]
+    assert report['timestamp_regressions'] == [{'package': 4, 'previous_end': 1700000011, 'start': 1700000005,
+                                                'seconds': -6}]
+    assert report['sample_counts']['acc'] == {'4': 4} and report['sample_counts']['hr'] == {'0': 4}
+    assert report['decoded_packages'] == len(list(iter_wpm_packages(str(bin_file)))) == 4
+    assert not report['valid']
+
+
+def test_bin2csv_resume(tmp_path, monkeypatch):
+    from uniovi_simur_wearablepermed_utils import bin2csv as bin2csv_module
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(1, 2, 3), (4, 5, 6)]
+    packages = [(1700000000 + 2 * i, 1700000001 + 2 * i, acc, acc, [(365, 210)], []) for i in range(12)]
+    write_mock_bin(bin_file, packages)
+    assert bin2csv(str(bin_file), str(tmp_path / 'full.csv')) == 0
+    data = bin_file.read_bytes()
+
+    # The recording is still growing: the cut falls in the middle of a package
+    bin_file.write_bytes(data[:len(data) // 2])
+    csv_file = tmp_path / 'mock.csv'
+    assert bin2csv(str(bin_file), str(csv_file), resume=True) == 0
+    assert (tmp_path / 'mock.csv.ckpt.json').exists()
+    bin_file.write_bytes(data)
+    assert bin2csv(str(bin_file), str(csv_file), resume=True) == 0
+    assert filecmp.cmp(csv_file, tmp_path / 'full.csv', shallow=False)
+
+    # An interrupted run goes back to its last checkpoint
+    monkeypatch.setattr(bin2csv_module, 'CHECKPOINT_INTERVAL', 1)
+    package_csv_text = bin2csv_module.package_csv_text
+    calls = []
+
+    def failing_package_csv_text(*args):
+        calls.append(1)
+        if len(calls) in (8, 15):
+            raise KeyboardInterrupt
+        return package_csv_text(*args)
+
+    monkeypatch.setattr(bin2csv_module, 'package_csv_text', failing_package_csv_text)
+    with pytest.raises(KeyboardInterrupt):
+        bin2csv(str(bin_file), str(csv_file))
+    assert not (tmp_path / 'mock.csv.ckpt.json').exists()
+    with pytest.raises(KeyboardInterrupt):
+        bin2csv(str(bin_file), str(csv_file), resume=True)
+    # The second run stopped while writing package 6, the third one starts there
+    assert bin2csv(str(bin_file), str(csv_file), resume=True) == 0
+    assert len(calls) == 21
+    assert filecmp.cmp(csv_file, tmp_path / 'full.csv', shallow=False)
+
+    with pytest.raises(ValueError):
+        bin2csv(str(bin_file), str(csv_file), resume=True, start=1700000000)
+
+
+def test_bin2parquet(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    from uniovi_simur_wearablepermed_utils.file_management import load_WPM_data
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(16384, -16384, 0), (1, 2, 3)]
+    write_mock_bin(bin_file, [(1700000000 + 2 * i, 1700000001 + 2 * i, acc, acc, [(365, 210)], [(60, 70)])
+                              for i in range(6)])
+
+    assert bin2parquet(str(bin_file), str(tmp_path / 'mock.parquet'), row_group_seconds=4) == 0
+    parquet = pq.ParquetFile(tmp_path / 'mock.parquet')
+    schema = parquet.schema_arrow
+    assert schema.names == csvFileHead[0][:-1]
+    assert (str(schema.field('dateTime').type), str(schema.field('acc_x').type), str(schema.field('hr').type)) == \
+        ('int64', 'float', 'int16')
+    assert schema.metadata[b'remarks'] == b'mock device'
+    # Row groups follow the 4 second intervals of dateTime (starts are pulled back one second)
+    assert [parquet.metadata.row_group(i).num_rows for i in range(parquet.num_row_groups)] == [5, 4, 3]
+
+    assert bin2parquet(str(bin_file), str(tmp_path / 'parallel.parquet'), workers=2, row_group_seconds=4) == 0
+    assert pq.read_table(tmp_path / 'parallel.parquet').equals(parquet.read())
+    assert bin2csv(str(bin_file), str(tmp_path / 'mock.csv')) == 0
+    np.testing.assert_allclose(load_WPM_data(str(tmp_path / 'mock.parquet'), 'Thigh'),
+                               load_WPM_data(str(tmp_path / 'mock.csv'), 'Thigh'), rtol=1e-6)
+
+
+def test_bin2npz_native(tmp_path):
+    from uniovi_simur_wearablepermed_utils.file_management import load_WPM_data
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(16384, -16384, 0), (1, 2, 3), (-7, 8, 9), (4, 5, 6)]
+    write_mock_bin(bin_file, [(1700000000, 1700000001, acc, acc, [(365, 210)], [(60, 70)]),
+                              (1700000001, 1700000002, acc, acc[:2], [(366, 211), (367, 212)], [])])
+
+    assert bin2npz(str(bin_file), str(tmp_path / 'mock.npz')) == 0
+    assert bin2npz(str(bin_file), str(tmp_path / 'native.npz'), native=True) == 0
+    with np.load(tmp_path / 'native.npz') as data:
+        assert int(data['rows']) == 8 and data['acc'].shape == (8, 3) and data['gyr'].shape == (6, 3)
+        np.testing.assert_array_equal(data['temps_row'], [0, 4, 6])
+        np.testing.assert_array_equal(data['temps_dateTime'], [1700000000000, 1700000001000, 1700000001500])
+        np.testing.assert_array_equal(data['hr'], [[60, 70]])
+
+    for segment in ('Thigh', 'Wrist'):
+        padded = load_WPM_data(str(tmp_path / 'mock.npz'), segment)
+        np.testing.assert_array_equal(load_WPM_data(str(tmp_path / 'native.npz'), segment), padded)
+        for name in ('mock.npz', 'native.npz'):
+            np.testing.assert_array_equal(load_WPM_data(str(tmp_path / name), segment, temp_ppg=False), padded[:, :7])
+
+
+def test_bin2npz_raw(tmp_path):
+    from uniovi_simur_wearablepermed_utils.file_management import load_WPM_data
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(16384, -16384, 0), (1, 2, 3), (-32768, 32767, 9), (4, 5, 6)]
+    write_mock_bin(bin_file, [(1700000000 + i, 1700000001 + i, acc, acc[:2], [(365, -210)], [(60, 70)])
+                              for i in range(3)], acc_range=4, gyro_range=250)
+
+    assert bin2npz(str(bin_file), str(tmp_path / 'raw.npz'), raw=True) == 0
+    assert bin2npz(str(bin_file), str(tmp_path / 'parallel.npz'), raw=True, workers=2) == 0
+    assert bin2npz(str(bin_file), str(tmp_path / 'mock.npz')) == 0
+    with np.load(tmp_path / 'raw.npz') as data, np.load(tmp_path / 'parallel.npz') as parallel:
+        assert data['acc'].dtype == np.int16 and data['temps'].dtype == np.int16
+        np.testing.assert_array_equal(data['acc'], np.array(acc * 3))
+        np.testing.assert_array_equal(data['gyr_row'], [0, 2, 4, 6, 8, 10])
+        assert (int(data['acc_range']), int(data['gyro_range'])) == (4, 250)
+        np.testing.assert_array_equal(acc_gyro_from_counts(data['acc'][:3], 4),
+                                      [[float(calcAccGryro(v, 4)) for v in row] for row in acc[:3]])
+        for name in data.files:
+            np.testing.assert_array_equal(data[name], parallel[name])
+
+    for segment in ('Thigh', 'Hip'):
+        np.testing.assert_array_equal(load_WPM_data(str(tmp_path / 'raw.npz'), segment),
+                                      load_WPM_data(str(tmp_path / 'mock.npz'), segment))
+
+
+@pytest.mark.parametrize('suffix', ['.gz', '.xz', '.zst'])
+def test_bin2csv_compressed_input(tmp_path, suffix):
+    import gzip
+    import lzma
+    if suffix == '.zst':
+        zstandard = pytest.importorskip('zstandard')
+        compress = zstandard.ZstdCompressor().compress
+    else:
+        compress = {'.gz': gzip.compress, '.xz': lzma.compress}[suffix]
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(100, 200, 300), (400, 500, 600)]
+    write_mock_bin(bin_file, [(1700000000 + i, 1700000001 + i, acc, acc[:1], [(365, -210)], [])
+                              for i in range(4)])
+    compressed_file = tmp_path / ('mock.BIN' + suffix)
+    compressed_file.write_bytes(compress(bin_file.read_bytes()))
+
+    assert bin2csv(str(bin_file), str(tmp_path / 'plain.csv')) == 0
+    assert bin2csv(str(compressed_file), str(tmp_path / 'compressed.csv'), workers=2) == 0
+    assert filecmp.cmp(tmp_path / 'plain.csv', tmp_path / 'compressed.csv', shallow=False)
+    assert bin2csv(str(compressed_file), str(tmp_path / 'compressed.csv'), resume=True) == 0
+    assert filecmp.cmp(tmp_path / 'plain.csv', tmp_path / 'compressed.csv', shallow=False)
+
+    assert bin2npz(str(bin_file), str(tmp_path / 'plain.npz')) == 0
+    assert bin2npz(str(compressed_file), str(tmp_path / 'compressed.npz')) == 0
+    with np.load(tmp_path / 'plain.npz') as plain, np.load(tmp_path / 'compressed.npz') as data:
+        for name in plain.files:
+            np.testing.assert_array_equal(plain[name], data[name])
+    assert len(list(iter_wpm_packages(str(compressed_file)))) == 4
+
+    with pytest.raises(ValueError):
+        bin2csv(str(compressed_file), str(tmp_path / 'range.csv'), start=1700000001)
+
+
+def test_bin2csv_channels(tmp_path):
+    import pandas as pd
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(100, 200, 300), (400, 500, 600)]
+    write_mock_bin(bin_file, [(1700000000 + i, 1700000001 + i, acc, acc[:1], [(365, -210)], [(60, 70)])
+                              for i in range(4)])
+    assert csv_file_head('acc+hr') == ['dateTime', 'acc_x', 'acc_y', 'acc_z', 'hr_raw', 'hr', 'remarks']
+    with pytest.raises(ValueError):
+        csv_file_head('acc+ppg')
+
+    assert bin2csv(str(bin_file), str(tmp_path / 'all.csv')) == 0
+    full = pd.read_csv(tmp_path / 'all.csv')
+    for channels in ('acc', 'gyr+temps', 'acc+gyr+temps+hr'):
+        for workers in (1, 2):
+            assert bin2csv(str(bin_file), str(tmp_path / 'part.csv'), workers=workers, channels=channels) == 0
+            part = pd.read_csv(tmp_path / 'part.csv')
+            assert list(part.columns) == csv_file_head(channels)
+            pd.testing.assert_frame_equal(part, full[part.columns])
+
+    # A checkpoint written for other channels is not reused
+    assert bin2csv(str(bin_file), str(tmp_path / 'resume.csv'), resume=True, channels='acc') == 0
+    assert bin2csv(str(bin_file), str(tmp_path / 'resume.csv'), resume=True) == 0
+    assert filecmp.cmp(tmp_path / 'all.csv', tmp_path / 'resume.csv', shallow=False)
+
+    assert bin2npz(str(bin_file), str(tmp_path / 'all.npz')) == 0
+    assert bin2npz(str(bin_file), str(tmp_path / 'acc.npz'), channels=['acc']) == 0
+    with np.load(tmp_path / 'all.npz') as data, np.load(tmp_path / 'acc.npz') as acc_only:
+        assert 'gyr' not in acc_only and 'temps' not in acc_only
+        np.testing.assert_array_equal(acc_only['acc'], data['acc'])
+        np.testing.assert_array_equal(acc_only['dateTime'], data['dateTime'])
+
+
+def test_load_wpm_bin_matches_load_and_scale(tmp_path):
+    from uniovi_simur_wearablepermed_utils.file_management import apply_scaling_to_matrix_data, load_WPM_data
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(100, -200, 300), (-400, 500, 32767), (-32768, 1, 0), (7, 8, 9)]
+    write_mock_bin(bin_file, [(1700000000 + i, 1700000001 + i, acc, acc[:2], [(365, -210)], [(60, 70)])
+                              for i in range(5)])
+    assert bin2csv(str(bin_file), str(tmp_path / 'mock.csv')) == 0
+
+    for segment in SEGMENT_AXES:
+        for K, temp_ppg in ((1, True), (1.0003, True), (0.999, False)):
+            expected = apply_scaling_to_matrix_data(load_WPM_data(str(tmp_path / 'mock.csv'), segment, temp_ppg), K)
+            np.testing.assert_array_equal(load_wpm_bin(str(bin_file), segment, K, temp_ppg), expected)
+            np.testing.assert_array_equal(load_wpm_bin(str(bin_file), segment, K, temp_ppg, workers=2), expected)
+            np.testing.assert_array_equal(load_WPM_data(str(bin_file), segment, temp_ppg, K), expected)
+            np.testing.assert_array_equal(load_WPM_data(str(tmp_path / 'mock.csv'), segment, temp_ppg, K), expected)
+    with pytest.raises(ValueError):
+        load_wpm_bin(str(bin_file), 'Ankle')
+
+
+def test_load_wpm_bin_corrupt_sample_count(tmp_path):
+    from uniovi_simur_wearablepermed_utils.file_management import load_WPM_data
+    bin_file = tmp_path / 'corrupt.BIN'
+    write_corrupt_count_bin(bin_file)
+    assert bin2csv(str(bin_file), str(tmp_path / 'corrupt.csv')) == 0
+    np.testing.assert_array_equal(load_WPM_data(str(bin_file), 'Hip'), load_WPM_data(str(tmp_path / 'corrupt.csv'), 'Hip'))
+
+
+def test_bin2csv_merges_files_in_time_order(tmp_path):
+    acc = [(100, 200, 300), (400, 500, 600)]
+    packages = [(1700000000 + i, 1700000001 + i, acc, acc[:1], [(365 + i, -210)], []) for i in range(10)]
+    write_mock_bin(tmp_path / 'whole.BIN', packages)
+    # Two pieces of the recording that overlap in packages 4 and 5, plus a copy of package 7
+    write_mock_bin(tmp_path / 'first.BIN', packages[:6])
+    write_mock_bin(tmp_path / 'second.BIN', packages[4:])
+    write_mock_bin(tmp_path / 'copy.BIN', packages[7:8], remarks=b'other')
+    files = [str(tmp_path / name) for name in ('second.BIN', 'copy.BIN', 'first.BIN')]
+
+    assert bin2csv(str(tmp_path / 'whole.BIN'), str(tmp_path / 'whole.csv')) == 0
+    assert bin2csv(files, str(tmp_path / 'merged.csv')) == 0
+    assert filecmp.cmp(tmp_path / 'whole.csv', tmp_path / 'merged.csv', shallow=False)
+
+    merged = list(iter_wpm_packages(files))
+    assert len(merged) == 10
+    np.testing.assert_array_equal(np.concatenate([block['dateTime'] for block in merged]),
+                                  np.concatenate([block['dateTime'] for block in iter_wpm_packages(files[2])] +
+                                                 [block['dateTime'] for block in iter_wpm_packages(files[0])][2:]))
+    np.testing.assert_array_equal(load_wpm_bin(files, 'Thigh', 1.001),
+                                  load_wpm_bin(str(tmp_path / 'whole.BIN'), 'Thigh', 1.001))
+
+    write_mock_bin(tmp_path / 'other_range.BIN', packages[:2], acc_range=4)
+    assert bin2csv(files + [str(tmp_path / 'other_range.BIN')], str(tmp_path / 'bad.csv')) == 1
+    with pytest.raises(ValueError):
+        bin2csv(files, str(tmp_path / 'resume.csv'), resume=True)
+    with pytest.raises(ValueError):
+        bin2csv(files, str(tmp_path / 'workers.csv'), workers=2)
+    with pytest.raises(ValueError):
+        bin2npz(files, str(tmp_path / 'workers.npz'), workers=2)
+
+    # The packages read to sort the files are not counted again when a time range is decoded
+    reports = []
+    assert bin2csv(files, str(tmp_path / 'range.csv'), start=1700000003, end=1700000006,
+                   progress_callback=reports.append) == 0
+    assert reports[-1]['packages_decoded'] == len(list(iter_wpm_packages(files, start=1700000003, end=1700000006)))
+    assert reports[-1]['bytes_read'] == reports[-1]['total_bytes']
+
+
+def test_bin2csv_progress_callback(tmp_path, capsys):
+    bin_file = tmp_path / 'mock.BIN'
+    acc = [(100, 200, 300), (400, 500, 600)]
+    packages = [(1700000000 + i, 1700000001 + i, acc, acc[:1], [(365, -210)], []) for i in range(6)]
+    write_mock_bin(bin_file, packages[:5] + packages[4:])
+    data = bytearray(bin_file.read_bytes())
+    data[-1] ^= 0xff
+    bin_file.write_bytes(data)
+    package_bytes = len(data) - 524
+
+    for convert, output, options in ((bin2csv, 'mock.csv', {}), (bin2csv, 'mock.csv', {'workers': 2}),
+                                     (bin2npz, 'mock.npz', {}), (bin2npz, 'mock.npz', {'raw': True})):
+        reports = []
+        assert convert(str(bin_file), str(tmp_path / output), progress_callback=reports.append,
+                       progress_interval=0, **options) == 0
+        assert all(not report['done'] for report in reports[:-1])
+        assert reports[-1]['done'] and reports[-1]['eta_s'] == 0
+        assert {key: reports[-1][key] for key in ('bytes_read', 'total_bytes', 'packages_decoded',
+                                                   'packages_skipped')} == {
+            'bytes_read': package_bytes, 'total_bytes': package_bytes, 'packages_decoded': 5,
+            'packages_skipped': 2}
+    # Nothing is printed while converting
+    assert capsys.readouterr().out == ''
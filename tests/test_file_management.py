@@ -197,6 +197,83 @@ def test_extract_WPM_info_from_excel():
     assert result == expected_output
   
 
+def test_activity_log_parses_workbook_once(tmp_path, monkeypatch):
+    # Mock activity log with every kind of value read_time/read_date accept
+    excel_file_path = str(tmp_path / 'mock_activity_log.xlsx')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = 'Hoja1'
+    sheet['E13'] = '08/07/2024'
+    sheet['E112'] = datetime(2024, 7, 14)
+    sheet['E37'] = '9:41:06'
+    sheet['D60'] = time(10, 0, 0)
+    sheet['D61'] = timedelta(hours=10, minutes=30)
+    sheet['D72'] = 0.5
+    sheet['D73'] = 'invalid_time'
+    sheet['E273'] = '10:00:00'
+    workbook.save(excel_file_path)
+
+    expected = extract_WPM_info_from_excel(excel_file_path)
+    activity_log = ActivityLog(excel_file_path)
+    for cell in ('E13', 'E112'):
+        assert activity_log.read_date('Hoja1', cell) == read_date_from_excel(excel_file_path, 'Hoja1', cell)
+    for cell in ('E37', 'D60', 'D61', 'D72', 'D73', 'D81'):
+        assert activity_log.read_time('Hoja1', cell) == read_time_from_excel(excel_file_path, 'Hoja1', cell)
+
+    load_workbook = openpyxl.load_workbook
+    calls = []
+    monkeypatch.setattr(openpyxl, 'load_workbook', lambda *args, **kwargs: calls.append(args) or load_workbook(*args, **kwargs))
+    assert extract_WPM_info_from_excel(activity_log) == expected
+    assert expected["Fecha día 1"] == date(2024, 7, 8) and expected["TAPIZ RODANTE - Hora de inicio"] == time(12, 0, 0)
+    WPM_data = np.array([[0] + [0] * 10, [1000] + [0] * 10])
+    assert calculate_accelerometer_drift(WPM_data, activity_log, 'Thigh') == \
+        calculate_accelerometer_drift(WPM_data, excel_file_path, 'Thigh')
+    # Only the path-based call parses the workbook, and nothing is cached by default
+    assert len(calls) == 1
+    assert not os.path.exists(activity_log_cache_file(excel_file_path))
+
+
+def test_load_activity_log_cache(tmp_path, monkeypatch):
+    excel_file_path = str(tmp_path / 'PMPXXX_RegistroActividades.xlsx')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = 'Hoja1'
+    sheet['E13'] = datetime(2024, 7, 8)
+    sheet['E112'] = '14/07/2024'
+    sheet['E37'] = time(9, 41, 6)
+    sheet['D60'] = timedelta(hours=10, minutes=5)
+    sheet['D61'] = 0.5
+    sheet['E273'] = '09:41:06'
+    sheet['A1'] = 'not cached'
+    workbook.save(excel_file_path)
+
+    expected = extract_WPM_info_from_excel(excel_file_path)
+    assert not os.path.exists(activity_log_cache_file(excel_file_path))
+    assert extract_WPM_info_from_excel(load_activity_log(excel_file_path, cache=True)) == expected
+    assert os.path.exists(activity_log_cache_file(excel_file_path))
+
+    load_workbook = openpyxl.load_workbook
+    calls = []
+    monkeypatch.setattr(openpyxl, 'load_workbook', lambda *args, **kwargs: calls.append(args) or load_workbook(*args, **kwargs))
+    activity_log = load_activity_log(excel_file_path, cache=True)
+    assert extract_WPM_info_from_excel(activity_log) == expected
+    WPM_data = np.array([[0] + [0] * 10, [1000] + [0] * 10])
+    K = calculate_accelerometer_drift(WPM_data, load_activity_log(excel_file_path, cache=True), 'Thigh')
+    assert not calls
+    # Cells outside the cache are read from the workbook
+    assert activity_log.value('Hoja1', 'A1') == 'not cached' and len(calls) == 1
+
+    # A change of the activity log invalidates its cache
+    sheet['E273'] = '10:41:06'
+    workbook.save(excel_file_path)
+    assert calculate_accelerometer_drift(WPM_data, load_activity_log(excel_file_path, cache=True), 'Thigh') != K
+    assert len(calls) == 2
+
+    cache_dir = tmp_path / 'cache'
+    assert extract_WPM_info_from_excel(load_activity_log(excel_file_path, cache=True, cache_dir=str(cache_dir))) == expected
+    assert (cache_dir / ('PMPXXX_RegistroActividades.xlsx' + ACTIVITY_LOG_CACHE_SUFFIX)).exists()
+
+
 def test_load_MATRIX_data_by_index():
     """Test loading MATRIX data by index with correct axis transformations."""
  
@@ -308,6 +385,113 @@ def test_load_WPM_data_hip():
     assert np.allclose(result, expected_output), f"Expected {expected_output}, but got {result}"
 
 
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+def test_load_wpm_csv_matches_read_csv(tmp_path, engine):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    from uniovi_simur_wearablepermed_utils.bin2csv import bin2csv
+    from uniovi_simur_wearablepermed_utils.synthetic_bin import write_synthetic_bin
+    write_synthetic_bin(tmp_path / 'synthetic.BIN', '2m')
+    csv_file = str(tmp_path / 'synthetic.csv')
+    assert bin2csv(str(tmp_path / 'synthetic.BIN'), csv_file) == 0
+
+    # Reference: the whole CSV through pandas, remapped as load_MATRIX_data_by_index always did
+    df = pd.read_csv(csv_file)
+    axes = np.array([3, -1, 2])
+    imu = df[['acc_x', 'acc_y', 'acc_z', 'gyr_x', 'gyr_y', 'gyr_z']].to_numpy()
+    imu = imu[:, np.concatenate([np.abs(axes) - 1, np.abs(axes) + 2])] * np.concatenate([np.sign(axes)] * 2)
+    expected = np.hstack([df[['dateTime']].to_numpy(), imu,
+                          df[['bodySurface_temp', 'ambient_temp', 'hr_raw', 'hr']].to_numpy()])
+
+    result = load_wpm_csv(csv_file, 'Thigh', engine=engine, chunk_rows=1000)
+    assert result.dtype == np.float64 and np.array_equal(result, expected, equal_nan=True)
+    assert np.array_equal(load_WPM_data(csv_file, 'Thigh', csv_engine=engine), expected, equal_nan=True)
+    assert np.array_equal(load_wpm_csv(csv_file, axes, temp_ppg=False, engine=engine), expected[:, :7])
+    assert np.array_equal(load_wpm_csv(csv_file, 'Thigh', K=1.001, engine=engine),
+                          apply_scaling_to_matrix_data(expected, 1.001), equal_nan=True)
+
+    df.to_csv(tmp_path / 'synthetic.csv.gz', index=False)
+    assert np.array_equal(load_wpm_csv(str(tmp_path / 'synthetic.csv.gz'), 'Thigh', engine=engine, chunk_rows=1000),
+                          expected, equal_nan=True)
+
+    with pytest.raises(ValueError):
+        load_wpm_csv(csv_file, 'Ankle', engine=engine)
+
+
+def test_load_wpm_csv_out_of_core(tmp_path):
+    from uniovi_simur_wearablepermed_utils.bin2csv import bin2csv
+    from uniovi_simur_wearablepermed_utils.synthetic_bin import write_synthetic_bin
+    write_synthetic_bin(tmp_path / 'synthetic.BIN', '2m')
+    csv_file = str(tmp_path / 'synthetic.csv')
+    assert bin2csv(str(tmp_path / 'synthetic.BIN'), csv_file) == 0
+    expected = load_wpm_csv(csv_file, 'Wrist', K=1.001)
+
+    # Written to a .npy block by block and memory-mapped, with the drift applied per block
+    npy_file = str(tmp_path / 'synthetic.npy')
+    result = load_wpm_csv(csv_file, 'Wrist', K=1.001, chunk_rows=700, npy_file=npy_file)
+    assert isinstance(result, np.memmap) and np.array_equal(result, expected, equal_nan=True)
+    assert np.array_equal(np.load(npy_file), expected, equal_nan=True)
+
+    # Only the rows inside the time ranges
+    time_ranges = [(expected[100, 0], expected[200, 0]), (expected[-50, 0], expected[-1, 0] + 1000)]
+    inside = np.r_[100:201, len(expected) - 50:len(expected)]
+    result = load_wpm_csv(csv_file, 'Wrist', K=1.001, chunk_rows=700, time_ranges=time_ranges)
+    assert np.array_equal(result, expected[inside], equal_nan=True)
+    result = load_WPM_data(csv_file, 'Wrist', K=1.001, time_ranges=time_ranges, npy_file=npy_file)
+    assert np.array_equal(result, expected[inside], equal_nan=True)
+    assert load_wpm_csv(csv_file, 'Wrist', time_ranges=[(0, 1)], npy_file=npy_file).shape == (0, 11)
+
+    with pytest.raises(ValueError):
+        load_WPM_data(str(tmp_path / 'synthetic.BIN'), 'Wrist', npy_file=npy_file)
+
+
+def test_load_WPM_data_cache(tmp_path, monkeypatch):
+    import json
+    import uniovi_simur_wearablepermed_utils.file_management as file_management
+    from uniovi_simur_wearablepermed_utils.bin2csv import bin2csv
+    from uniovi_simur_wearablepermed_utils.synthetic_bin import write_synthetic_bin
+    write_synthetic_bin(tmp_path / 'synthetic.BIN', '1m')
+    csv_file = str(tmp_path / 'synthetic.csv')
+    assert bin2csv(str(tmp_path / 'synthetic.BIN'), csv_file) == 0
+    expected = load_WPM_data(csv_file, 'Hip')
+
+    result = load_WPM_data(csv_file, 'Hip', cache=True)
+    cache_file = wpm_cache_file(csv_file, 'Hip')
+    assert isinstance(result, np.memmap) and np.array_equal(result, expected, equal_nan=True)
+    with open(cache_file + WPM_CACHE_HEADER_SUFFIX) as f:
+        header = json.load(f)
+    assert header['segment'] == 'Hip' and header['columns'][:4] == ['dateTime', '-acc_x', '-acc_z', '-acc_y']
+
+    # Later loads (also of a touched CSV) only map the sidecar
+    parses = []
+    csv_chunks = file_management._csv_chunks
+    monkeypatch.setattr(file_management, '_csv_chunks', lambda *args: parses.append(args) or csv_chunks(*args))
+    os.utime(csv_file, ns=(1, 1))
+    assert np.array_equal(load_WPM_data(csv_file, 'Hip', cache=True), expected, equal_nan=True)
+    time_ranges = [(expected[10, 0], expected[20, 0])]
+    assert np.array_equal(load_WPM_data(csv_file, 'Hip', K=1.001, time_ranges=time_ranges, cache=True),
+                          load_wpm_csv(csv_file, 'Hip', K=1.001, time_ranges=time_ranges), equal_nan=True)
+    assert np.array_equal(load_WPM_data(csv_file, 'Hip', K=1.001, cache=True),
+                          load_wpm_csv(csv_file, 'Hip', K=1.001), equal_nan=True)
+    assert len(parses) == 2
+
+    # A new column layout or a new CSV rebuilds it
+    header['columns'][1] = 'acc_x'
+    with open(cache_file + WPM_CACHE_HEADER_SUFFIX, 'w') as f:
+        json.dump(header, f)
+    assert np.array_equal(load_WPM_data(csv_file, 'Hip', cache=True), expected, equal_nan=True)
+    assert len(parses) == 3
+    write_synthetic_bin(tmp_path / 'synthetic.BIN', '1m', seed=1)
+    assert bin2csv(str(tmp_path / 'synthetic.BIN'), csv_file) == 0
+    assert np.array_equal(load_WPM_data(csv_file, 'Hip', cache=True), load_WPM_data(csv_file, 'Hip'), equal_nan=True)
+    assert not np.array_equal(load_WPM_data(csv_file, 'Hip', cache=True), expected, equal_nan=True)
+
+    cache_dir = tmp_path / 'cache'
+    result = load_WPM_data(str(tmp_path / 'synthetic.BIN'), 'Thigh', temp_ppg=False, cache=True, cache_dir=str(cache_dir))
+    assert np.array_equal(result, load_WPM_data(str(tmp_path / 'synthetic.BIN'), 'Thigh', temp_ppg=False))
+    assert (cache_dir / 'synthetic.BIN.Thigh.imu.npy').exists()
+
+
 def test_calculate_accelerometer_drift_no_walk_start_sample():
     # Create a mock Excel file with power-on and power-off dates and times
     excel_file_path = 'tests/data_import/mock_activity_log.xlsx'
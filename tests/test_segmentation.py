@@ -227,6 +227,31 @@ def test_segment_WPM_activity_data():
 
 #save_segmented_data_to_compressed_npz tests
 
+def test_activity_time_ranges_keep_segments():
+    dictionary_hours_wpm = {
+        "Fecha día 1": datetime(2024, 7, 8, 0, 0),
+        "FASE REPOSO CON K5 - Hora de inicio": time(9, 47, 45),
+        "FASE REPOSO CON K5 - Hora de fin": time(10, 2, 45),
+        "TAPIZ RODANTE - Hora de inicio": time(10, 10, 5),
+        "TAPIZ RODANTE - Hora de fin": None,
+    }
+    time_ranges = activity_time_ranges(dictionary_hours_wpm)
+    # Activities without their dates or times are left out
+    assert len(time_ranges) == 1
+    assert time_ranges[0] == (datetime(2024, 7, 8, 9, 47, 45).timestamp() * 1000 - ACTIVITY_RANGE_MARGIN_MS,
+                              datetime(2024, 7, 8, 10, 2, 45).timestamp() * 1000 + ACTIVITY_RANGE_MARGIN_MS)
+    assert activity_time_ranges(dictionary_hours_wpm, activities=['TAPIZ RODANTE']) == []
+
+    # 25 Hz samples with an odd phase: the segment from the rows inside the ranges is the same
+    start = datetime(2024, 7, 8, 9, 30).timestamp() * 1000 + 13
+    imu_data = np.column_stack([start + 40 * np.arange(25 * 3600), np.arange(25 * 3600)])
+    inside = (imu_data[:, :1] >= np.array(time_ranges)[:, 0]) & (imu_data[:, :1] <= np.array(time_ranges)[:, 1])
+    start_time = datetime(2024, 7, 8, 9, 47, 45)
+    end_time = datetime(2024, 7, 8, 10, 2, 45)
+    assert np.array_equal(segment_MATRIX_data_by_dates(imu_data, start_time, end_time),
+                          segment_MATRIX_data_by_dates(imu_data[inside.any(axis=1)], start_time, end_time))
+
+
 def test_save_segmented_data_to_compressed_npz(tmp_path):
     """Test saving segmented activity data to a compressed .npz file."""
     # Create a temporary directory
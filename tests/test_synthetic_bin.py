@@ -0,0 +1,46 @@
+import pytest
+from uniovi_simur_wearablepermed_utils.synthetic_bin import *
+from uniovi_simur_wearablepermed_utils.bin2csv import bin2csv, iter_wpm_packages, validate_wpm_bin, wpm_bin_info
+import numpy as np
+import pandas as pd
+
+
+def test_parse_duration():
+    assert parse_duration('90') == parse_duration('90s') == 90
+    assert parse_duration('1h') == 3600 and parse_duration('7d') == 7 * 86400
+    assert parse_duration(1.5) == 1.5
+
+
+def test_write_synthetic_bin(tmp_path):
+    bin_file = tmp_path / 'synthetic.BIN'
+    assert write_synthetic_bin(bin_file, '1m', remarks='bench', corrupt_packages=[3], gaps={5: 7},
+                               duplicate_last=True) == 31
+
+    info = wpm_bin_info(bin_file)
+    assert info['remarks'] == 'bench' and info['headerPackeNum'] == info['packages'] == 31
+    assert info['sample_rate'] == {'acc': 25.0, 'gyr': 25.0, 'temps': 1.0, 'hr': 1.0}
+    report = validate_wpm_bin(str(bin_file), gap_seconds=2)
+    assert report['crc_failures'] == [3] and report['duplicates'] == [30]
+    assert report['gaps'] == [{'package': 5, 'previous_end': 1700000010, 'start': 1700000017, 'seconds': 7}]
+    assert report['decoded_packages'] == 29 and not report['timestamp_regressions']
+
+    assert bin2csv(str(bin_file), str(tmp_path / 'synthetic.csv')) == 0
+    data = pd.read_csv(tmp_path / 'synthetic.csv')
+    assert len(data) == 29 * 50 and data['remarks'].iloc[0] == 'bench'
+    assert abs(data['acc_z'].mean() - 1) < 0.01 and data['hr'].between(60, 99).sum() == 29 * 2
+
+
+def test_write_synthetic_bin_channels_and_seed(tmp_path):
+    write_synthetic_bin(tmp_path / 'acc.BIN', 60, sample_rate=100, channels='acc')
+    blocks = list(iter_wpm_packages(str(tmp_path / 'acc.BIN')))
+    assert len(blocks) == 30 and all(len(block['dateTime']) == 200 for block in blocks)
+    assert np.isnan(blocks[0]['gyr']).all() and np.isnan(blocks[0]['temps']).all()
+
+    write_synthetic_bin(tmp_path / 'a.BIN', 60, seed=1)
+    write_synthetic_bin(tmp_path / 'b.BIN', 60, seed=1)
+    write_synthetic_bin(tmp_path / 'c.BIN', 60, seed=2)
+    assert (tmp_path / 'a.BIN').read_bytes() == (tmp_path / 'b.BIN').read_bytes()
+    assert (tmp_path / 'a.BIN').read_bytes() != (tmp_path / 'c.BIN').read_bytes()
+
+    with pytest.raises(ValueError):
+        write_synthetic_bin(tmp_path / 'bad.BIN', 60, sample_rate=25.3)